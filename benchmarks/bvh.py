@@ -0,0 +1,116 @@
+"""Compare BVH and linear sphere queries.
+
+Run with ``uv run python benchmarks/bvh.py``. For growing scene sizes it
+reports how long ``HittableList.build_bvh`` takes, how fast the Rust renderer
+traces rays with and without the hierarchy, and how fast the Numba engine
+traces rays with the flattened hierarchy. Linear queries are skipped for the
+largest scenes, where they take minutes.
+"""
+
+import time
+
+import numpy as np
+
+from rayt.numba_optimized import compile_kernels, render_image_numba
+from rayt.sampling import RANDOM_SAMPLER
+from rayt.scene import random_scene
+from rayt.scene_data import bvh_arrays, camera_array, material_array, sphere_array
+from rayt_rust._core import (
+    Camera,
+    HittableList,
+    Point3,
+    Vec3,
+    render,
+)
+
+IMAGE_WIDTH = 160
+IMAGE_HEIGHT = 90
+SAMPLES_PER_PIXEL = 4
+MAX_DEPTH = 50
+SEED = 0
+SCENE_SIZES = (100, 1_000, 10_000, 100_000)
+MAX_LINEAR_SIZE = 10_000
+
+
+def trace(world: HittableList, camera: Camera) -> float:
+    """Return the time the Rust renderer takes to trace one frame"""
+    start = time.perf_counter()
+    render(
+        world,
+        camera,
+        IMAGE_WIDTH,
+        IMAGE_HEIGHT,
+        SAMPLES_PER_PIXEL,
+        MAX_DEPTH,
+        SEED,
+    )
+    return time.perf_counter() - start
+
+
+def trace_numba(world: HittableList, camera: Camera) -> float:
+    """Return the time the Numba engine takes to trace one frame"""
+    bounds, links, order = bvh_arrays(world)
+    spheres_data = sphere_array(world)[order]
+    materials_data = material_array(world)[order]
+    output = np.zeros((IMAGE_HEIGHT, IMAGE_WIDTH, 3), dtype=np.float64)
+
+    start = time.perf_counter()
+    render_image_numba(
+        0,
+        0,
+        IMAGE_WIDTH,
+        IMAGE_HEIGHT,
+        SAMPLES_PER_PIXEL,
+        camera_array(camera),
+        spheres_data,
+        materials_data,
+        bounds,
+        links,
+        MAX_DEPTH,
+        MAX_DEPTH,  # roulette_depth: no Russian roulette
+        SEED,
+        0,
+        RANDOM_SAMPLER,
+        1,  # strata: unused by the random sampler
+        output,
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    camera = Camera(
+        lookfrom=Point3(13, 2, 3),
+        lookat=Point3(0, 0, 0),
+        vup=Vec3(0, 1, 0),
+        vfov=20.0,
+        aspect_ratio=IMAGE_WIDTH / IMAGE_HEIGHT,
+        aperture=0.1,
+        focus_dist=10.0,
+    )
+    rays = IMAGE_WIDTH * IMAGE_HEIGHT * SAMPLES_PER_PIXEL
+    compile_kernels()
+
+    print(
+        f"{'spheres':>8} {'build':>10} {'linear rays/s':>14} {'bvh rays/s':>14} "
+        f"{'numba rays/s':>14}"
+    )
+    for n_spheres in SCENE_SIZES:
+        world = random_scene(n_spheres, SEED)
+
+        linear = "-"
+        if n_spheres <= MAX_LINEAR_SIZE:
+            linear = f"{rays / trace(world, camera):,.0f}"
+
+        start = time.perf_counter()
+        world.build_bvh()
+        build = time.perf_counter() - start
+        bvh = f"{rays / trace(world, camera):,.0f}"
+        numba = f"{rays / trace_numba(world, camera):,.0f}"
+
+        print(
+            f"{n_spheres:>8} {build * 1e3:>8.2f}ms {linear:>14} {bvh:>14} {numba:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Count NRT heap allocations per ray in the Numba path tracer.
+
+Run with ``uv run python benchmarks/numba_allocations.py``. The kernels use
+tuple-based vector math, so the count should stay at (or very close to) zero;
+the few remaining allocations come from the ``prange`` scheduler and the
+per-row random generator state and BVH traversal stack, not from the per-ray
+code.
+"""
+
+import os
+
+# NRT statistics must be enabled before numba is imported.
+os.environ["NUMBA_NRT_STATS"] = "1"
+
+import time
+
+import numpy as np
+from numba.core.runtime import rtsys
+
+from rayt.numba_optimized import render_image_numba
+from rayt.sampling import RANDOM_SAMPLER
+from rayt.scene import random_scene
+from rayt.scene_data import (
+    bvh_arrays,
+    camera_array,
+    material_array,
+    sphere_array,
+)
+from rayt_rust._core import Camera, Point3, Vec3
+
+IMAGE_WIDTH = 160
+IMAGE_HEIGHT = 90
+SAMPLES_PER_PIXEL = 8
+MAX_DEPTH = 50
+SEED = 0
+
+
+def main() -> None:
+    world = random_scene()
+    camera = Camera(
+        lookfrom=Point3(13, 2, 3),
+        lookat=Point3(0, 0, 0),
+        vup=Vec3(0, 1, 0),
+        vfov=20.0,
+        aspect_ratio=IMAGE_WIDTH / IMAGE_HEIGHT,
+        aperture=0.1,
+        focus_dist=10.0,
+    )
+    spheres_data = sphere_array(world)
+    materials_data = material_array(world)
+    camera_data = camera_array(camera)
+    bvh_bounds, bvh_links, order = bvh_arrays(world)
+    args = (
+        camera_data,
+        spheres_data[order],
+        materials_data[order],
+        bvh_bounds,
+        bvh_links,
+        MAX_DEPTH,
+        MAX_DEPTH,  # roulette_depth: no Russian roulette
+        SEED,
+        0,
+        RANDOM_SAMPLER,
+        1,  # strata: unused by the random sampler
+    )
+
+    # Compile outside of the measured region.
+    render_image_numba(0, 0, IMAGE_WIDTH, IMAGE_HEIGHT, 1, *args, np.zeros((1, 1, 3)))
+
+    output = np.zeros((IMAGE_HEIGHT, IMAGE_WIDTH, 3), dtype=np.float64)
+    before = rtsys.get_allocation_stats()
+    start = time.perf_counter()
+    render_image_numba(
+        0, 0, IMAGE_WIDTH, IMAGE_HEIGHT, SAMPLES_PER_PIXEL, *args, output
+    )
+    elapsed = time.perf_counter() - start
+    after = rtsys.get_allocation_stats()
+
+    rays = IMAGE_WIDTH * IMAGE_HEIGHT * SAMPLES_PER_PIXEL
+    allocations = after.alloc - before.alloc
+    print(f"Primary rays:        {rays}")
+    print(f"Heap allocations:    {allocations}")
+    print(f"Allocations per ray: {allocations / rays:.6f}")
+    print(f"Render time:         {elapsed:.3f}s ({rays / elapsed:,.0f} rays/s)")
+
+
+if __name__ == "__main__":
+    main()
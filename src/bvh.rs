@@ -0,0 +1,334 @@
+use crate::{
+    ray::Ray,
+    sphere::SphereSoa,
+    vec3::{Point3, Vec3},
+};
+
+// Flat bounding volume hierarchy over the spheres of a HittableList.
+//
+// Nodes are stored in depth-first order: the first child of an interior node
+// directly follows it, and `offset` points at the second child. For a leaf,
+// `offset` is the position of its first sphere in `indices` and `count` the
+// number of spheres it holds. The BVH keeps its own copy of the spheres in
+// that order, so every leaf covers a contiguous range of them.
+
+// Number of buckets used to estimate the surface area heuristic of a split.
+const SAH_BUCKETS: usize = 12;
+
+// Leaves never hold more spheres than this.
+const MAX_LEAF_SIZE: usize = 4;
+
+// Cost of visiting an interior node, relative to one sphere test.
+const TRAVERSAL_COST: f64 = 0.125;
+
+// Below this depth, nodes are split at the median instead of by the surface
+// area heuristic. This bounds the tree depth to SAH_MAX_DEPTH + log2(spheres),
+// so a fixed traversal stack is always large enough.
+const SAH_MAX_DEPTH: usize = 32;
+const STACK_SIZE: usize = 64;
+
+#[derive(Clone, Copy)]
+pub struct Aabb {
+    pub min: Point3,
+    pub max: Point3,
+}
+
+impl Aabb {
+    pub fn empty() -> Self {
+        Self {
+            min: Point3::from([f64::INFINITY; 3]),
+            max: Point3::from([f64::NEG_INFINITY; 3]),
+        }
+    }
+
+    pub fn from_sphere(center: Point3, radius: f64) -> Self {
+        let radius = Vec3::from([radius.abs(); 3]);
+        Self {
+            min: center - radius,
+            max: center + radius,
+        }
+    }
+
+    pub fn union(&self, other: &Aabb) -> Self {
+        Self {
+            min: Point3::from([
+                self.min.x.min(other.min.x),
+                self.min.y.min(other.min.y),
+                self.min.z.min(other.min.z),
+            ]),
+            max: Point3::from([
+                self.max.x.max(other.max.x),
+                self.max.y.max(other.max.y),
+                self.max.z.max(other.max.z),
+            ]),
+        }
+    }
+
+    pub fn grow(&self, p: &Point3) -> Self {
+        self.union(&Aabb { min: *p, max: *p })
+    }
+
+    pub fn surface_area(&self) -> f64 {
+        let d = self.max - self.min;
+        if d.x < 0.0 {
+            return 0.0;
+        }
+        2.0 * (d.x * d.y + d.y * d.z + d.z * d.x)
+    }
+
+    pub fn longest_axis(&self) -> usize {
+        let d = self.max - self.min;
+        if d.x > d.y && d.x > d.z {
+            0
+        } else if d.y > d.z {
+            1
+        } else {
+            2
+        }
+    }
+
+    /// Slab test against a ray given by its origin and inverse direction.
+    pub fn hit(&self, origin: &Point3, inv_direction: &Vec3, t_min: f64, t_max: f64) -> bool {
+        let mut t_min = t_min;
+        let mut t_max = t_max;
+
+        for axis in 0..3 {
+            let mut t0 = (self.min[axis] - origin[axis]) * inv_direction[axis];
+            let mut t1 = (self.max[axis] - origin[axis]) * inv_direction[axis];
+            if inv_direction[axis] < 0.0 {
+                std::mem::swap(&mut t0, &mut t1);
+            }
+            t_min = t0.max(t_min);
+            t_max = t1.min(t_max);
+            if t_max < t_min {
+                return false;
+            }
+        }
+
+        true
+    }
+}
+
+#[derive(Clone, Copy)]
+pub struct BvhNode {
+    pub bounds: Aabb,
+    pub offset: usize,
+    pub count: usize,
+    pub axis: usize,
+}
+
+#[derive(Clone, Default)]
+pub struct Bvh {
+    pub nodes: Vec<BvhNode>,
+    // Original position of each sphere in `spheres`
+    pub indices: Vec<usize>,
+    pub spheres: SphereSoa,
+}
+
+struct BuildItem {
+    index: usize,
+    bounds: Aabb,
+    centroid: Point3,
+}
+
+impl Bvh {
+    pub fn build(spheres: &SphereSoa) -> Self {
+        let mut items: Vec<BuildItem> = (0..spheres.len())
+            .map(|index| BuildItem {
+                index,
+                bounds: Aabb::from_sphere(spheres.center(index), spheres.r[index]),
+                centroid: spheres.center(index),
+            })
+            .collect();
+
+        let mut bvh = Self {
+            nodes: Vec::with_capacity(2 * spheres.len()),
+            indices: Vec::with_capacity(spheres.len()),
+            spheres: SphereSoa::default(),
+        };
+        if !items.is_empty() {
+            bvh.build_node(&mut items, 0);
+        }
+        bvh.spheres = spheres.permuted(&bvh.indices);
+        bvh
+    }
+
+    fn build_node(&mut self, items: &mut [BuildItem], depth: usize) -> usize {
+        let bounds = items
+            .iter()
+            .fold(Aabb::empty(), |acc, item| acc.union(&item.bounds));
+        let centroid_bounds = items
+            .iter()
+            .fold(Aabb::empty(), |acc, item| acc.grow(&item.centroid));
+        let axis = centroid_bounds.longest_axis();
+
+        let node_index = self.nodes.len();
+        self.nodes.push(BvhNode {
+            bounds,
+            offset: 0,
+            count: 0,
+            axis,
+        });
+
+        let split = if items.len() <= 1 {
+            None
+        } else if depth < SAH_MAX_DEPTH {
+            Self::find_split(items, &bounds, &centroid_bounds, axis)
+        } else if items.len() > MAX_LEAF_SIZE {
+            let mid = items.len() / 2;
+            items.select_nth_unstable_by(mid, |a, b| a.centroid[axis].total_cmp(&b.centroid[axis]));
+            Some(mid)
+        } else {
+            None
+        };
+
+        match split {
+            Some(mid) => {
+                let (left, right) = items.split_at_mut(mid);
+                self.build_node(left, depth + 1);
+                self.nodes[node_index].offset = self.build_node(right, depth + 1);
+            }
+            None => {
+                self.nodes[node_index].offset = self.indices.len();
+                self.nodes[node_index].count = items.len();
+                self.indices.extend(items.iter().map(|item| item.index));
+            }
+        }
+
+        node_index
+    }
+
+    /// Partition `items` along `axis` with the binned surface area heuristic.
+    ///
+    /// Returns the size of the first half, or `None` when a leaf is cheaper.
+    fn find_split(
+        items: &mut [BuildItem],
+        bounds: &Aabb,
+        centroid_bounds: &Aabb,
+        axis: usize,
+    ) -> Option<usize> {
+        let (lo, hi) = (centroid_bounds.min[axis], centroid_bounds.max[axis]);
+        if hi <= lo {
+            // Coincident centroids: split by count if the leaf would be too big
+            return (items.len() > MAX_LEAF_SIZE).then_some(items.len() / 2);
+        }
+
+        let bucket_of = |item: &BuildItem| {
+            let b = ((item.centroid[axis] - lo) / (hi - lo) * SAH_BUCKETS as f64) as usize;
+            b.min(SAH_BUCKETS - 1)
+        };
+
+        let mut counts = [0usize; SAH_BUCKETS];
+        let mut bucket_bounds = [Aabb::empty(); SAH_BUCKETS];
+        for item in items.iter() {
+            let b = bucket_of(item);
+            counts[b] += 1;
+            bucket_bounds[b] = bucket_bounds[b].union(&item.bounds);
+        }
+
+        // Cost of splitting after each bucket, from prefix and suffix sweeps
+        let mut costs = [0.0; SAH_BUCKETS - 1];
+        let (mut left_bounds, mut left_count) = (Aabb::empty(), 0);
+        for b in 0..SAH_BUCKETS - 1 {
+            left_bounds = left_bounds.union(&bucket_bounds[b]);
+            left_count += counts[b];
+            costs[b] = left_count as f64 * left_bounds.surface_area();
+        }
+        let (mut right_bounds, mut right_count) = (Aabb::empty(), 0);
+        for b in (1..SAH_BUCKETS).rev() {
+            right_bounds = right_bounds.union(&bucket_bounds[b]);
+            right_count += counts[b];
+            costs[b - 1] += right_count as f64 * right_bounds.surface_area();
+        }
+
+        let (best_bucket, best_cost) =
+            costs
+                .iter()
+                .enumerate()
+                .fold((0, f64::INFINITY), |best, (b, &cost)| {
+                    if cost < best.1 {
+                        (b, cost)
+                    } else {
+                        best
+                    }
+                });
+
+        let area = bounds.surface_area();
+        let split_cost = TRAVERSAL_COST
+            + if area > 0.0 {
+                best_cost / area
+            } else {
+                items.len() as f64
+            };
+        if items.len() <= MAX_LEAF_SIZE && split_cost >= items.len() as f64 {
+            return None;
+        }
+
+        let mut mid = 0;
+        for i in 0..items.len() {
+            if bucket_of(&items[i]) <= best_bucket {
+                items.swap(i, mid);
+                mid += 1;
+            }
+        }
+
+        Some(mid)
+    }
+
+    /// Closest hit in (t_min, t_max), visiting leaves nearest side first.
+    ///
+    /// Returns the position of the sphere in `spheres` and the ray parameter.
+    pub fn hit(&self, r: &Ray, t_min: f64, t_max: f64) -> Option<(usize, f64)> {
+        let mut closest = None;
+        if self.nodes.is_empty() {
+            return closest;
+        }
+
+        let inv_direction = Vec3::from([
+            1.0 / r.direction.x,
+            1.0 / r.direction.y,
+            1.0 / r.direction.z,
+        ]);
+        let mut closest_so_far = t_max;
+        let mut stack = [0usize; STACK_SIZE];
+        let mut stack_size = 0;
+        let mut node_index = 0;
+
+        loop {
+            let node = &self.nodes[node_index];
+            if node
+                .bounds
+                .hit(&r.origin, &inv_direction, t_min, closest_so_far)
+            {
+                if node.count > 0 {
+                    let end = node.offset + node.count;
+                    if let Some((k, t)) =
+                        self.spheres.hit(r, node.offset, end, t_min, closest_so_far)
+                    {
+                        closest_so_far = t;
+                        closest = Some((k, t));
+                    }
+                } else if inv_direction[node.axis] < 0.0 {
+                    // Second child is nearer along the split axis
+                    stack[stack_size] = node_index + 1;
+                    stack_size += 1;
+                    node_index = node.offset;
+                    continue;
+                } else {
+                    stack[stack_size] = node.offset;
+                    stack_size += 1;
+                    node_index += 1;
+                    continue;
+                }
+            }
+
+            if stack_size == 0 {
+                break;
+            }
+            stack_size -= 1;
+            node_index = stack[stack_size];
+        }
+
+        closest
+    }
+}
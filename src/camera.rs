@@ -1,11 +1,17 @@
+use pyo3::exceptions::PyValueError;
 use pyo3::prelude::*;
+use pyo3::types::PyByteArray;
 
 use crate::{
     ray::Ray,
-    utils::degrees_to_radians,
+    rng::{with_thread_rng, Rng},
+    utils::{degrees_to_radians, f64_bytearray, f64_rows},
     vec3::{cross, random_in_unit_disk, unit_vector, Point3, Vec3},
 };
 
+// Number of float64 values in the camera array of `get_data`.
+const CAMERA_DATA_LEN: usize = 19;
+
 #[pyclass]
 pub struct Camera {
     origin: Point3,
@@ -55,19 +61,15 @@ impl Camera {
         }
     }
 
-    pub fn get_ray(&self, s: f64, t: f64) -> Ray {
-        let rd = self.lens_radius * random_in_unit_disk();
-        let offset = self.u * rd.x + self.v * rd.y;
-        Ray {
-            origin: self.origin + offset,
-            direction: self.lower_left_corner + s * self.horizontal + t * self.vertical
-                - self.origin
-                - offset,
-        }
+    #[pyo3(name = "get_ray")]
+    fn py_get_ray(&self, s: f64, t: f64) -> Ray {
+        with_thread_rng(|rng| self.get_ray(s, t, rng))
     }
 
-    pub fn get_data(&self) -> Vec<f64> {
-        vec![
+    /// Camera array `[origin, lower_left_corner, horizontal, vertical,
+    /// lens_radius, u, v]`, as the bytes of a float64 array.
+    pub fn get_data<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, PyByteArray>> {
+        let data = [
             self.origin.x,
             self.origin.y,
             self.origin.z,
@@ -87,6 +89,48 @@ impl Camera {
             self.v.x,
             self.v.y,
             self.v.z,
-        ]
+        ];
+        f64_bytearray(py, data.len(), data)
+    }
+
+    /// Build a camera from the bytes of a float64 array laid out like the
+    /// output of `get_data`.
+    #[staticmethod]
+    pub fn from_data(data: &[u8]) -> PyResult<Self> {
+        let d = f64_rows(data, 1, "data")?;
+        if d.len() != CAMERA_DATA_LEN {
+            return Err(PyValueError::new_err(format!(
+                "data must hold {CAMERA_DATA_LEN} float64 values, got {}",
+                d.len()
+            )));
+        }
+        Ok(Self {
+            origin: Point3::from([d[0], d[1], d[2]]),
+            lower_left_corner: Point3::from([d[3], d[4], d[5]]),
+            horizontal: Vec3::from([d[6], d[7], d[8]]),
+            vertical: Vec3::from([d[9], d[10], d[11]]),
+            lens_radius: d[12],
+            u: Vec3::from([d[13], d[14], d[15]]),
+            v: Vec3::from([d[16], d[17], d[18]]),
+        })
+    }
+}
+
+impl Camera {
+    pub fn get_ray(&self, s: f64, t: f64, rng: &mut Rng) -> Ray {
+        self.lens_ray(s, t, random_in_unit_disk(rng))
+    }
+
+    /// Ray through the point (s, t) of the viewport from the lens point
+    /// `disk`, a point of the unit disk.
+    pub fn lens_ray(&self, s: f64, t: f64, disk: Vec3) -> Ray {
+        let rd = self.lens_radius * disk;
+        let offset = self.u * rd.x + self.v * rd.y;
+        Ray {
+            origin: self.origin + offset,
+            direction: self.lower_left_corner + s * self.horizontal + t * self.vertical
+                - self.origin
+                - offset,
+        }
     }
 }
@@ -5,6 +5,7 @@ use crate::{
     hittable_list::HittableList,
     material::Scatter,
     ray::Ray,
+    rng::{with_thread_rng, Rng},
     utils::{clamp, INFINITY},
     vec3::{unit_vector, Color},
 };
@@ -22,19 +23,61 @@ pub fn get_color(pixel_color: Color, samples_per_pixel: usize) -> String {
 }
 
 #[pyfunction]
-pub fn ray_color(mut r: Ray, world: &HittableList, depth: usize) -> Color {
+#[pyo3(name = "ray_color")]
+#[pyo3(signature = (r, world, depth, roulette_depth=None))]
+pub fn py_ray_color(
+    r: Ray,
+    world: &HittableList,
+    depth: usize,
+    roulette_depth: Option<usize>,
+) -> Color {
+    let roulette_depth = roulette_depth.unwrap_or(depth);
+    with_thread_rng(|rng| ray_color(r, world, depth, roulette_depth, rng))
+}
+
+/// Russian roulette: a path survives with probability equal to the largest
+/// component of its throughput (at most 1), and survivors are divided by that
+/// probability so the expected color stays the same. Returns the reweighted
+/// throughput, or `None` when the path ends.
+pub fn russian_roulette(r_color: Color, rng: &mut Rng) -> Option<Color> {
+    let p = r_color.x.max(r_color.y).max(r_color.z).min(1.0);
+    if rng.next_f64() >= p {
+        return None;
+    }
+    Some(r_color / p)
+}
+
+/// Color of the path starting with `r`, followed for at most `depth` bounces.
+/// A path that has not reached the sky by then contributes no light.
+///
+/// Paths that bounced at least `roulette_depth` times go through Russian
+/// roulette after every further bounce; `roulette_depth >= depth` turns it
+/// off.
+pub fn ray_color(
+    mut r: Ray,
+    world: &HittableList,
+    depth: usize,
+    roulette_depth: usize,
+    rng: &mut Rng,
+) -> Color {
     if depth == 0 {
         return Color::default();
     }
 
     let mut r_color = Color::from([1.0, 1.0, 1.0]);
 
-    for _ in 0..depth {
+    for bounce in 1..=depth {
         match world.hit(&r, 0.001, INFINITY) {
-            Some(rec) => match rec.material.scatter(&r, rec) {
+            Some(rec) => match rec.material.scatter(&r, rec, rng) {
                 Some((scattered, attenuation)) => {
                     r = scattered;
                     r_color *= attenuation;
+                    if bounce >= roulette_depth && bounce < depth {
+                        match russian_roulette(r_color, rng) {
+                            Some(reweighted) => r_color = reweighted,
+                            None => return Color::default(),
+                        }
+                    }
                 }
                 None => return Color::default(),
             },
@@ -43,10 +86,10 @@ pub fn ray_color(mut r: Ray, world: &HittableList, depth: usize) -> Color {
                 let t = 0.5 * (unit_direction.y + 1.0);
                 r_color *=
                     (1.0 - t) * Color::from([1.0, 1.0, 1.0]) + t * Color::from([0.5, 0.7, 1.0]);
-                break;
+                return r_color;
             }
         }
     }
 
-    r_color
+    Color::default()
 }
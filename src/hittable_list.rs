@@ -1,28 +1,50 @@
+use pyo3::exceptions::PyValueError;
 use pyo3::prelude::*;
+use pyo3::types::PyByteArray;
 
 use crate::{
+    bvh::Bvh,
     hittable::{HitRecord, Hittable},
     material::Material,
     ray::Ray,
-    sphere::Sphere,
+    sphere::{Sphere, SphereSoa},
+    utils::{f64_array, f64_bytearray, f64_rows, i64_bytearray},
     vec3::{Color, Point3},
 };
 
 #[derive(Default)]
 #[pyclass]
 pub struct HittableList {
-    objects: Vec<Sphere>,
+    spheres: SphereSoa,
+    materials: Vec<Material>,
+    bvh: Option<Bvh>,
 }
 
 #[pymethods]
 impl HittableList {
     #[new]
     fn py_new() -> Self {
-        Self { objects: vec![] }
+        Self::default()
     }
 
     pub fn add(&mut self, object: Sphere) {
-        self.objects.push(object);
+        self.spheres
+            .push(object.center, object.radius, self.materials.len());
+        self.materials.push(object.material);
+        // The hierarchy no longer covers every object
+        self.bvh = None;
+    }
+
+    /// Build a bounding volume hierarchy over the current objects.
+    ///
+    /// Ray queries use it until the next object is added.
+    pub fn build_bvh(&mut self) {
+        self.bvh = Some(Bvh::build(&self.spheres));
+    }
+
+    #[getter]
+    fn has_bvh(&self) -> bool {
+        self.bvh.is_some()
     }
 
     fn add_lambertian(&mut self, center: Point3, radius: f64, albedo: Color) {
@@ -43,53 +65,160 @@ impl HittableList {
         self.add(sphere);
     }
 
-    fn get_sphere_data(&self) -> Vec<Vec<f64>> {
-        let mut data = vec![];
-
-        for object in self.objects.iter() {
-            data.push(vec![
-                object.center.x,
-                object.center.y,
-                object.center.z,
-                object.radius,
-            ]);
+    /// Add spheres from NumPy arrays in one call.
+    ///
+    /// `centers` has shape (n, 3), `radii` and `material_types` shape (n,)
+    /// and `material_params` shape (n, 4), holding the columns that follow
+    /// the type in `get_material_data`. Nothing is added if any row is
+    /// invalid.
+    pub fn add_spheres(
+        &mut self,
+        centers: &Bound<'_, PyAny>,
+        radii: &Bound<'_, PyAny>,
+        material_types: &Bound<'_, PyAny>,
+        material_params: &Bound<'_, PyAny>,
+    ) -> PyResult<()> {
+        let centers = f64_array(centers, 3, "centers")?;
+        let radii = f64_array(radii, 1, "radii")?;
+        let material_types = f64_array(material_types, 1, "material_types")?;
+        let material_params = f64_array(material_params, 4, "material_params")?;
+        let n = radii.len();
+        if centers.len() != 3 * n || material_types.len() != n || material_params.len() != 4 * n {
+            return Err(PyValueError::new_err(
+                "centers, radii, material_types and material_params must have the same number of rows",
+            ));
         }
 
-        data
+        let materials = material_types
+            .iter()
+            .zip(material_params.chunks_exact(4))
+            .map(|(&t, p)| material_from_data(&[t, p[0], p[1], p[2], p[3]]))
+            .collect::<PyResult<Vec<_>>>()?;
+        self.extend(&centers, &radii, materials);
+        Ok(())
     }
 
-    fn get_material_data(&self) -> Vec<Vec<f64>> {
-        let mut data = vec![];
-
-        for object in self.objects.iter() {
-            let material_data = match object.material {
-                Material::Lambertian(m) => {
-                    vec![0.0, m.albedo.x, m.albedo.y, m.albedo.z, 0.0]
-                }
-                Material::Metal(m) => {
-                    vec![1.0, m.albedo.x, m.albedo.y, m.albedo.z, m.fuzz]
-                }
-                Material::Dielectric(m) => vec![2.0, m.ref_idx, 0.0, 0.0, 0.0],
-            };
-            data.push(material_data);
+    /// Build a list from sphere and material arrays in one call.
+    ///
+    /// Takes the bytes of C-contiguous float64 arrays laid out like the
+    /// output of `get_sphere_data` and `get_material_data`.
+    #[staticmethod]
+    pub fn from_data(sphere_data: &[u8], material_data: &[u8]) -> PyResult<Self> {
+        let spheres = f64_rows(sphere_data, 4, "sphere_data")?;
+        let materials = f64_rows(material_data, 5, "material_data")?;
+        if spheres.len() / 4 != materials.len() / 5 {
+            return Err(PyValueError::new_err(
+                "sphere_data and material_data must have the same number of rows",
+            ));
         }
 
-        data
+        let materials = materials
+            .chunks_exact(5)
+            .map(material_from_data)
+            .collect::<PyResult<Vec<_>>>()?;
+        let centers: Vec<f64> = spheres
+            .chunks_exact(4)
+            .flat_map(|s| [s[0], s[1], s[2]])
+            .collect();
+        let radii: Vec<f64> = spheres.chunks_exact(4).map(|s| s[3]).collect();
+
+        let mut world = Self::default();
+        world.extend(&centers, &radii, materials);
+        Ok(world)
+    }
+
+    /// Sphere array `[center_x, center_y, center_z, radius]` per sphere, as
+    /// the bytes of a float64 array.
+    fn get_sphere_data<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, PyByteArray>> {
+        let s = &self.spheres;
+        f64_bytearray(
+            py,
+            4 * s.len(),
+            (0..s.len()).flat_map(|k| [s.x[k], s.y[k], s.z[k], s.r[k]]),
+        )
+    }
+
+    /// Material array (see `Material::to_data`) per sphere, as the bytes of a
+    /// float64 array.
+    fn get_material_data<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, PyByteArray>> {
+        f64_bytearray(
+            py,
+            5 * self.spheres.len(),
+            self.spheres
+                .material
+                .iter()
+                .flat_map(|&material| self.materials[material].to_data()),
+        )
+    }
+
+    /// Export the BVH (built first if needed) as flat arrays.
+    ///
+    /// Returns the bytes of the float64 node bounds `[min_x, min_y, min_z,
+    /// max_x, max_y, max_z]`, the int64 node links `[offset, count, axis]` and
+    /// the int64 sphere order. Leaves refer to positions in the sphere order,
+    /// see `bvh.rs` for the layout.
+    #[allow(clippy::type_complexity)]
+    fn get_bvh_data<'py>(
+        &mut self,
+        py: Python<'py>,
+    ) -> PyResult<(
+        Bound<'py, PyByteArray>,
+        Bound<'py, PyByteArray>,
+        Bound<'py, PyByteArray>,
+    )> {
+        let bvh = self.bvh.get_or_insert_with(|| Bvh::build(&self.spheres));
+        let bounds = f64_bytearray(
+            py,
+            6 * bvh.nodes.len(),
+            bvh.nodes.iter().flat_map(|node| {
+                let (min, max) = (node.bounds.min, node.bounds.max);
+                [min.x, min.y, min.z, max.x, max.y, max.z]
+            }),
+        )?;
+        let links = i64_bytearray(
+            py,
+            3 * bvh.nodes.len(),
+            bvh.nodes
+                .iter()
+                .flat_map(|node| [node.offset, node.count, node.axis]),
+        )?;
+        let order = i64_bytearray(py, bvh.indices.len(), bvh.indices.iter().copied())?;
+
+        Ok((bounds, links, order))
     }
 }
 
-impl Hittable for HittableList {
-    fn hit(&self, r: &Ray, t_min: f64, t_max: f64) -> Option<HitRecord> {
-        let mut rec: Option<HitRecord> = None;
-        let mut closest_so_far = t_max;
-
-        for object in self.objects.iter() {
-            if let Some(temp_rec) = object.hit(r, t_min, closest_so_far) {
-                closest_so_far = temp_rec.t;
-                rec = Some(temp_rec);
-            }
+impl HittableList {
+    /// Append spheres given as flat center triples, radii and materials.
+    fn extend(&mut self, centers: &[f64], radii: &[f64], materials: Vec<Material>) {
+        let first = self.materials.len();
+        for (k, (center, &radius)) in centers.chunks_exact(3).zip(radii).enumerate() {
+            let center = Point3::from([center[0], center[1], center[2]]);
+            self.spheres.push(center, radius, first + k);
         }
+        self.materials.extend(materials);
+        // The hierarchy no longer covers every object
+        self.bvh = None;
+    }
+}
+
+fn material_from_data(data: &[f64]) -> PyResult<Material> {
+    Material::from_data(data)
+        .ok_or_else(|| PyValueError::new_err(format!("unknown material type {}", data[0])))
+}
 
-        rec
+impl Hittable for HittableList {
+    fn hit(&self, r: &Ray, t_min: f64, t_max: f64) -> Option<HitRecord> {
+        // Only the closest sphere gets a full hit record
+        let spheres = match &self.bvh {
+            Some(bvh) => &bvh.spheres,
+            None => &self.spheres,
+        };
+        let (k, t) = match &self.bvh {
+            Some(bvh) => bvh.hit(r, t_min, t_max),
+            None => spheres.hit(r, 0, spheres.len(), t_min, t_max),
+        }?;
+
+        Some(spheres.hit_record(r, k, t, self.materials[spheres.material[k]]))
     }
 }
@@ -1,11 +1,15 @@
 use pyo3::prelude::*;
 
+mod bvh;
 mod camera;
 mod color;
 mod hittable;
 mod hittable_list;
 mod material;
 mod ray;
+mod render;
+mod rng;
+mod sampler;
 mod sphere;
 mod utils;
 mod vec3;
@@ -21,7 +25,10 @@ fn _core(m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_class::<ray::Ray>()?;
     m.add_class::<vec3::Vec3>()?;
     m.add_function(wrap_pyfunction!(color::get_color, m)?)?;
-    m.add_function(wrap_pyfunction!(color::ray_color, m)?)?;
+    m.add_function(wrap_pyfunction!(color::py_ray_color, m)?)?;
+    m.add_function(wrap_pyfunction!(render::render, m)?)?;
+    m.add_function(wrap_pyfunction!(render::render_pixel_list, m)?)?;
+    m.add_function(wrap_pyfunction!(rng::seed_rng, m)?)?;
     m.add_function(wrap_pyfunction!(utils::random_double, m)?)?;
     m.add_function(wrap_pyfunction!(vec3::unit_vector, m)?)?;
 
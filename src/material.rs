@@ -2,13 +2,13 @@ use pyo3::prelude::*;
 
 use crate::{
     hittable::HitRecord,
-    random_double,
     ray::Ray,
+    rng::Rng,
     vec3::{dot, random_in_unit_sphere, random_unit_vector, reflect, refract, unit_vector, Color},
 };
 
 pub trait Scatter {
-    fn scatter(self, r_in: &Ray, rec: HitRecord) -> Option<(Ray, Color)>;
+    fn scatter(self, r_in: &Ray, rec: HitRecord, rng: &mut Rng) -> Option<(Ray, Color)>;
 }
 
 #[derive(Copy, Clone)]
@@ -30,14 +30,38 @@ impl Material {
     pub fn new_dielectric(ref_idx: f64) -> Self {
         Material::Dielectric(Dielectric { ref_idx })
     }
+
+    /// Row of the material array: `[type, param1, param2, param3, param4]`.
+    ///
+    /// Type 0: Lambertian `[0, albedo_r, albedo_g, albedo_b, unused]`
+    /// Type 1: Metal `[1, albedo_r, albedo_g, albedo_b, fuzz]`
+    /// Type 2: Dielectric `[2, ref_idx, unused, unused, unused]`
+    pub fn to_data(self) -> [f64; 5] {
+        match self {
+            Material::Lambertian(m) => [0.0, m.albedo.x, m.albedo.y, m.albedo.z, 0.0],
+            Material::Metal(m) => [1.0, m.albedo.x, m.albedo.y, m.albedo.z, m.fuzz],
+            Material::Dielectric(m) => [2.0, m.ref_idx, 0.0, 0.0, 0.0],
+        }
+    }
+
+    /// Inverse of `to_data`, `None` for an unknown material type.
+    pub fn from_data(data: &[f64]) -> Option<Self> {
+        let albedo = Color::from([data[1], data[2], data[3]]);
+        match data[0] {
+            t if t == 0.0 => Some(Self::new_lambertian(albedo)),
+            t if t == 1.0 => Some(Self::new_metal(albedo, data[4])),
+            t if t == 2.0 => Some(Self::new_dielectric(data[1])),
+            _ => None,
+        }
+    }
 }
 
 impl Scatter for Material {
-    fn scatter(self, r_in: &Ray, rec: HitRecord) -> Option<(Ray, Color)> {
+    fn scatter(self, r_in: &Ray, rec: HitRecord, rng: &mut Rng) -> Option<(Ray, Color)> {
         match self {
-            Material::Lambertian(m) => m.scatter(r_in, rec),
-            Material::Metal(m) => m.scatter(r_in, rec),
-            Material::Dielectric(m) => m.scatter(r_in, rec),
+            Material::Lambertian(m) => m.scatter(r_in, rec, rng),
+            Material::Metal(m) => m.scatter(r_in, rec, rng),
+            Material::Dielectric(m) => m.scatter(r_in, rec, rng),
         }
     }
 }
@@ -57,8 +81,8 @@ impl Lambertian {
 }
 
 impl Scatter for Lambertian {
-    fn scatter(self, _r_in: &Ray, rec: HitRecord) -> Option<(Ray, Color)> {
-        let scatter_direction = rec.normal + random_unit_vector();
+    fn scatter(self, _r_in: &Ray, rec: HitRecord, rng: &mut Rng) -> Option<(Ray, Color)> {
+        let scatter_direction = rec.normal + random_unit_vector(rng);
         let scattered = Ray {
             origin: rec.p,
             direction: scatter_direction,
@@ -87,11 +111,11 @@ impl Metal {
 }
 
 impl Scatter for Metal {
-    fn scatter(self, r_in: &Ray, rec: HitRecord) -> Option<(Ray, Color)> {
+    fn scatter(self, r_in: &Ray, rec: HitRecord, rng: &mut Rng) -> Option<(Ray, Color)> {
         let reflected = reflect(unit_vector(r_in.direction), rec.normal);
         let scattered = Ray {
             origin: rec.p,
-            direction: reflected + self.fuzz * random_in_unit_sphere(),
+            direction: reflected + self.fuzz * random_in_unit_sphere(rng),
         };
         let attenuation = self.albedo;
         if dot(&scattered.direction, &rec.normal) > 0.0 {
@@ -117,7 +141,7 @@ impl Dielectric {
 }
 
 impl Scatter for Dielectric {
-    fn scatter(self, r_in: &Ray, rec: HitRecord) -> Option<(Ray, Color)> {
+    fn scatter(self, r_in: &Ray, rec: HitRecord, rng: &mut Rng) -> Option<(Ray, Color)> {
         let attenuation = Color::from([1.0, 1.0, 1.0]);
         let etai_over_etat = if rec.front_face {
             1.0 / self.ref_idx
@@ -128,7 +152,7 @@ impl Scatter for Dielectric {
         let cos_theta = f64::min(dot(&-unit_direction, &rec.normal), 1.0);
         let sin_theta = f64::sqrt(1.0 - cos_theta.powi(2));
         let scattered = if etai_over_etat * sin_theta > 1.0
-            || random_double!() < schlick(cos_theta, etai_over_etat)
+            || rng.next_f64() < schlick(cos_theta, etai_over_etat)
         {
             let reflected = reflect(unit_direction, rec.normal);
             Ray {
@@ -0,0 +1,3 @@
+from rayt.api import render
+
+__all__ = ["render"]
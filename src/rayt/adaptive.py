@@ -0,0 +1,114 @@
+"""Adaptive sampling driven by per-pixel variance estimates.
+
+Pixels are sampled in passes. After every pass each pixel's running mean and
+variance give the standard error of its displayed value, and pixels whose
+error is below the noise threshold stop receiving samples. The samples they
+leave unused go to the pixels that are still noisy.
+
+Every pixel that is still sampled takes part in every pass, so all of them
+have taken the same number of samples so far. A pass therefore traces one
+range of sample indices, and a pixel's samples are the same samples that a
+uniform render would have traced first.
+"""
+
+import sys
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+# Pixels are never retired before taking this many samples.
+DEFAULT_MIN_SAMPLES = 16
+
+# No pixel takes more than this many times the average samples per pixel.
+DEFAULT_MAX_SAMPLES_FACTOR = 8
+
+# Traces samples sample_offset to sample_offset + samples - 1 of the listed
+# pixels (numbered row by row from the top-left corner) and returns their
+# sums and sums of squares as an (n, 2, 3) array.
+RenderPixelList = Callable[[npt.NDArray[np.int64], int, int], npt.NDArray[np.float64]]
+
+
+@dataclass(frozen=True)
+class AdaptiveSampling:
+    """Settings of an adaptive render.
+
+    ``noise_threshold`` is the standard error, in displayed intensity units
+    (gamma-corrected, 0 to 1), below which a pixel counts as converged.
+    """
+
+    noise_threshold: float = 0.01
+    min_samples: int = DEFAULT_MIN_SAMPLES
+    max_samples_factor: int = DEFAULT_MAX_SAMPLES_FACTOR
+
+
+def display_error(
+    sums: npt.NDArray[np.float64], samples: int
+) -> npt.NDArray[np.float64]:
+    """Standard error of the displayed value of pixels from their (n, 2, 3)
+    sample sums and sums of squares, the largest over the color channels"""
+    mean = sums[:, 0] / samples
+    variance = np.maximum(sums[:, 1] / samples - mean * mean, 0.0)
+    variance *= samples / max(samples - 1, 1)
+    standard_error = np.sqrt(variance / samples)
+
+    # Displayed values are the clamped square root of the mean
+    low = np.sqrt(np.clip(mean, 0.0, 1.0))
+    high = np.sqrt(np.clip(mean + standard_error, 0.0, 1.0))
+    return (high - low).max(axis=1)
+
+
+def render_adaptive(
+    render_pixel_list: RenderPixelList,
+    image_width: int,
+    image_height: int,
+    samples_per_pixel: int,
+    settings: AdaptiveSampling,
+) -> npt.NDArray[np.float64]:
+    """Render a frame with a budget of ``samples_per_pixel`` samples per pixel
+    on average.
+
+    Returns an (image_height, image_width, 3) framebuffer scaled like a
+    uniform render: each pixel holds its mean times ``samples_per_pixel``.
+    """
+    n_pixels = image_width * image_height
+    budget = n_pixels * samples_per_pixel
+    max_samples = settings.max_samples_factor * samples_per_pixel
+
+    sums = np.zeros((n_pixels, 2, 3), dtype=np.float64)
+    counts = np.zeros(n_pixels, dtype=np.int64)
+    pixels = np.arange(n_pixels, dtype=np.int64)
+    sample_offset = 0
+    samples = min(settings.min_samples, samples_per_pixel)
+
+    while pixels.shape[0] > 0 and samples > 0:
+        sums[pixels] += render_pixel_list(pixels, sample_offset, samples)
+        counts[pixels] += samples
+        budget -= samples * pixels.shape[0]
+        sample_offset += samples
+
+        error = display_error(sums[pixels], sample_offset)
+        noisy = error > settings.noise_threshold
+        pixels, error = pixels[noisy], error[noisy]
+        print(
+            f"\rAdaptive sampling: {pixels.shape[0]} noisy pixels after "
+            f"{sample_offset} samples",
+            end=" ",
+            file=sys.stderr,
+        )
+
+        # Double the samples of the remaining pixels, and when the budget
+        # cannot cover all of them, spend it on the noisiest ones
+        samples = min(sample_offset, max_samples - sample_offset)
+        affordable = budget // samples if samples > 0 else 0
+        if affordable < pixels.shape[0]:
+            pixels = pixels[np.argsort(-error, kind="stable")[:affordable]]
+            pixels.sort()
+
+    print(
+        f"\nAverage samples per pixel: {counts.mean():.1f} of {samples_per_pixel}",
+        file=sys.stderr,
+    )
+    mean = sums[:, 0] / np.maximum(counts, 1)[:, np.newaxis]
+    return (samples_per_pixel * mean).reshape(image_height, image_width, 3)
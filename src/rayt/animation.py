@@ -0,0 +1,414 @@
+"""Rendering many frames of one scene in a single process.
+
+A ``CameraPath`` moves the camera along keyframes of ``lookfrom``,
+``lookat`` and ``vfov``: positions follow a Catmull-Rom spline through the
+keyframes and the field of view changes linearly between them. The camera
+focuses on ``lookat``.
+
+A ``FrameRenderer`` keeps everything but the camera on its engine from one
+frame to the next: the scene arrays in BVH order, the BVH (on the GPU for the
+``cuda`` engine) and the compiled kernels. ``render_animation`` sets up the
+camera of the next frame and writes out the previous one on a background
+thread while the current frame is traced; all engines trace with the GIL
+released.
+"""
+
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from rayt.sampling import sampler_parameters
+from rayt.scene_data import bvh_arrays, camera_array, material_array, sphere_array
+from rayt_rust._core import Camera, HittableList, Point3, Vec3
+
+ANIMATION_ENGINES = ("numba", "cuda", "rust")
+
+# Lens aperture of the cameras of a path
+DEFAULT_APERTURE = 0.1
+
+# Threads per block side of the cuda engine, as in CudaRenderer
+CUDA_BLOCK_SIZE = (16, 16)
+
+
+@dataclass(frozen=True)
+class Keyframe:
+    """Camera position, target and vertical field of view at a frame"""
+
+    frame: float
+    lookfrom: tuple[float, float, float]
+    lookat: tuple[float, float, float]
+    vfov: float
+
+
+@dataclass(frozen=True)
+class CameraPath:
+    """Keyframes of a camera, in frame order"""
+
+    keyframes: tuple[Keyframe, ...]
+    aperture: float = DEFAULT_APERTURE
+
+    def __post_init__(self) -> None:
+        if not self.keyframes:
+            raise ValueError("a camera path needs at least one keyframe")
+        frames = [keyframe.frame for keyframe in self.keyframes]
+        if any(b <= a for a, b in itertools.pairwise(frames)):
+            raise ValueError("keyframes must be in increasing frame order")
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str]) -> "CameraPath":
+        """Read a camera path from a JSON file such as::
+
+        {"aperture": 0.1, "keyframes": [
+            {"frame": 0, "lookfrom": [13, 2, 3], "lookat": [0, 0, 0], "vfov": 20},
+            {"frame": 48, "lookfrom": [3, 2, 13], "lookat": [0, 1, 0], "vfov": 30}
+        ]}
+        """
+        with open(path) as stream:
+            data = json.load(stream)
+        try:
+            keyframes = tuple(
+                Keyframe(
+                    float(keyframe["frame"]),
+                    _point(keyframe["lookfrom"]),
+                    _point(keyframe["lookat"]),
+                    float(keyframe["vfov"]),
+                )
+                for keyframe in data["keyframes"]
+            )
+            return cls(keyframes, float(data.get("aperture", DEFAULT_APERTURE)))
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"{path} is not a camera path: {e!r}") from e
+
+    @classmethod
+    def turntable(
+        cls,
+        frames: int,
+        lookfrom: tuple[float, float, float],
+        lookat: tuple[float, float, float],
+        vfov: float,
+        aperture: float = DEFAULT_APERTURE,
+    ) -> "CameraPath":
+        """One orbit of ``lookfrom`` around the vertical axis through
+        ``lookat`` in ``frames`` frames, which loop seamlessly"""
+        x, y, z = (a - b for a, b in zip(lookfrom, lookat))
+        keyframes = []
+        for frame in range(frames + 1):
+            angle = 2.0 * math.pi * frame / frames
+            cos, sin = math.cos(angle), math.sin(angle)
+            position = (
+                lookat[0] + cos * x + sin * z,
+                lookat[1] + y,
+                lookat[2] - sin * x + cos * z,
+            )
+            keyframes.append(Keyframe(frame, position, lookat, vfov))
+        return cls(tuple(keyframes), aperture)
+
+    @property
+    def frames(self) -> range:
+        """Frames from the first keyframe to the last"""
+        return range(
+            math.ceil(self.keyframes[0].frame), math.floor(self.keyframes[-1].frame) + 1
+        )
+
+    def camera(self, frame: float, aspect_ratio: float) -> Camera:
+        """The camera at ``frame``, held at the first and last keyframes
+        outside of the path"""
+        keyframes = self.keyframes
+        if frame <= keyframes[0].frame or len(keyframes) == 1:
+            lookfrom, lookat, vfov = (
+                keyframes[0].lookfrom,
+                keyframes[0].lookat,
+                keyframes[0].vfov,
+            )
+        elif frame >= keyframes[-1].frame:
+            lookfrom, lookat, vfov = (
+                keyframes[-1].lookfrom,
+                keyframes[-1].lookat,
+                keyframes[-1].vfov,
+            )
+        else:
+            k = max(
+                i for i, keyframe in enumerate(keyframes) if keyframe.frame <= frame
+            )
+            # Neighbors of the segment, repeating the ends
+            p0, p1, p2, p3 = (
+                keyframes[max(k - 1, 0)],
+                keyframes[k],
+                keyframes[k + 1],
+                keyframes[min(k + 2, len(keyframes) - 1)],
+            )
+            u = (frame - p1.frame) / (p2.frame - p1.frame)
+            lookfrom = _catmull_rom(
+                p0.lookfrom, p1.lookfrom, p2.lookfrom, p3.lookfrom, u
+            )
+            lookat = _catmull_rom(p0.lookat, p1.lookat, p2.lookat, p3.lookat, u)
+            vfov = p1.vfov + u * (p2.vfov - p1.vfov)
+
+        return Camera(
+            lookfrom=Point3(*lookfrom),
+            lookat=Point3(*lookat),
+            vup=Vec3(0, 1, 0),
+            vfov=vfov,
+            aspect_ratio=aspect_ratio,
+            aperture=self.aperture,
+            focus_dist=math.dist(lookfrom, lookat),
+        )
+
+
+def _point(values: Sequence[float]) -> tuple[float, float, float]:
+    x, y, z = values
+    return float(x), float(y), float(z)
+
+
+def _catmull_rom(
+    p0: Sequence[float],
+    p1: Sequence[float],
+    p2: Sequence[float],
+    p3: Sequence[float],
+    u: float,
+) -> tuple[float, float, float]:
+    """Point at ``u`` in [0, 1] of the uniform Catmull-Rom segment from
+    ``p1`` to ``p2``"""
+    u2 = u * u
+    u3 = u2 * u
+    x, y, z = (
+        0.5
+        * (
+            2.0 * b
+            + (c - a) * u
+            + (2.0 * a - 5.0 * b + 4.0 * c - d) * u2
+            + (3.0 * b - a - 3.0 * c + d) * u3
+        )
+        for a, b, c, d in zip(p0, p1, p2, p3)
+    )
+    return x, y, z
+
+
+class FrameRenderer:
+    """Renders frames of one scene from different cameras with one of
+    ``ANIMATION_ENGINES``, keeping the scene and the compiled kernels between
+    frames.
+
+    ``prepare`` turns a camera into the engine's input, which ``render``
+    traces; preparing the next frame can run on another thread while
+    ``render`` traces the current one.
+    """
+
+    def __init__(
+        self,
+        world: HittableList,
+        engine: str,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        seed: int,
+        roulette_depth: int | None = None,
+        sampler: str = "random",
+    ) -> None:
+        if engine not in ANIMATION_ENGINES:
+            raise ValueError(
+                f"animations run the {', '.join(ANIMATION_ENGINES)} engines, "
+                f"got {engine!r}"
+            )
+        self.engine = engine
+        self.world = world
+        self.image_width = image_width
+        self.image_height = image_height
+        self.samples_per_pixel = samples_per_pixel
+        self.max_depth = max_depth
+        self.roulette_depth = max_depth if roulette_depth is None else roulette_depth
+        self.seed = seed
+        self.sampler = sampler
+        self.sampler_code, self.strata = sampler_parameters(sampler, samples_per_pixel)
+
+        if engine == "rust":
+            # Ray queries walk a bounding volume hierarchy instead of every sphere
+            if not world.has_bvh:
+                world.build_bvh()
+            return
+
+        bvh_bounds, bvh_links, order = bvh_arrays(world)
+        # Spheres, materials and BVH, in kernel argument order after the camera
+        self.scene: tuple[Any, ...] = (
+            np.ascontiguousarray(sphere_array(world)[order]),
+            np.ascontiguousarray(material_array(world)[order]),
+            bvh_bounds,
+            bvh_links,
+        )
+        if engine == "cuda":
+            from numba import cuda
+
+            from rayt.cuda_optimized import compile_kernels
+
+            cuda.select_device(0)
+            self.scene = tuple(cuda.to_device(array) for array in self.scene)
+        else:
+            from rayt.numba_optimized import compile_kernels
+        compile_kernels()
+
+    def prepare(self, camera: Camera) -> Any:
+        """The engine's input for a frame seen from ``camera``: the camera
+        array, on the GPU for ``cuda``, or the camera itself for ``rust``"""
+        match self.engine:
+            case "rust":
+                return camera
+            case "cuda":
+                from numba import cuda
+
+                return cuda.to_device(camera_array(camera))
+            case _:
+                return camera_array(camera)
+
+    def render(self, camera: Any) -> npt.NDArray[np.float64]:
+        """Trace the frame of a prepared camera and return its
+        (image_height, image_width, 3) framebuffer of sample sums"""
+        shape = (self.image_height, self.image_width, 3)
+        match self.engine:
+            case "rust":
+                from rayt_rust._core import render
+
+                return np.frombuffer(
+                    render(
+                        self.world,
+                        camera,
+                        self.image_width,
+                        self.image_height,
+                        self.samples_per_pixel,
+                        self.max_depth,
+                        self.seed,
+                        threads=os.cpu_count() or 1,
+                        roulette_depth=self.roulette_depth,
+                        sampler=self.sampler,
+                        strata=self.strata,
+                    ),
+                    dtype=np.float64,
+                ).reshape(shape)
+            case "cuda":
+                from numba import cuda
+
+                from rayt.cuda_optimized import render_pixels_cuda
+
+                grid_size = (
+                    (self.image_width + CUDA_BLOCK_SIZE[0] - 1) // CUDA_BLOCK_SIZE[0],
+                    (self.image_height + CUDA_BLOCK_SIZE[1] - 1) // CUDA_BLOCK_SIZE[1],
+                )
+                d_output = cuda.device_array(shape, dtype=np.float64)
+                render_pixels_cuda[grid_size, CUDA_BLOCK_SIZE](
+                    self.image_width,
+                    self.image_height,
+                    self.samples_per_pixel,
+                    camera,
+                    *self.scene,
+                    self.max_depth,
+                    self.roulette_depth,
+                    self.seed,
+                    0,
+                    self.sampler_code,
+                    self.strata,
+                    d_output,
+                )
+                return d_output.copy_to_host()
+            case _:
+                from rayt.numba_optimized import render_image_numba
+
+                output = np.zeros(shape, dtype=np.float64)
+                render_image_numba(
+                    0,
+                    0,
+                    self.image_width,
+                    self.image_height,
+                    self.samples_per_pixel,
+                    camera,
+                    *self.scene,
+                    self.max_depth,
+                    self.roulette_depth,
+                    self.seed,
+                    0,
+                    self.sampler_code,
+                    self.strata,
+                    output,
+                )
+                return output
+
+
+def render_animation(
+    world: HittableList,
+    path: CameraPath,
+    frames: Sequence[int],
+    aspect_ratio: float,
+    image_width: int,
+    image_height: int,
+    samples_per_pixel: int,
+    max_depth: int,
+    seed: int,
+    write_frame: Callable[[int, npt.NDArray[np.float64]], None],
+    engine: str = "numba",
+    roulette_depth: int | None = None,
+    sampler: str = "random",
+) -> None:
+    """Render ``frames`` of a camera path and pass each frame number and
+    framebuffer of sample sums to ``write_frame``, in order.
+
+    Every frame uses the sample streams of ``seed``. ``write_frame`` runs on
+    a background thread, where the camera of the next frame is also set up,
+    while the following frame is traced.
+    """
+    print(
+        f"Rendering {len(frames)} frames of {image_width}x{image_height} with "
+        f"the {engine} engine",
+        file=sys.stderr,
+    )
+    print(
+        f"Samples per pixel: {samples_per_pixel}, Max depth: {max_depth}, Seed: {seed}",
+        file=sys.stderr,
+    )
+    renderer = FrameRenderer(
+        world,
+        engine,
+        image_width,
+        image_height,
+        samples_per_pixel,
+        max_depth,
+        seed,
+        roulette_depth,
+        sampler,
+    )
+
+    def setup(frame: int) -> Any:
+        return renderer.prepare(path.camera(frame, aspect_ratio))
+
+    if not frames:
+        return
+    with ThreadPoolExecutor(max_workers=1) as background:
+        upcoming = background.submit(setup, frames[0])
+        written: Future[None] | None = None
+        for index, frame in enumerate(frames):
+            camera = upcoming.result()
+            if index + 1 < len(frames):
+                upcoming = background.submit(setup, frames[index + 1])
+            start = time.perf_counter()
+            image = renderer.render(camera)
+            elapsed = time.perf_counter() - start
+
+            # Raise the errors of the previous write before queueing another
+            if written is not None:
+                written.result()
+            written = background.submit(write_frame, frame, image)
+            print(
+                f"Frame {frame} ({index + 1}/{len(frames)}) traced in {elapsed:.2f}s",
+                file=sys.stderr,
+            )
+        if written is not None:
+            written.result()
+    print("Done.", file=sys.stderr)
@@ -0,0 +1,162 @@
+"""Auxiliary (AOV) buffers of the first surface seen through every pixel.
+
+The AOV pass traces camera rays only, no bounces: for each of
+``AOV_SAMPLES`` Halton-placed samples per pixel it records the albedo of the
+first hit, its shading normal and the distance to it, and averages them over
+the pixel. Averaging over pixel area and lens keeps antialiased edges and
+depth of field blur consistent with the color image. Rays that miss every
+sphere record the sky color as albedo, a zero normal and a zero depth.
+
+The buffers guide the edge-aware filter of ``rayt.denoise``.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+from numba import njit, prange
+
+from rayt.numba_optimized import (
+    BVH_STACK_SIZE,
+    bvh_hit_numba,
+    get_ray_numba,
+    hit_record_numba,
+    length_numba,
+    sky_color_numba,
+)
+from rayt.sampling import HALTON_SAMPLER
+from rayt.scene_data import (
+    DIELECTRIC,
+    bvh_arrays,
+    camera_array,
+    material_array,
+    sphere_array,
+)
+from rayt_rust._core import Camera, HittableList
+
+# Camera samples averaged per pixel
+AOV_SAMPLES = 16
+
+
+@dataclass(frozen=True)
+class AOVBuffers:
+    """First-hit buffers of a frame, rows ordered from the top.
+
+    ``albedo`` and ``normal`` are (image_height, image_width, 3) arrays and
+    ``depth`` is an (image_height, image_width) array of distances from the
+    camera.
+    """
+
+    albedo: npt.NDArray[np.float64]
+    normal: npt.NDArray[np.float64]
+    depth: npt.NDArray[np.float64]
+
+
+@njit(parallel=True, cache=True)
+def render_aovs_numba(
+    image_width,
+    image_height,
+    camera_data,
+    spheres_data,
+    materials_data,
+    bvh_bounds,
+    bvh_links,
+    seed,
+    samples,
+    albedo,
+    normal,
+    depth,
+):
+    """Fill (rows, cols, 3) ``albedo`` and ``normal`` and (rows, cols)
+    ``depth`` buffers with the first-hit averages of ``samples`` camera
+    samples per pixel"""
+    scale = 1.0 / samples
+    for row in prange(image_height):
+        j = image_height - 1 - row
+        rng = np.empty(2, dtype=np.uint64)
+        stack = np.empty(BVH_STACK_SIZE, dtype=np.int64)
+        for i in range(image_width):
+            for axis in range(3):
+                albedo[row, i, axis] = 0.0
+                normal[row, i, axis] = 0.0
+            depth[row, i] = 0.0
+
+            for s in range(samples):
+                # Halton samples never draw from rng
+                ray_origin, ray_direction = get_ray_numba(
+                    i,
+                    j,
+                    image_width,
+                    image_height,
+                    camera_data,
+                    seed,
+                    s,
+                    HALTON_SAMPLER,
+                    1,
+                    rng,
+                )
+                t, sphere_idx = bvh_hit_numba(
+                    ray_origin,
+                    ray_direction,
+                    spheres_data,
+                    bvh_bounds,
+                    bvh_links,
+                    0.001,
+                    np.inf,
+                    stack,
+                )
+                if sphere_idx < 0:
+                    sky = sky_color_numba(ray_direction)
+                    for axis in range(3):
+                        albedo[row, i, axis] += scale * sky[axis]
+                    continue
+
+                _, hit_normal, _ = hit_record_numba(
+                    ray_origin, ray_direction, spheres_data, sphere_idx, t
+                )
+                depth[row, i] += scale * t * length_numba(ray_direction)
+                for axis in range(3):
+                    normal[row, i, axis] += scale * hit_normal[axis]
+                    # Glass passes light through unchanged
+                    if materials_data[sphere_idx, 0] == DIELECTRIC:
+                        albedo[row, i, axis] += scale
+                    else:
+                        albedo[row, i, axis] += (
+                            scale * materials_data[sphere_idx, 1 + axis]
+                        )
+
+
+def render_aovs(
+    world: HittableList,
+    camera: Camera,
+    image_width: int,
+    image_height: int,
+    seed: int,
+    samples: int = AOV_SAMPLES,
+) -> AOVBuffers:
+    """Render the albedo, normal and depth buffers of a frame.
+
+    ``seed`` sets the per-pixel rotation of the Halton samples, see
+    ``rayt.sampling``.
+    """
+    bvh_bounds, bvh_links, order = bvh_arrays(world)
+    aovs = AOVBuffers(
+        albedo=np.empty((image_height, image_width, 3), dtype=np.float64),
+        normal=np.empty((image_height, image_width, 3), dtype=np.float64),
+        depth=np.empty((image_height, image_width), dtype=np.float64),
+    )
+    render_aovs_numba(
+        image_width,
+        image_height,
+        camera_array(camera),
+        np.ascontiguousarray(sphere_array(world)[order]),
+        np.ascontiguousarray(material_array(world)[order]),
+        bvh_bounds,
+        bvh_links,
+        seed,
+        samples,
+        aovs.albedo,
+        aovs.normal,
+        aovs.depth,
+    )
+    return aovs
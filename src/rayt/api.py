@@ -0,0 +1,227 @@
+"""In-memory rendering API.
+
+``render`` traces a scene with any engine and returns the image as a NumPy
+array, so library callers never go through the text or image output of the
+command line tools.
+"""
+
+import secrets
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import numpy.typing as npt
+
+from rayt.adaptive import AdaptiveSampling
+from rayt.output import quantize
+from rayt.scheduler import SCHEDULER_ENGINES, render_with_scheduler
+from rayt_rust._core import Camera, HittableList
+
+if TYPE_CHECKING:
+    # Imported on use, the filter pulls in Numba
+    from rayt.denoise import Denoising
+
+ENGINES = ("numba", "wavefront", "cuda", "numpy", "rust")
+
+
+def _engine_function(engine: str) -> Callable[..., npt.NDArray[np.float64]]:
+    """The ``render_with_*`` function of an engine, imported on first use"""
+    match engine:
+        case "cuda":
+            from rayt.cuda_renderer import render_with_cuda
+
+            return render_with_cuda
+        case "numba":
+            from rayt.numba_renderer import render_with_numba
+
+            return render_with_numba
+        case "wavefront":
+            from rayt.wavefront_renderer import render_with_wavefront
+
+            return render_with_wavefront
+        case "numpy":
+            from rayt.numpy_renderer import render_with_numpy
+
+            return render_with_numpy
+        case "rust":
+            from rayt.rust_renderer import render_with_rust
+
+            return render_with_rust
+        case _:
+            raise ValueError(
+                f"unknown engine {engine!r}, expected one of {', '.join(ENGINES)}"
+            )
+
+
+def engine_renderer(engine: str) -> Any:
+    """A new renderer object of an engine, imported on first use.
+
+    Its ``prepare(world, camera)`` sets up a scene once and
+    ``render_frame(image_width, image_height, samples_per_pixel, max_depth,
+    roulette_depth, seed, sample_offset, sampler, strata)`` then renders any
+    number of sample ranges of it, ``sampler`` being an index into
+    ``rayt.sampling.SAMPLERS``.
+    """
+    match engine:
+        case "cuda":
+            from rayt.cuda_renderer import CudaRenderer
+
+            return CudaRenderer()
+        case "numba":
+            from rayt.numba_renderer import NumbaRenderer
+
+            return NumbaRenderer()
+        case "wavefront":
+            from rayt.wavefront_renderer import WavefrontRenderer
+
+            return WavefrontRenderer()
+        case "numpy":
+            from rayt.numpy_renderer import NumpyRenderer
+
+            return NumpyRenderer()
+        case "rust":
+            from rayt.rust_renderer import RustRenderer
+
+            return RustRenderer()
+        case _:
+            raise ValueError(
+                f"unknown engine {engine!r}, expected one of {', '.join(ENGINES)}"
+            )
+
+
+def render_samples(
+    world: HittableList,
+    camera: Camera,
+    image_width: int,
+    image_height: int,
+    samples_per_pixel: int,
+    max_depth: int,
+    seed: int,
+    engine: str = "numba",
+    adaptive: AdaptiveSampling | None = None,
+    roulette_depth: int | None = None,
+    sampler: str = "random",
+    denoise: "Denoising | None" = None,
+    workers: int | None = None,
+    sample_offset: int = 0,
+    strata: int | None = None,
+) -> npt.NDArray[np.float64]:
+    """Render a frame and return the sum of the samples of every pixel.
+
+    This is the raw (image_height, image_width, 3) float64 framebuffer that
+    ``rayt.output.write_image`` takes, with rows ordered from the top. With
+    ``adaptive`` settings, pixels take different numbers of samples and each
+    holds its mean times ``samples_per_pixel``. Paths that bounced
+    ``roulette_depth`` times go through Russian roulette, which is off when it
+    is not given. ``sampler`` places camera samples, one of
+    ``rayt.sampling.SAMPLERS``. With ``denoise`` settings the frame goes
+    through the edge-aware filter of ``rayt.denoise``, guided by the AOV
+    buffers of ``rayt.aov``. With ``workers``, the frame is split into tiles
+    rendered on that many processes by ``rayt.scheduler``, which runs the
+    ``numba`` and ``rust`` engines without adaptive sampling.
+
+    ``sample_offset`` and ``strata`` render samples ``sample_offset`` on of a
+    larger render with ``strata`` strata per side (see
+    ``rayt.sampling.sampler_parameters``), as ``rayt.checkpoint`` does in
+    passes. A render with a sample offset cannot be adaptive.
+    """
+    if sample_offset and adaptive is not None:
+        raise ValueError("adaptive sampling starts from the first sample")
+    if workers is not None:
+        if engine not in SCHEDULER_ENGINES or adaptive is not None:
+            raise ValueError(
+                "workers need the numba or rust engine and no adaptive sampling"
+            )
+        image = render_with_scheduler(
+            world,
+            camera,
+            image_width,
+            image_height,
+            samples_per_pixel,
+            max_depth,
+            seed,
+            roulette_depth,
+            sampler,
+            engine,
+            workers,
+            sample_offset,
+            strata,
+        )
+    else:
+        render_func = _engine_function(engine)
+        image = render_func(
+            world,
+            camera,
+            image_width,
+            image_height,
+            samples_per_pixel,
+            max_depth,
+            seed,
+            adaptive,
+            roulette_depth,
+            sampler,
+            sample_offset,
+            strata,
+        )
+    if denoise is not None:
+        from rayt.aov import render_aovs
+        from rayt.denoise import denoise_image
+
+        aovs = render_aovs(world, camera, image_width, image_height, seed)
+        image = denoise_image(image, samples_per_pixel, aovs, denoise)
+    return image
+
+
+def render(
+    world: HittableList,
+    camera: Camera,
+    image_width: int,
+    image_height: int,
+    samples_per_pixel: int = 20,
+    max_depth: int = 50,
+    *,
+    engine: str = "numba",
+    seed: int | None = None,
+    dtype: npt.DTypeLike = np.float32,
+    adaptive: AdaptiveSampling | None = None,
+    roulette_depth: int | None = None,
+    sampler: str = "random",
+    denoise: "Denoising | None" = None,
+    workers: int | None = None,
+) -> npt.NDArray[np.float32] | npt.NDArray[np.uint8]:
+    """Render a frame and return it as an (image_height, image_width, 3) array.
+
+    With ``dtype=np.float32`` (the default) the array holds the average linear
+    radiance of every pixel, without gamma correction or clamping. With
+    ``dtype=np.uint8`` it holds the gamma-corrected 8-bit pixels that the
+    image writers produce. ``seed`` selects the sample streams, a random one
+    is used when it is not given. ``adaptive`` turns on adaptive sampling,
+    with ``samples_per_pixel`` as the average budget, see ``rayt.adaptive``.
+    ``roulette_depth`` turns on Russian roulette and ``sampler`` selects the
+    camera sampler, see ``render_samples``. ``denoise`` filters the noise out
+    of the frame, see ``rayt.denoise``.
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.uint8):
+        raise ValueError(f"dtype must be float32 or uint8, got {dtype}")
+    if seed is None:
+        seed = secrets.randbits(63)
+
+    image = render_samples(
+        world,
+        camera,
+        image_width,
+        image_height,
+        samples_per_pixel,
+        max_depth,
+        seed,
+        engine,
+        adaptive,
+        roulette_depth,
+        sampler,
+        denoise,
+        workers,
+    )
+    if dtype == np.uint8:
+        return quantize(image, samples_per_pixel)
+    return (image / samples_per_pixel).astype(np.float32)
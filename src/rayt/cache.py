@@ -0,0 +1,154 @@
+"""Content-addressed disk cache of rendered frames.
+
+An entry is a ``rayt.checkpoint`` file named after a digest of everything that
+fixes the sample streams of a frame: the camera, sphere and material arrays,
+the resolution, the maximum and roulette depths, the sampler and the seed.
+The sample count is not part of the key. A request for at most the samples
+an entry holds is answered from the entry alone, and a request for more
+renders only the missing samples, continuing the entry's streams, and adds
+them to it.
+
+Entries are touched on every use and the least recently used ones are
+deleted once the cache grows over its size limit.
+"""
+
+import hashlib
+import os
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from rayt.checkpoint import Checkpoint, render_with_checkpoints, scene_digest
+from rayt.sampling import SAMPLERS
+from rayt_rust._core import Camera, HittableList
+
+# Bytes of cache entries kept on disk
+DEFAULT_CACHE_SIZE = 1 << 30
+
+ENTRY_SUFFIX = ".ckpt"
+
+
+class RenderCache:
+    """Cache of frames in ``directory``, holding at most ``max_bytes`` of
+    entries"""
+
+    def __init__(
+        self, directory: str | os.PathLike[str], max_bytes: int = DEFAULT_CACHE_SIZE
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(
+        self,
+        world: HittableList,
+        camera: Camera,
+        image_width: int,
+        image_height: int,
+        max_depth: int,
+        seed: int,
+        roulette_depth: int | None = None,
+        sampler: str = "random",
+    ) -> Path:
+        """File of the entry of a frame"""
+        if roulette_depth is None:
+            roulette_depth = max_depth
+        key = hashlib.blake2b(scene_digest(world, camera), digest_size=16)
+        key.update(
+            struct.pack(
+                "<IIIIQI",
+                image_width,
+                image_height,
+                max_depth,
+                roulette_depth,
+                seed,
+                SAMPLERS.index(sampler),
+            )
+        )
+        return self.directory / (key.hexdigest() + ENTRY_SUFFIX)
+
+    def render(
+        self,
+        world: HittableList,
+        camera: Camera,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        seed: int,
+        engine: str = "numba",
+        roulette_depth: int | None = None,
+        sampler: str = "random",
+        workers: int | None = None,
+    ) -> npt.NDArray[np.float64]:
+        """Render a frame through the cache and return its framebuffer of
+        sample sums, like ``rayt.api.render_samples``.
+
+        An entry with more samples than asked for is returned whole, each
+        pixel holding its mean times ``samples_per_pixel``.
+        """
+        path = self.path(
+            world,
+            camera,
+            image_width,
+            image_height,
+            max_depth,
+            seed,
+            roulette_depth,
+            sampler,
+        )
+        checkpoint = None
+        if path.exists():
+            try:
+                checkpoint = Checkpoint.load(path)
+            except ValueError:
+                print(f"Discarding damaged cache entry {path}", file=sys.stderr)
+            else:
+                print(
+                    f"Cache hit: {checkpoint.samples} samples per pixel in {path}",
+                    file=sys.stderr,
+                )
+
+        if checkpoint is None or checkpoint.samples < samples_per_pixel:
+            checkpoint = render_with_checkpoints(
+                world,
+                camera,
+                image_width,
+                image_height,
+                samples_per_pixel,
+                max_depth,
+                seed,
+                path,
+                engine,
+                roulette_depth,
+                sampler,
+                workers,
+                checkpoint,
+            )
+        else:
+            path.touch()
+        self.evict(keep=path)
+        return checkpoint.framebuffer * (samples_per_pixel / checkpoint.samples)
+
+    def evict(self, keep: Path | None = None) -> None:
+        """Delete the least recently used entries, except ``keep``, until the
+        cache holds at most ``max_bytes``"""
+        entries = []
+        for path in self.directory.glob("*" + ENTRY_SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
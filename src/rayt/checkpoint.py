@@ -0,0 +1,330 @@
+"""Checkpoints of long renders.
+
+A checkpoint holds the framebuffer of sample sums of a render in progress,
+the number of samples every pixel has taken and the settings that fix the
+sample streams. Every sample draws from its own random stream, keyed by the
+seed, the pixel and the sample number, so the sample count is also the
+position of every pixel's stream: a render resumed from a checkpoint traces
+exactly the samples that the interrupted render would have traced next, and
+a finished render can be resumed into more samples per pixel.
+
+The file is little-endian binary: the fields of ``HEADER``, a digest of the
+scene, the float64 sums row by row from the top, and a CRC-32 of all of it.
+It is written to a temporary file that replaces the previous checkpoint, so a
+render killed while saving leaves the last complete checkpoint in place.
+"""
+
+import hashlib
+import os
+import struct
+import sys
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+
+from rayt.api import engine_renderer
+from rayt.sampling import SAMPLERS, sampler_parameters
+from rayt.scene_data import camera_array, material_array, sphere_array
+from rayt.scheduler import SCHEDULER_ENGINES, TileScheduler
+from rayt_rust._core import Camera, HittableList
+
+MAGIC = b"RAYTCKPT"
+VERSION = 1
+
+# Magic, version, width, height, samples, seed, max depth, roulette depth,
+# sampler code and strata per side
+HEADER = struct.Struct("<8sIIIQQIIII")
+
+# Bytes of the scene digest
+DIGEST_SIZE = 16
+
+# Samples per pixel traced between two chances to save a checkpoint
+PASS_SAMPLES = 8
+
+# Seconds between checkpoints
+DEFAULT_INTERVAL = 300.0
+
+
+def scene_digest(world: HittableList, camera: Camera) -> bytes:
+    """Digest of the camera, spheres and materials of a scene"""
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for array in (camera_array(camera), sphere_array(world), material_array(world)):
+        digest.update(np.ascontiguousarray(array, dtype="<f8").tobytes())
+    return digest.digest()
+
+
+@dataclass
+class Checkpoint:
+    """A render in progress: ``framebuffer`` holds the sums of the first
+    ``samples`` samples of every pixel"""
+
+    image_width: int
+    image_height: int
+    seed: int
+    max_depth: int
+    roulette_depth: int
+    sampler: str
+    strata: int
+    scene: bytes
+    samples: int
+    framebuffer: npt.NDArray[np.float64]
+
+    @classmethod
+    def start(
+        cls,
+        world: HittableList,
+        camera: Camera,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        seed: int,
+        roulette_depth: int | None = None,
+        sampler: str = "random",
+    ) -> "Checkpoint":
+        """An empty checkpoint of a render, with the strata of
+        ``samples_per_pixel`` samples per pixel"""
+        _, strata = sampler_parameters(sampler, samples_per_pixel)
+        return cls(
+            image_width,
+            image_height,
+            seed,
+            max_depth,
+            max_depth if roulette_depth is None else roulette_depth,
+            sampler,
+            strata,
+            scene_digest(world, camera),
+            0,
+            np.zeros((image_height, image_width, 3), dtype=np.float64),
+        )
+
+    @classmethod
+    def load(cls, path: str | os.PathLike[str]) -> "Checkpoint":
+        """Read a checkpoint file, raising ``ValueError`` if it is not one or
+        it is damaged"""
+        data = Path(path).read_bytes()
+        if len(data) < HEADER.size + DIGEST_SIZE + 4 or not data.startswith(MAGIC):
+            raise ValueError(f"{path} is not a rayt checkpoint")
+        (
+            _,
+            version,
+            image_width,
+            image_height,
+            samples,
+            seed,
+            max_depth,
+            roulette_depth,
+            sampler_code,
+            strata,
+        ) = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ValueError(f"{path} has checkpoint version {version}")
+        pixels_size = image_width * image_height * 3 * 8
+        if (
+            len(data) != HEADER.size + DIGEST_SIZE + pixels_size + 4
+            or zlib.crc32(data[:-4]) != int.from_bytes(data[-4:], "little")
+            or sampler_code >= len(SAMPLERS)
+        ):
+            raise ValueError(f"{path} is damaged")
+
+        scene = data[HEADER.size : HEADER.size + DIGEST_SIZE]
+        framebuffer = np.frombuffer(
+            data,
+            dtype="<f8",
+            count=image_width * image_height * 3,
+            offset=HEADER.size + DIGEST_SIZE,
+        )
+        return cls(
+            image_width,
+            image_height,
+            seed,
+            max_depth,
+            roulette_depth,
+            SAMPLERS[sampler_code],
+            strata,
+            scene,
+            samples,
+            framebuffer.reshape(image_height, image_width, 3).astype(np.float64),
+        )
+
+    def save(self, path: str | os.PathLike[str]) -> None:
+        """Write the checkpoint file, replacing the previous one only once
+        the new one is complete"""
+        path = Path(path)
+        header = HEADER.pack(
+            MAGIC,
+            VERSION,
+            self.image_width,
+            self.image_height,
+            self.samples,
+            self.seed,
+            self.max_depth,
+            self.roulette_depth,
+            SAMPLERS.index(self.sampler),
+            self.strata,
+        )
+        pixels = np.ascontiguousarray(self.framebuffer, dtype="<f8")
+        checksum = zlib.crc32(pixels, zlib.crc32(self.scene, zlib.crc32(header)))
+
+        temporary = path.with_name(path.name + ".tmp")
+        with open(temporary, "wb") as stream:
+            stream.write(header)
+            stream.write(self.scene)
+            stream.write(pixels)
+            stream.write(checksum.to_bytes(4, "little"))
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.replace(temporary, path)
+
+    def check(
+        self,
+        world: HittableList,
+        camera: Camera,
+        image_width: int,
+        image_height: int,
+        max_depth: int,
+        seed: int,
+        roulette_depth: int | None = None,
+        sampler: str = "random",
+    ) -> None:
+        """Raise ``ValueError`` unless the checkpoint is of a render of this
+        scene with these settings"""
+        if roulette_depth is None:
+            roulette_depth = max_depth
+        settings = {
+            "image size": (
+                (self.image_width, self.image_height),
+                (image_width, image_height),
+            ),
+            "seed": (self.seed, seed),
+            "max depth": (self.max_depth, max_depth),
+            "roulette depth": (self.roulette_depth, roulette_depth),
+            "sampler": (self.sampler, sampler),
+        }
+        for name, (saved, given) in settings.items():
+            if saved != given:
+                raise ValueError(
+                    f"the checkpoint has {name} {saved}, the render has {given}"
+                )
+        if self.scene != scene_digest(world, camera):
+            raise ValueError("the checkpoint is of a different scene")
+
+
+def render_with_checkpoints(
+    world: HittableList,
+    camera: Camera,
+    image_width: int,
+    image_height: int,
+    samples_per_pixel: int,
+    max_depth: int,
+    seed: int,
+    path: str | os.PathLike[str],
+    engine: str = "numba",
+    roulette_depth: int | None = None,
+    sampler: str = "random",
+    workers: int | None = None,
+    checkpoint: Checkpoint | None = None,
+    interval: float = DEFAULT_INTERVAL,
+) -> Checkpoint:
+    """Render a frame in passes of ``PASS_SAMPLES`` samples per pixel, saving
+    a checkpoint to ``path`` once ``interval`` seconds have passed since the
+    last one and at the end.
+
+    The scene is prepared once for all passes, by the renderer of ``engine``
+    (see ``rayt.api.engine_renderer``) or, with ``workers``, by a
+    ``rayt.scheduler.TileScheduler`` whose processes stay up between passes.
+
+    Continues from ``checkpoint`` when it is given, up to
+    ``samples_per_pixel`` samples per pixel; a checkpoint that already has
+    them is returned as it is. Returns the final checkpoint, whose
+    ``framebuffer`` and ``samples`` go to ``rayt.output.write_image``.
+    """
+    if checkpoint is None:
+        checkpoint = Checkpoint.start(
+            world,
+            camera,
+            image_width,
+            image_height,
+            samples_per_pixel,
+            max_depth,
+            seed,
+            roulette_depth,
+            sampler,
+        )
+    else:
+        checkpoint.check(
+            world,
+            camera,
+            image_width,
+            image_height,
+            max_depth,
+            seed,
+            roulette_depth,
+            sampler,
+        )
+        print(
+            f"Resuming from {checkpoint.samples} samples per pixel",
+            file=sys.stderr,
+        )
+
+    if checkpoint.samples >= samples_per_pixel:
+        return checkpoint
+
+    scheduler = None
+    if workers is not None:
+        if engine not in SCHEDULER_ENGINES:
+            raise ValueError("workers need the numba or rust engine")
+        scheduler = TileScheduler(engine, workers)
+        scheduler.open(world, camera, image_width, image_height)
+    else:
+        renderer = engine_renderer(engine)
+        renderer.prepare(world, camera)
+
+    try:
+        last_save = time.monotonic()
+        while checkpoint.samples < samples_per_pixel:
+            samples = min(PASS_SAMPLES, samples_per_pixel - checkpoint.samples)
+            if scheduler is not None:
+                frame = scheduler.render_pass(
+                    samples,
+                    max_depth,
+                    seed,
+                    checkpoint.roulette_depth,
+                    sampler,
+                    checkpoint.samples,
+                    checkpoint.strata,
+                )
+            else:
+                frame = renderer.render_frame(
+                    image_width,
+                    image_height,
+                    samples,
+                    max_depth,
+                    checkpoint.roulette_depth,
+                    seed,
+                    checkpoint.samples,
+                    SAMPLERS.index(sampler),
+                    checkpoint.strata,
+                )
+            checkpoint.framebuffer += frame
+            checkpoint.samples += samples
+
+            if (
+                checkpoint.samples == samples_per_pixel
+                or time.monotonic() - last_save >= interval
+            ):
+                checkpoint.save(path)
+                last_save = time.monotonic()
+                print(
+                    f"Checkpoint: {checkpoint.samples}/{samples_per_pixel} "
+                    f"samples per pixel saved to {path}",
+                    file=sys.stderr,
+                )
+    finally:
+        if scheduler is not None:
+            scheduler.close()
+    return checkpoint
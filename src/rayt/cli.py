@@ -1,7 +1,57 @@
+import os
+import secrets
+import time
+
 import click
+import numpy as np
+import numpy.typing as npt
 
+from rayt.adaptive import AdaptiveSampling
+from rayt.animation import ANIMATION_ENGINES, CameraPath, render_animation
+from rayt.api import ENGINES, render_samples
+from rayt.cache import DEFAULT_CACHE_SIZE, RenderCache
+from rayt.checkpoint import DEFAULT_INTERVAL, Checkpoint, render_with_checkpoints
+from rayt.distributed import (
+    DEFAULT_LEASE_TIMEOUT,
+    DEFAULT_PORT,
+    Coordinator,
+    run_worker,
+)
+from rayt.output import IMAGE_FORMATS, format_from_path, write_image
+from rayt.sampling import SAMPLERS
 from rayt.scene import random_scene
-from rayt_rust._core import Camera, Vec3, Point3
+from rayt.scheduler import SCHEDULER_ENGINES
+from rayt_rust._core import Camera, HittableList, Point3, Vec3
+
+# Camera of the book cover scene
+ONE_WEEKEND_LOOKFROM = (13.0, 2.0, 3.0)
+ONE_WEEKEND_LOOKAT = (0.0, 0.0, 0.0)
+ONE_WEEKEND_VFOV = 20.0
+
+
+def _output_format(output: str, output_format: str | None) -> str:
+    """The --format value, or the format of the --output suffix"""
+    if output_format is not None:
+        return output_format
+    try:
+        return "p6" if output == "-" else format_from_path(output)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--output") from e
+
+
+def _one_weekend_scene(seed: int, aspect_ratio: float) -> tuple[HittableList, Camera]:
+    """The random scene of the book cover and its camera"""
+    world = random_scene(seed=seed)
+    camera = Camera(
+        lookfrom=Point3(*ONE_WEEKEND_LOOKFROM),
+        lookat=Point3(*ONE_WEEKEND_LOOKAT),
+        vup=Vec3(0, 1, 0),
+        vfov=ONE_WEEKEND_VFOV,
+        aspect_ratio=aspect_ratio,
+        aperture=0.1,
+        focus_dist=10.0,
+    )
+    return world, camera
 
 
 @click.command()
@@ -11,44 +61,229 @@ from rayt_rust._core import Camera, Vec3, Point3
 @click.option("--max-depth", default=50, help="Maximum ray bounce depth")
 @click.option(
     "--engine",
-    type=click.Choice(["numba", "cuda", "rust"]),
+    type=click.Choice(ENGINES),
     default="numba",
     help="Rendering engine: cpu (force CPU), gpu (force GPU)",
 )
+@click.option(
+    "--seed",
+    type=click.IntRange(min=0, max=2**63 - 1),
+    default=None,
+    help="Random seed for the scene and the sample streams (default: random)",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, writable=True, allow_dash=True),
+    default="-",
+    help="Image file (.ppm, .png or .exr) to write instead of standard output",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(IMAGE_FORMATS),
+    default=None,
+    help="Image format: binary (p6) or plain text (p3) PPM, 8-bit PNG, or "
+    "OpenEXR with the unclamped linear radiance (default: from the --output "
+    "suffix, p6 on standard output)",
+)
+@click.option(
+    "--adaptive",
+    is_flag=True,
+    help="Stop sampling pixels once they converge and spend their samples on "
+    "noisy pixels; --samples-per-pixel becomes the average budget",
+)
+@click.option(
+    "--noise-threshold",
+    type=click.FloatRange(min=0.0, min_open=True),
+    default=0.01,
+    show_default=True,
+    help="Standard error of a displayed pixel value (0 to 1) below which "
+    "--adaptive counts a pixel as converged",
+)
+@click.option(
+    "--roulette-depth",
+    type=click.IntRange(min=1),
+    default=None,
+    help="End paths at random with Russian roulette once they bounced this "
+    "many times, reweighting the survivors (default: off)",
+)
+@click.option(
+    "--sampler",
+    type=click.Choice(SAMPLERS),
+    default="random",
+    show_default=True,
+    help="Placement of camera samples in the pixel and on the lens: "
+    "independent random, jittered on a grid (stratified), or Halton points",
+)
+@click.option(
+    "--denoise",
+    is_flag=True,
+    help="Filter the noise out of the image with an edge-aware filter guided "
+    "by first-hit albedo, normal and depth buffers",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Render the image in tiles on this many worker processes, sharing "
+    "the scene through shared memory (numba and rust engines only)",
+)
+@click.option(
+    "--checkpoint",
+    "checkpoint_path",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Save the sample sums of the render to this file as it goes, so "
+    "--resume can continue it",
+)
+@click.option(
+    "--checkpoint-interval",
+    type=click.FloatRange(min=0.0),
+    default=DEFAULT_INTERVAL,
+    show_default=True,
+    help="Seconds between two checkpoints",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Continue the render saved in the --checkpoint file, up to "
+    "--samples-per-pixel, which can also add samples to a finished render "
+    "(starts a new render if the file does not exist)",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, writable=True),
+    default=None,
+    help="Reuse the sample sums of earlier renders of the same scene and "
+    "settings kept in this directory, rendering only the missing samples",
+)
+@click.option(
+    "--cache-size",
+    type=click.IntRange(min=0),
+    default=DEFAULT_CACHE_SIZE >> 20,
+    show_default=True,
+    help="Megabytes of --cache-dir entries kept, least recently used ones "
+    "are deleted first",
+)
 def one_weekend(
     aspect_ratio: float,
     image_width: int,
     samples_per_pixel: int,
     max_depth: int,
     engine: str,
+    seed: int | None,
+    output: str,
+    output_format: str | None,
+    adaptive: bool,
+    noise_threshold: float,
+    roulette_depth: int | None,
+    sampler: str,
+    denoise: bool,
+    workers: int | None,
+    checkpoint_path: str | None,
+    checkpoint_interval: float,
+    resume: bool,
+    cache_dir: str | None,
+    cache_size: int,
 ) -> None:
-    image_height = int(image_width / aspect_ratio)
-    world = random_scene()
-    camera = Camera(
-        lookfrom=Point3(13, 2, 3),
-        lookat=Point3(0, 0, 0),
-        vup=Vec3(0, 1, 0),
-        vfov=20.0,
-        aspect_ratio=aspect_ratio,
-        aperture=0.1,
-        focus_dist=10.0,
-    )
+    output_format = _output_format(output, output_format)
+    if workers is not None and (engine not in SCHEDULER_ENGINES or adaptive):
+        raise click.BadParameter(
+            "needs the numba or rust engine and no --adaptive", param_hint="--workers"
+        )
+    if checkpoint_path is None and resume:
+        raise click.BadParameter("needs --checkpoint", param_hint="--resume")
+    if checkpoint_path is not None and adaptive:
+        raise click.BadParameter("cannot be --adaptive", param_hint="--checkpoint")
+    if cache_dir is not None and (adaptive or checkpoint_path is not None):
+        raise click.BadParameter(
+            "cannot be --adaptive or --checkpoint", param_hint="--cache-dir"
+        )
+
+    checkpoint = None
+    if resume and os.path.exists(checkpoint_path):
+        try:
+            checkpoint = Checkpoint.load(checkpoint_path)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--checkpoint") from e
+        if seed is None:
+            seed = checkpoint.seed
+    elif checkpoint_path is not None and os.path.exists(checkpoint_path):
+        raise click.BadParameter(
+            f"{checkpoint_path} exists, pass --resume to continue it",
+            param_hint="--checkpoint",
+        )
 
-    match engine:
-        case "cuda":
-            from rayt.cuda_renderer import render_with_cuda
+    if seed is None:
+        seed = secrets.randbits(63)
+    click.echo(f"Seed: {seed}", err=True)
 
-            render_func = render_with_cuda
-        case "numba":
-            from rayt.numba_renderer import render_with_numba
+    image_height = int(image_width / aspect_ratio)
+    world, camera = _one_weekend_scene(seed, aspect_ratio)
+    if checkpoint_path is not None:
+        try:
+            checkpoint = render_with_checkpoints(
+                world,
+                camera,
+                image_width,
+                image_height,
+                samples_per_pixel,
+                max_depth,
+                seed,
+                checkpoint_path,
+                engine,
+                roulette_depth,
+                sampler,
+                workers,
+                checkpoint,
+                checkpoint_interval,
+            )
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--resume") from e
 
-            render_func = render_with_numba
-        case _:
-            from rayt.rust_renderer import render_with_rust
+        image = checkpoint.framebuffer
+        samples_per_pixel = checkpoint.samples
+    elif cache_dir is not None:
+        cache = RenderCache(cache_dir, cache_size << 20)
+        image = cache.render(
+            world,
+            camera,
+            image_width,
+            image_height,
+            samples_per_pixel,
+            max_depth,
+            seed,
+            engine,
+            roulette_depth,
+            sampler,
+            workers,
+        )
+    else:
+        image = render_samples(
+            world,
+            camera,
+            image_width,
+            image_height,
+            samples_per_pixel,
+            max_depth,
+            seed,
+            engine,
+            AdaptiveSampling(noise_threshold=noise_threshold) if adaptive else None,
+            roulette_depth,
+            sampler,
+            None,
+            workers,
+        )
 
-            render_func = render_with_rust
+    if denoise:
+        # Imported on use, the filter pulls in Numba
+        from rayt.aov import render_aovs
+        from rayt.denoise import Denoising, denoise_image
 
-    render_func(world, camera, image_width, image_height, samples_per_pixel, max_depth)
+        aovs = render_aovs(world, camera, image_width, image_height, seed)
+        image = denoise_image(image, samples_per_pixel, aovs, Denoising())
+    with click.open_file(output, "wb") as stream:
+        write_image(image, samples_per_pixel, output_format, stream)
 
 
 @click.command()
@@ -56,3 +291,299 @@ def test_gpu_availability() -> None:
     from rayt.gpu_utils import detect_gpu_capabilities
 
     detect_gpu_capabilities()
+
+
+@click.group()
+def rayt() -> None:
+    """Ray tracer maintenance commands."""
+
+
+@rayt.command()
+@click.option(
+    "--engine",
+    "engines",
+    type=click.Choice(["numba", "wavefront", "cuda"]),
+    multiple=True,
+    help="Engine to warm up (repeatable). Default: numba and wavefront, plus cuda "
+    "if available",
+)
+def warmup(engines: tuple[str, ...]) -> None:
+    """Compile the JIT kernels into the on-disk cache."""
+    if not engines:
+        from rayt.gpu_utils import is_cuda_available
+
+        engines = ("numba", "wavefront")
+        if is_cuda_available()[0]:
+            engines += ("cuda",)
+
+    for engine in engines:
+        click.echo(f"Compiling {engine} kernels...", err=True)
+        start = time.perf_counter()
+
+        match engine:
+            case "cuda":
+                from numba import cuda
+
+                from rayt.cuda_optimized import compile_kernels
+
+                cuda.select_device(0)
+            case "wavefront":
+                from rayt.wavefront_optimized import compile_kernels
+            case _:
+                from rayt.numba_optimized import compile_kernels
+
+        compile_kernels()
+        click.echo(f"  done in {time.perf_counter() - start:.2f}s", err=True)
+
+
+@rayt.command()
+@click.option(
+    "--host", default="0.0.0.0", show_default=True, help="Address to listen on"
+)
+@click.option(
+    "--port", default=DEFAULT_PORT, show_default=True, help="Port to listen on"
+)
+@click.option("--aspect-ratio", default=16.0 / 9.0, help="Image aspect ratio")
+@click.option("--image-width", default=300, help="Image width in pixels")
+@click.option("--samples-per-pixel", default=20, help="Number of samples per pixel")
+@click.option("--max-depth", default=50, help="Maximum ray bounce depth")
+@click.option(
+    "--seed",
+    type=click.IntRange(min=0, max=2**63 - 1),
+    default=None,
+    help="Random seed for the scene and the sample streams (default: random)",
+)
+@click.option(
+    "--roulette-depth",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Bounces after which paths go through Russian roulette (default: off)",
+)
+@click.option(
+    "--sampler",
+    type=click.Choice(SAMPLERS),
+    default="random",
+    show_default=True,
+    help="Placement of camera samples in the pixel and on the lens",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, writable=True, allow_dash=True),
+    default="-",
+    help="Image file (.ppm, .png or .exr) to write instead of standard output",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(IMAGE_FORMATS),
+    default=None,
+    help="Image format (default: from the --output suffix, p6 on standard output)",
+)
+@click.option(
+    "--lease-timeout",
+    type=click.FloatRange(min=0.0, min_open=True),
+    default=DEFAULT_LEASE_TIMEOUT,
+    show_default=True,
+    help="Seconds after which a lease that has not come back is also given to "
+    "another worker",
+)
+@click.option(
+    "--local-workers",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Worker processes to start on this machine",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(SCHEDULER_ENGINES),
+    default="numba",
+    show_default=True,
+    help="Rendering engine of the local workers",
+)
+def coordinator(
+    host: str,
+    port: int,
+    aspect_ratio: float,
+    image_width: int,
+    samples_per_pixel: int,
+    max_depth: int,
+    seed: int | None,
+    roulette_depth: int | None,
+    sampler: str,
+    output: str,
+    output_format: str | None,
+    lease_timeout: float,
+    local_workers: int,
+    engine: str,
+) -> None:
+    """Hand out the tiles and sample ranges of a frame to workers over TCP
+    and write the merged image."""
+    output_format = _output_format(output, output_format)
+    if seed is None:
+        seed = secrets.randbits(63)
+    click.echo(f"Seed: {seed}", err=True)
+
+    image_height = int(image_width / aspect_ratio)
+    world, camera = _one_weekend_scene(seed, aspect_ratio)
+    server = Coordinator(
+        world,
+        camera,
+        image_width,
+        image_height,
+        samples_per_pixel,
+        max_depth,
+        seed,
+        roulette_depth,
+        sampler,
+        lease_timeout,
+    )
+    image = server.serve(host, port, local_workers, engine)
+    with click.open_file(output, "wb") as stream:
+        write_image(image, samples_per_pixel, output_format, stream)
+
+
+@rayt.command()
+@click.option(
+    "--host", default="127.0.0.1", show_default=True, help="Coordinator address"
+)
+@click.option(
+    "--port", default=DEFAULT_PORT, show_default=True, help="Coordinator port"
+)
+@click.option(
+    "--engine",
+    type=click.Choice(SCHEDULER_ENGINES),
+    default="numba",
+    show_default=True,
+    help="Rendering engine",
+)
+@click.option(
+    "--threads",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Threads to render with (default: all CPUs)",
+)
+def worker(host: str, port: int, engine: str, threads: int | None) -> None:
+    """Render leases for a coordinator until its frame is done."""
+    run_worker(host, port, engine, threads)
+
+
+@rayt.command()
+@click.option(
+    "--camera-path",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="JSON file of camera keyframes (frame, lookfrom, lookat, vfov), see "
+    "rayt.animation.CameraPath.load; every frame between the first and the "
+    "last keyframe is rendered",
+)
+@click.option(
+    "--turntable",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Instead of --camera-path, orbit the cover camera around the scene "
+    "in this many frames",
+)
+@click.option("--aspect-ratio", default=16.0 / 9.0, help="Image aspect ratio")
+@click.option("--image-width", default=300, help="Image width in pixels")
+@click.option("--samples-per-pixel", default=20, help="Number of samples per pixel")
+@click.option("--max-depth", default=50, help="Maximum ray bounce depth")
+@click.option(
+    "--seed",
+    type=click.IntRange(min=0, max=2**63 - 1),
+    default=None,
+    help="Random seed for the scene and the sample streams (default: random)",
+)
+@click.option(
+    "--roulette-depth",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Bounces after which paths go through Russian roulette (default: off)",
+)
+@click.option(
+    "--sampler",
+    type=click.Choice(SAMPLERS),
+    default="random",
+    show_default=True,
+    help="Placement of camera samples in the pixel and on the lens",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(ANIMATION_ENGINES),
+    default="numba",
+    show_default=True,
+    help="Rendering engine",
+)
+@click.option(
+    "--output",
+    default="frame-{frame:04d}.png",
+    show_default=True,
+    help="Image file of every frame, with {frame} replaced by the frame number",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(IMAGE_FORMATS),
+    default=None,
+    help="Image format (default: from the --output suffix)",
+)
+def animate(
+    camera_path: str | None,
+    turntable: int | None,
+    aspect_ratio: float,
+    image_width: int,
+    samples_per_pixel: int,
+    max_depth: int,
+    seed: int | None,
+    roulette_depth: int | None,
+    sampler: str,
+    engine: str,
+    output: str,
+    output_format: str | None,
+) -> None:
+    """Render the frames of a camera path through the cover scene in one
+    process, keeping the scene and the compiled kernels between frames."""
+    if (camera_path is None) == (turntable is None):
+        raise click.UsageError("pass one of --camera-path and --turntable")
+    try:
+        if output.format(frame=0) == output.format(frame=1):
+            raise click.BadParameter("needs {frame}", param_hint="--output")
+    except (KeyError, IndexError, ValueError) as e:
+        raise click.BadParameter(repr(e), param_hint="--output") from e
+    output_format = _output_format(output.format(frame=0), output_format)
+
+    if turntable is not None:
+        path = CameraPath.turntable(
+            turntable, ONE_WEEKEND_LOOKFROM, ONE_WEEKEND_LOOKAT, ONE_WEEKEND_VFOV
+        )
+        frames = range(turntable)
+    else:
+        try:
+            path = CameraPath.load(camera_path)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--camera-path") from e
+        frames = path.frames
+
+    if seed is None:
+        seed = secrets.randbits(63)
+    click.echo(f"Seed: {seed}", err=True)
+
+    def write_frame(frame: int, image: npt.NDArray[np.float64]) -> None:
+        with click.open_file(output.format(frame=frame), "wb") as stream:
+            write_image(image, samples_per_pixel, output_format, stream)
+
+    render_animation(
+        random_scene(seed=seed),
+        path,
+        frames,
+        aspect_ratio,
+        image_width,
+        int(image_width / aspect_ratio),
+        samples_per_pixel,
+        max_depth,
+        seed,
+        write_frame,
+        engine,
+        roulette_depth,
+        sampler,
+    )
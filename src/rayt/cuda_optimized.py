@@ -1,25 +1,67 @@
 import math
 
-from numba import cuda, types
-from numba.cuda.random import xoroshiro128p_uniform_float32
-
-
-@cuda.jit(device=True)
+from numba import config, cuda, float64, int64, types, uint64
+
+from rayt.numba_optimized import BVH_STACK_SIZE
+from rayt.rng import halton_sample, random_float32, seed_rng
+from rayt.sampling import HALTON_BASES, HALTON_SAMPLER, STRATIFIED_SAMPLER
+
+# Explicit signatures of the render kernels, used to compile them eagerly (see
+# ``compile_kernels``). Device arrays are C-contiguous.
+RENDER_PIXELS_SIGNATURE = types.void(
+    int64,  # image_width
+    int64,  # image_height
+    int64,  # samples_per_pixel
+    float64[::1],  # camera_data
+    float64[:, ::1],  # spheres_data
+    float64[:, ::1],  # materials_data
+    float64[:, ::1],  # bvh_bounds
+    int64[:, ::1],  # bvh_links
+    int64,  # max_depth
+    int64,  # roulette_depth
+    int64,  # seed
+    int64,  # sample_offset
+    int64,  # sampler
+    int64,  # strata
+    float64[:, :, ::1],  # output
+)
+
+RENDER_PIXEL_LIST_SIGNATURE = types.void(
+    int64[::1],  # pixels
+    int64,  # image_width
+    int64,  # image_height
+    int64,  # samples_per_pixel
+    float64[::1],  # camera_data
+    float64[:, ::1],  # spheres_data
+    float64[:, ::1],  # materials_data
+    float64[:, ::1],  # bvh_bounds
+    int64[:, ::1],  # bvh_links
+    int64,  # max_depth
+    int64,  # roulette_depth
+    int64,  # seed
+    int64,  # sample_offset
+    int64,  # sampler
+    int64,  # strata
+    float64[:, :, ::1],  # output
+)
+
+
+@cuda.jit(device=True, cache=True)
 def dot_cuda(u, v):
     return u[0] * v[0] + u[1] * v[1] + u[2] * v[2]
 
 
-@cuda.jit(device=True)
+@cuda.jit(device=True, cache=True)
 def length_squared_cuda(v):
     return v[0] ** 2 + v[1] ** 2 + v[2] ** 2
 
 
-@cuda.jit(device=True)
+@cuda.jit(device=True, cache=True)
 def length_cuda(v):
     return math.sqrt(length_squared_cuda(v))
 
 
-@cuda.jit(device=True)
+@cuda.jit(device=True, cache=True)
 def unit_vector_cuda(v, result):
     len_v = length_cuda(v)
     result[0] = v[0] / len_v
@@ -27,7 +69,7 @@ def unit_vector_cuda(v, result):
     result[2] = v[2] / len_v
 
 
-@cuda.jit(device=True)
+@cuda.jit(device=True, cache=True)
 def reflect_cuda(v, n, result):
     dot_vn = dot_cuda(v, n)
     result[0] = v[0] - 2.0 * dot_vn * n[0]
@@ -35,7 +77,7 @@ def reflect_cuda(v, n, result):
     result[2] = v[2] - 2.0 * dot_vn * n[2]
 
 
-@cuda.jit(device=True)
+@cuda.jit(device=True, cache=True)
 def refract_cuda(uv, n, etai_over_etat, result):
     cos_theta = -dot_cuda(uv, n)
     r_out_parallel_x = etai_over_etat * (uv[0] + cos_theta * n[0])
@@ -52,51 +94,90 @@ def refract_cuda(uv, n, etai_over_etat, result):
     result[2] = r_out_parallel_z + r_out_perp_len * n[2]
 
 
-@cuda.jit(device=True)
-def random_unit_vector_cuda(rng_states, thread_id, result):
-    a = xoroshiro128p_uniform_float32(rng_states, thread_id) * 2.0 * math.pi
-    z = xoroshiro128p_uniform_float32(rng_states, thread_id) * 2.0 - 1.0
+@cuda.jit(device=True, cache=True)
+def random_unit_vector_cuda(rng, result):
+    a = random_float32(rng) * 2.0 * math.pi
+    z = random_float32(rng) * 2.0 - 1.0
     r = math.sqrt(1.0 - z * z)
     result[0] = r * math.cos(a)
     result[1] = r * math.sin(a)
     result[2] = z
 
 
-@cuda.jit(device=True)
-def random_in_unit_disk_cuda(rng_states, thread_id, result):
+@cuda.jit(device=True, cache=True)
+def random_in_unit_disk_cuda(rng, result):
     """Generate random point in unit disk for depth of field"""
     while True:
-        result[0] = xoroshiro128p_uniform_float32(rng_states, thread_id) * 2.0 - 1.0
-        result[1] = xoroshiro128p_uniform_float32(rng_states, thread_id) * 2.0 - 1.0
+        result[0] = random_float32(rng) * 2.0 - 1.0
+        result[1] = random_float32(rng) * 2.0 - 1.0
         result[2] = 0.0
         if length_squared_cuda(result) < 1.0:
             break
 
 
-@cuda.jit(device=True)
-def random_in_unit_sphere_cuda(rng_states, thread_id, result):
+@cuda.jit(device=True, cache=True)
+def concentric_disk_cuda(u1, u2, result):
+    """Map a point of the unit square to the unit disk, see
+    ``concentric_disk_numba``"""
+    a = 2.0 * u1 - 1.0
+    b = 2.0 * u2 - 1.0
+    result[2] = 0.0
+    if a == 0.0 and b == 0.0:
+        result[0] = 0.0
+        result[1] = 0.0
+        return
+    if abs(a) > abs(b):
+        r = a
+        phi = (math.pi / 4.0) * (b / a)
+    else:
+        r = b
+        phi = math.pi / 2.0 - (math.pi / 4.0) * (a / b)
+    result[0] = r * math.cos(phi)
+    result[1] = r * math.sin(phi)
+
+
+@cuda.jit(device=True, cache=True)
+def camera_sample_cuda(sampler, strata, seed, pixel_index, sample, rng, disk):
+    """Position of a sample inside its pixel, returned as (du, dv), and on the
+    unit lens disk, written to ``disk``. See ``camera_sample_numba``."""
+    if sampler == HALTON_SAMPLER:
+        du = halton_sample(HALTON_BASES[0], sample, seed, pixel_index, 0)
+        dv = halton_sample(HALTON_BASES[1], sample, seed, pixel_index, 1)
+        concentric_disk_cuda(
+            halton_sample(HALTON_BASES[2], sample, seed, pixel_index, 2),
+            halton_sample(HALTON_BASES[3], sample, seed, pixel_index, 3),
+            disk,
+        )
+        return du, dv
+
+    if sampler == STRATIFIED_SAMPLER:
+        cell = sample % (strata * strata)
+        du = (cell % strata + random_float32(rng)) / strata
+        dv = (cell // strata + random_float32(rng)) / strata
+    else:
+        du = random_float32(rng)
+        dv = random_float32(rng)
+    random_in_unit_disk_cuda(rng, disk)
+    return du, dv
+
+
+@cuda.jit(device=True, cache=True)
+def random_in_unit_sphere_cuda(rng, result):
     while True:
-        result[0] = xoroshiro128p_uniform_float32(rng_states, thread_id) * 2.0 - 1.0
-        result[1] = xoroshiro128p_uniform_float32(rng_states, thread_id) * 2.0 - 1.0
-        result[2] = xoroshiro128p_uniform_float32(rng_states, thread_id) * 2.0 - 1.0
+        result[0] = random_float32(rng) * 2.0 - 1.0
+        result[1] = random_float32(rng) * 2.0 - 1.0
+        result[2] = random_float32(rng) * 2.0 - 1.0
         if length_squared_cuda(result) < 1.0:
             break
 
 
-@cuda.jit(device=True)
-def sphere_hit_cuda(
-    ray_origin,
-    ray_direction,
-    sphere_center,
-    sphere_radius,
-    t_min,
-    t_max,
-    hit_point,
-    normal,
-):
-    oc_x = ray_origin[0] - sphere_center[0]
-    oc_y = ray_origin[1] - sphere_center[1]
-    oc_z = ray_origin[2] - sphere_center[2]
+@cuda.jit(device=True, cache=True)
+def sphere_hit_cuda(ray_origin, ray_direction, spheres_data, sphere_idx, t_min, t_max):
+    """Return the ray parameter of the nearest hit in (t_min, t_max), or -1.0"""
+    oc_x = ray_origin[0] - spheres_data[sphere_idx, 0]
+    oc_y = ray_origin[1] - spheres_data[sphere_idx, 1]
+    oc_z = ray_origin[2] - spheres_data[sphere_idx, 2]
+    sphere_radius = spheres_data[sphere_idx, 3]
 
     a = length_squared_cuda(ray_direction)
     half_b = oc_x * ray_direction[0] + oc_y * ray_direction[1] + oc_z * ray_direction[2]
@@ -104,27 +185,110 @@ def sphere_hit_cuda(
     discriminant = half_b * half_b - a * c
 
     if discriminant <= 0:
-        return False, 0.0, False
+        return -1.0
 
     root = math.sqrt(discriminant)
     temp = (-half_b - root) / a
+    if t_min < temp < t_max:
+        return temp
 
+    temp = (-half_b + root) / a
     if t_min < temp < t_max:
-        t = temp
-    else:
-        temp = (-half_b + root) / a
-        if t_min < temp < t_max:
-            t = temp
+        return temp
+
+    return -1.0
+
+
+@cuda.jit(device=True, cache=True)
+def aabb_hit_cuda(bvh_bounds, node, ray_origin, inv_direction, t_min, t_max):
+    """Slab test of a ray against the bounds of a BVH node"""
+    for axis in range(3):
+        t0 = (bvh_bounds[node, axis] - ray_origin[axis]) * inv_direction[axis]
+        t1 = (bvh_bounds[node, 3 + axis] - ray_origin[axis]) * inv_direction[axis]
+        if inv_direction[axis] < 0.0:
+            t0, t1 = t1, t0
+        # Written as comparisons so that NaN slabs are ignored
+        if t0 > t_min:  # noqa: PLR1730
+            t_min = t0
+        if t1 < t_max:  # noqa: PLR1730
+            t_max = t1
+        if t_max < t_min:
+            return False
+
+    return True
+
+
+@cuda.jit(device=True, cache=True)
+def bvh_hit_cuda(
+    ray_origin, ray_direction, spheres_data, bvh_bounds, bvh_links, t_min, t_max
+):
+    """Return (t, sphere_idx) of the closest hit, walking the BVH.
+
+    Same traversal as ``bvh_hit_numba``, with the stack in local memory.
+    """
+    closest_t = t_max
+    hit_sphere_idx = -1
+    if bvh_links.shape[0] == 0:
+        return closest_t, hit_sphere_idx
+
+    inv_direction = cuda.local.array(3, types.float64)
+    for axis in range(3):
+        if ray_direction[axis] != 0.0:
+            inv_direction[axis] = 1.0 / ray_direction[axis]
         else:
-            return False, 0.0, False
+            inv_direction[axis] = math.inf
+
+    stack = cuda.local.array(BVH_STACK_SIZE, int64)
+    stack_size = 0
+    node = 0
+
+    while True:
+        if aabb_hit_cuda(bvh_bounds, node, ray_origin, inv_direction, t_min, closest_t):
+            offset = bvh_links[node, 0]
+            count = bvh_links[node, 1]
+            if count > 0:
+                for i in range(offset, offset + count):
+                    t = sphere_hit_cuda(
+                        ray_origin, ray_direction, spheres_data, i, t_min, closest_t
+                    )
+                    if t > 0.0:
+                        closest_t = t
+                        hit_sphere_idx = i
+            elif inv_direction[bvh_links[node, 2]] < 0.0:
+                stack[stack_size] = node + 1
+                stack_size += 1
+                node = offset
+                continue
+            else:
+                stack[stack_size] = offset
+                stack_size += 1
+                node += 1
+                continue
+
+        if stack_size == 0:
+            break
+        stack_size -= 1
+        node = stack[stack_size]
+
+    return closest_t, hit_sphere_idx
+
+
+@cuda.jit(device=True, cache=True)
+def hit_record_cuda(
+    ray_origin, ray_direction, spheres_data, sphere_idx, t, hit_point, normal
+):
+    """Fill the hit point and normal of a hit found by bvh_hit_cuda.
 
+    Returns whether the ray hit the outside of the sphere.
+    """
     hit_point[0] = ray_origin[0] + t * ray_direction[0]
     hit_point[1] = ray_origin[1] + t * ray_direction[1]
     hit_point[2] = ray_origin[2] + t * ray_direction[2]
 
-    outward_normal_x = (hit_point[0] - sphere_center[0]) / sphere_radius
-    outward_normal_y = (hit_point[1] - sphere_center[1]) / sphere_radius
-    outward_normal_z = (hit_point[2] - sphere_center[2]) / sphere_radius
+    sphere_radius = spheres_data[sphere_idx, 3]
+    outward_normal_x = (hit_point[0] - spheres_data[sphere_idx, 0]) / sphere_radius
+    outward_normal_y = (hit_point[1] - spheres_data[sphere_idx, 1]) / sphere_radius
+    outward_normal_z = (hit_point[2] - spheres_data[sphere_idx, 2]) / sphere_radius
 
     front_face = (
         ray_direction[0] * outward_normal_x
@@ -141,21 +305,21 @@ def sphere_hit_cuda(
         normal[1] = -outward_normal_y
         normal[2] = -outward_normal_z
 
-    return True, t, front_face
+    return front_face
 
 
-@cuda.jit(device=True)
+@cuda.jit(device=True, cache=True)
 def schlick_cuda(cosine, ref_idx):
     r0 = ((1.0 - ref_idx) / (1.0 + ref_idx)) ** 2
     return r0 + (1.0 - r0) * ((1.0 - cosine) ** 5)
 
 
-@cuda.jit(device=True)
+@cuda.jit(device=True, cache=True)
 def scatter_lambertian_cuda(
-    ray_direction, hit_point, normal, rng_states, thread_id, new_origin, new_direction
+    ray_direction, hit_point, normal, rng, new_origin, new_direction
 ):
     scatter_direction = cuda.local.array(3, types.float32)
-    random_unit_vector_cuda(rng_states, thread_id, scatter_direction)
+    random_unit_vector_cuda(rng, scatter_direction)
 
     new_origin[0] = hit_point[0]
     new_origin[1] = hit_point[1]
@@ -168,14 +332,13 @@ def scatter_lambertian_cuda(
     return True
 
 
-@cuda.jit(device=True)
+@cuda.jit(device=True, cache=True)
 def scatter_metal_cuda(
     ray_direction,
     hit_point,
     normal,
     fuzz,
-    rng_states,
-    thread_id,
+    rng,
     new_origin,
     new_direction,
 ):
@@ -186,7 +349,7 @@ def scatter_metal_cuda(
     reflect_cuda(unit_direction, normal, reflected)
 
     fuzz_vector = cuda.local.array(3, types.float32)
-    random_in_unit_sphere_cuda(rng_states, thread_id, fuzz_vector)
+    random_in_unit_sphere_cuda(rng, fuzz_vector)
 
     new_origin[0] = hit_point[0]
     new_origin[1] = hit_point[1]
@@ -199,15 +362,14 @@ def scatter_metal_cuda(
     return dot_cuda(new_direction, normal) > 0.0
 
 
-@cuda.jit(device=True)
+@cuda.jit(device=True, cache=True)
 def scatter_dielectric_cuda(
     ray_direction,
     hit_point,
     normal,
     front_face,
     ref_idx,
-    rng_states,
-    thread_id,
+    rng,
     new_origin,
     new_direction,
 ):
@@ -228,9 +390,9 @@ def scatter_dielectric_cuda(
     new_origin[1] = hit_point[1]
     new_origin[2] = hit_point[2]
 
-    if etai_over_etat * sin_theta > 1.0 or xoroshiro128p_uniform_float32(
-        rng_states, thread_id
-    ) < schlick_cuda(cos_theta, etai_over_etat):
+    if etai_over_etat * sin_theta > 1.0 or random_float32(rng) < schlick_cuda(
+        cos_theta, etai_over_etat
+    ):
         # Reflect
         reflect_cuda(unit_direction, normal, new_direction)
     else:
@@ -240,15 +402,34 @@ def scatter_dielectric_cuda(
     return True
 
 
-@cuda.jit(device=True)
+@cuda.jit(device=True, cache=True)
+def russian_roulette_cuda(color, rng):
+    """Russian roulette on a path throughput, see ``russian_roulette_numba``.
+
+    Reweights ``color`` in place and returns whether the path survived.
+    """
+    p = min(max(color[0], color[1], color[2]), 1.0)
+    if random_float32(rng) >= p:
+        return False
+
+    inv_p = 1.0 / p
+    color[0] *= inv_p
+    color[1] *= inv_p
+    color[2] *= inv_p
+    return True
+
+
+@cuda.jit(device=True, cache=True)
 def ray_color_cuda(
     ray_origin,
     ray_direction,
     spheres_data,
     materials_data,
+    bvh_bounds,
+    bvh_links,
     depth,
-    rng_states,
-    thread_id,
+    roulette_depth,
+    rng,
     result,
 ):
     if depth <= 0:
@@ -273,49 +454,19 @@ def ray_color_cuda(
     current_color[1] = 1.0
     current_color[2] = 1.0
 
-    for _ in range(depth):
+    for bounce in range(1, depth + 1):
         # Find closest hit
-        closest_t = math.inf
-        hit_found = False
-        hit_sphere_idx = -1
-        hit_point = cuda.local.array(3, types.float32)
-        hit_normal = cuda.local.array(3, types.float32)
-        hit_front_face = False
-
-        for i in range(spheres_data.shape[0]):
-            sphere_center = cuda.local.array(3, types.float32)
-            sphere_center[0] = spheres_data[i, 0]
-            sphere_center[1] = spheres_data[i, 1]
-            sphere_center[2] = spheres_data[i, 2]
-            sphere_radius = spheres_data[i, 3]
-
-            temp_hit_point = cuda.local.array(3, types.float32)
-            temp_normal = cuda.local.array(3, types.float32)
-
-            hit, t, front_face = sphere_hit_cuda(
-                current_ray_origin,
-                current_ray_direction,
-                sphere_center,
-                sphere_radius,
-                0.001,
-                closest_t,
-                temp_hit_point,
-                temp_normal,
-            )
+        closest_t, hit_sphere_idx = bvh_hit_cuda(
+            current_ray_origin,
+            current_ray_direction,
+            spheres_data,
+            bvh_bounds,
+            bvh_links,
+            0.001,
+            math.inf,
+        )
 
-            if hit and t < closest_t:
-                closest_t = t
-                hit_found = True
-                hit_sphere_idx = i
-                hit_point[0] = temp_hit_point[0]
-                hit_point[1] = temp_hit_point[1]
-                hit_point[2] = temp_hit_point[2]
-                hit_normal[0] = temp_normal[0]
-                hit_normal[1] = temp_normal[1]
-                hit_normal[2] = temp_normal[2]
-                hit_front_face = front_face
-
-        if not hit_found:
+        if hit_sphere_idx < 0:
             # Sky gradient
             unit_direction = cuda.local.array(3, types.float32)
             unit_vector_cuda(current_ray_direction, unit_direction)
@@ -329,6 +480,19 @@ def ray_color_cuda(
             result[2] = current_color[2] * sky_b
             return
 
+        # Build the hit record for the closest sphere only
+        hit_point = cuda.local.array(3, types.float32)
+        hit_normal = cuda.local.array(3, types.float32)
+        hit_front_face = hit_record_cuda(
+            current_ray_origin,
+            current_ray_direction,
+            spheres_data,
+            hit_sphere_idx,
+            closest_t,
+            hit_point,
+            hit_normal,
+        )
+
         # Material scattering
         material_type = int(materials_data[hit_sphere_idx, 0])
         new_origin = cuda.local.array(3, types.float32)
@@ -343,8 +507,7 @@ def ray_color_cuda(
                 current_ray_direction,
                 hit_point,
                 hit_normal,
-                rng_states,
-                thread_id,
+                rng,
                 new_origin,
                 new_direction,
             )
@@ -375,8 +538,7 @@ def ray_color_cuda(
                 hit_point,
                 hit_normal,
                 fuzz,
-                rng_states,
-                thread_id,
+                rng,
                 new_origin,
                 new_direction,
             )
@@ -405,8 +567,7 @@ def ray_color_cuda(
                 hit_normal,
                 hit_front_face,
                 ref_idx,
-                rng_states,
-                thread_id,
+                rng,
                 new_origin,
                 new_direction,
             )
@@ -418,36 +579,43 @@ def ray_color_cuda(
             current_ray_direction[1] = new_direction[1]
             current_ray_direction[2] = new_direction[2]
 
+        if (
+            bounce >= roulette_depth
+            and bounce < depth
+            and not russian_roulette_cuda(current_color, rng)
+        ):
+            result[0] = 0.0
+            result[1] = 0.0
+            result[2] = 0.0
+            return
+
     result[0] = 0.0  # Exceeded max depth
     result[1] = 0.0
     result[2] = 0.0
 
 
-@cuda.jit
-def render_pixels_cuda(
+@cuda.jit(device=True, cache=True)
+def sample_color_cuda(
+    i,
+    j,
     image_width,
     image_height,
-    samples_per_pixel,
     camera_data,
     spheres_data,
     materials_data,
+    bvh_bounds,
+    bvh_links,
     max_depth,
-    rng_states,
-    output,
+    roulette_depth,
+    seed,
+    sample,
+    sampler,
+    strata,
+    rng,
+    color,
 ):
-    i = cuda.blockIdx.x * cuda.blockDim.x + cuda.threadIdx.x
-    j = cuda.blockIdx.y * cuda.blockDim.y + cuda.threadIdx.y
-
-    if i >= image_width or j >= image_height:
-        return
-
-    thread_id = j * image_width + i
-
-    pixel_color = cuda.local.array(3, types.float32)
-    pixel_color[0] = 0.0
-    pixel_color[1] = 0.0
-    pixel_color[2] = 0.0
-
+    """Trace sample ``sample`` of pixel (i, j), counted from the bottom row,
+    and store its color in ``color``. ``rng`` holds the sample's stream."""
     origin = cuda.local.array(3, types.float32)
     lower_left_corner = cuda.local.array(3, types.float32)
     horizontal = cuda.local.array(3, types.float32)
@@ -475,63 +643,121 @@ def render_pixels_cuda(
     v[1] = camera_data[17]
     v[2] = camera_data[18]
 
-    for _ in range(samples_per_pixel):
-        # Add random sampling
-        u_coord = (i + xoroshiro128p_uniform_float32(rng_states, thread_id)) / (
-            image_width - 1
-        )
-        v_coord = (j + xoroshiro128p_uniform_float32(rng_states, thread_id)) / (
-            image_height - 1
-        )
+    pixel_index = (image_height - 1 - j) * image_width + i
+    rd = cuda.local.array(3, types.float32)
+    du, dv = camera_sample_cuda(sampler, strata, seed, pixel_index, sample, rng, rd)
+    u_coord = (i + du) / (image_width - 1)
+    v_coord = (j + dv) / (image_height - 1)
+
+    # Depth of field ray generation
+
+    offset = cuda.local.array(3, types.float32)
+    offset[0] = u[0] * rd[0] + v[0] * rd[1]
+    offset[1] = u[1] * rd[0] + v[1] * rd[1]
+    offset[2] = u[2] * rd[0] + v[2] * rd[1]
+
+    # Scale by lens radius
+    offset[0] *= lens_radius
+    offset[1] *= lens_radius
+    offset[2] *= lens_radius
+
+    ray_origin = cuda.local.array(3, types.float32)
+    ray_origin[0] = origin[0] + offset[0]
+    ray_origin[1] = origin[1] + offset[1]
+    ray_origin[2] = origin[2] + offset[2]
+
+    ray_direction = cuda.local.array(3, types.float32)
+    ray_direction[0] = (
+        lower_left_corner[0]
+        + u_coord * horizontal[0]
+        + v_coord * vertical[0]
+        - ray_origin[0]
+    )
+    ray_direction[1] = (
+        lower_left_corner[1]
+        + u_coord * horizontal[1]
+        + v_coord * vertical[1]
+        - ray_origin[1]
+    )
+    ray_direction[2] = (
+        lower_left_corner[2]
+        + u_coord * horizontal[2]
+        + v_coord * vertical[2]
+        - ray_origin[2]
+    )
 
-        # Depth of field ray generation
-        rd = cuda.local.array(3, types.float32)
-        random_in_unit_disk_cuda(rng_states, thread_id, rd)
-
-        offset = cuda.local.array(3, types.float32)
-        offset[0] = u[0] * rd[0] + v[0] * rd[1]
-        offset[1] = u[1] * rd[0] + v[1] * rd[1]
-        offset[2] = u[2] * rd[0] + v[2] * rd[1]
-
-        # Scale by lens radius
-        offset[0] *= lens_radius
-        offset[1] *= lens_radius
-        offset[2] *= lens_radius
-
-        ray_origin = cuda.local.array(3, types.float32)
-        ray_origin[0] = origin[0] + offset[0]
-        ray_origin[1] = origin[1] + offset[1]
-        ray_origin[2] = origin[2] + offset[2]
-
-        ray_direction = cuda.local.array(3, types.float32)
-        ray_direction[0] = (
-            lower_left_corner[0]
-            + u_coord * horizontal[0]
-            + v_coord * vertical[0]
-            - ray_origin[0]
-        )
-        ray_direction[1] = (
-            lower_left_corner[1]
-            + u_coord * horizontal[1]
-            + v_coord * vertical[1]
-            - ray_origin[1]
-        )
-        ray_direction[2] = (
-            lower_left_corner[2]
-            + u_coord * horizontal[2]
-            + v_coord * vertical[2]
-            - ray_origin[2]
-        )
+    ray_color_cuda(
+        ray_origin,
+        ray_direction,
+        spheres_data,
+        materials_data,
+        bvh_bounds,
+        bvh_links,
+        max_depth,
+        roulette_depth,
+        rng,
+        color,
+    )
+
+
+@cuda.jit(cache=True)
+def render_pixels_cuda(
+    image_width,
+    image_height,
+    samples_per_pixel,
+    camera_data,
+    spheres_data,
+    materials_data,
+    bvh_bounds,
+    bvh_links,
+    max_depth,
+    roulette_depth,
+    seed,
+    sample_offset,
+    sampler,
+    strata,
+    output,
+):
+    """Render one pixel per thread into ``output`` as unscaled sample sums.
+
+    Samples use the same (seed, pixel_index, sample_index) random streams as
+    the numba engine, see ``rayt.rng``.
+    """
+    i = cuda.blockIdx.x * cuda.blockDim.x + cuda.threadIdx.x
+    j = cuda.blockIdx.y * cuda.blockDim.y + cuda.threadIdx.y
+
+    if i >= image_width or j >= image_height:
+        return
+
+    pixel_index = (image_height - 1 - j) * image_width + i
+    rng = cuda.local.array(2, uint64)
+
+    pixel_color = cuda.local.array(3, types.float32)
+    pixel_color[0] = 0.0
+    pixel_color[1] = 0.0
+    pixel_color[2] = 0.0
+
+    for s in range(samples_per_pixel):
+        seed_rng(rng, seed, pixel_index, sample_offset + s)
 
         color = cuda.local.array(3, types.float32)
-        ray_color_cuda(
-            ray_origin,
-            ray_direction,
+        sample_color_cuda(
+            i,
+            j,
+            image_width,
+            image_height,
+            camera_data,
             spheres_data,
             materials_data,
+            bvh_bounds,
+            bvh_links,
             max_depth,
-            rng_states,
-            thread_id,
+            roulette_depth,
+            seed,
+            sample_offset + s,
+            sampler,
+            strata,
+            rng,
             color,
         )
 
@@ -543,3 +769,89 @@ def render_pixels_cuda(
     output[image_height - 1 - j, i, 0] = pixel_color[0]
     output[image_height - 1 - j, i, 1] = pixel_color[1]
     output[image_height - 1 - j, i, 2] = pixel_color[2]
+
+
+@cuda.jit(cache=True)
+def render_pixel_list_cuda(
+    pixels,
+    image_width,
+    image_height,
+    samples_per_pixel,
+    camera_data,
+    spheres_data,
+    materials_data,
+    bvh_bounds,
+    bvh_links,
+    max_depth,
+    roulette_depth,
+    seed,
+    sample_offset,
+    sampler,
+    strata,
+    output,
+):
+    """Render one listed pixel per thread into ``output`` (n, 2, 3) as the sum
+    and the sum of squares of its samples, for adaptive sampling.
+
+    Pixels are numbered row by row from the top-left corner, like the pixel
+    indices of the random streams.
+    """
+    k = cuda.grid(1)
+    if k >= pixels.shape[0]:
+        return
+
+    pixel_index = pixels[k]
+    i = pixel_index % image_width
+    j = image_height - 1 - pixel_index // image_width
+    rng = cuda.local.array(2, uint64)
+
+    sums = cuda.local.array(6, float64)
+    for c in range(6):
+        sums[c] = 0.0
+
+    for s in range(samples_per_pixel):
+        seed_rng(rng, seed, pixel_index, sample_offset + s)
+
+        color = cuda.local.array(3, types.float32)
+        sample_color_cuda(
+            i,
+            j,
+            image_width,
+            image_height,
+            camera_data,
+            spheres_data,
+            materials_data,
+            bvh_bounds,
+            bvh_links,
+            max_depth,
+            roulette_depth,
+            seed,
+            sample_offset + s,
+            sampler,
+            strata,
+            rng,
+            color,
+        )
+
+        for c in range(3):
+            sums[c] += color[c]
+            sums[3 + c] += color[c] * color[c]
+
+    for c in range(3):
+        output[k, 0, c] = sums[c]
+        output[k, 1, c] = sums[3 + c]
+
+
+def compile_kernels() -> None:
+    """Compile the render kernels for their explicit signatures.
+
+    The kernel and its device functions are declared with ``cache=True``, so
+    this loads the compiled code from the on-disk cache when it is present and
+    populates the cache otherwise.
+    """
+    if config.ENABLE_CUDASIM:
+        # The simulator interprets kernels in Python; there is nothing to compile.
+        return
+
+    render_pixels_cuda.compile(RENDER_PIXELS_SIGNATURE)
+    render_pixel_list_cuda.compile(RENDER_PIXEL_LIST_SIGNATURE)
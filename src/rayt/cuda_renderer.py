@@ -4,9 +4,18 @@ import numpy as np
 import numpy.typing as npt
 
 from numba import cuda
-from numba.cuda.random import create_xoroshiro128p_states
-from rayt.cuda_optimized import render_pixels_cuda
-from rayt_rust._core import Camera, Color, HittableList, get_color
+from rayt.adaptive import AdaptiveSampling, render_adaptive
+from rayt.cuda_optimized import (
+    compile_kernels,
+    render_pixel_list_cuda,
+    render_pixels_cuda,
+)
+from rayt.sampling import sampler_parameters
+from rayt.scene_data import bvh_arrays, camera_array, material_array, sphere_array
+from rayt_rust._core import Camera, HittableList
+
+# Threads per block of the pixel list kernel
+PIXEL_LIST_BLOCK_SIZE = 128
 
 
 class CudaRenderer:
@@ -16,47 +25,120 @@ class CudaRenderer:
         self.spheres_data: npt.NDArray[np.float64] | None = None
         self.materials_data: npt.NDArray[np.float64] | None = None
         self.camera_data: npt.NDArray[np.float64] | None = None
+        self.bvh_bounds: npt.NDArray[np.float64] | None = None
+        self.bvh_links: npt.NDArray[np.int64] | None = None
+        # Device copies of camera_data, spheres_data, materials_data,
+        # bvh_bounds and bvh_links, in kernel argument order
+        self.device_scene: tuple[object, ...] = ()
 
     def _prepare_scene_data(self, world: HittableList, camera: Camera) -> None:
         """Convert scene objects to NumPy arrays for Numba"""
         # Sphere data: [center_x, center_y, center_z, radius]
-        self.spheres_data = np.array(world.get_sphere_data(), dtype=np.float64)
+        self.spheres_data = sphere_array(world)
 
         # Material data: [type, param1, param2, param3, param4]
         # Type 0: Lambertian [type, albedo_r, albedo_g, albedo_b, unused]
         # Type 1: Metal [type, albedo_r, albedo_g, albedo_b, fuzz]
         # Type 2: Dielectric [type, ref_idx, unused, unused, unused]
         # Default to Lambertian with white color
-        self.materials_data = np.array(world.get_material_data(), dtype=np.float64)
+        self.materials_data = material_array(world)
 
         # Camera data: [origin, lower_left_corner, horizontal, vertical, lens_radius, u, v]
-        self.camera_data = np.array(camera.get_data(), dtype=np.float64)
+        self.camera_data = camera_array(camera)
 
-    def render(
+        # BVH node bounds: [min_x, min_y, min_z, max_x, max_y, max_z]
+        # BVH node links: [offset, count, axis] (see bvh_hit_numba)
+        # Spheres and materials are reordered so that every leaf covers a
+        # contiguous range of them.
+        self.bvh_bounds, self.bvh_links, order = bvh_arrays(world)
+        self.spheres_data = self.spheres_data[order]
+        self.materials_data = self.materials_data[order]
+
+    def _transfer_scene_data(self) -> None:
+        """Copy the scene arrays to the GPU"""
+        self.device_scene = tuple(
+            cuda.to_device(array)
+            for array in (
+                self.camera_data,
+                self.spheres_data,
+                self.materials_data,
+                self.bvh_bounds,
+                self.bvh_links,
+            )
+        )
+
+    def render_pixel_list(
         self,
-        world: HittableList,
-        camera: Camera,
+        pixels: npt.NDArray[np.int64],
         image_width: int,
         image_height: int,
         samples_per_pixel: int,
         max_depth: int,
-    ) -> None:
-        """Render using CUDA acceleration"""
-        print(
-            f"Rendering {image_width}x{image_height} with CUDA GPU acceleration",
-            file=sys.stderr,
-        )
-        print(
-            f"Samples per pixel: {samples_per_pixel}, Max depth: {max_depth}",
-            file=sys.stderr,
+        roulette_depth: int,
+        seed: int,
+        sample_offset: int,
+        sampler: int,
+        strata: int,
+    ) -> npt.NDArray[np.float64]:
+        """Sums and sums of squares of the samples of the listed pixels.
+
+        Pixels are numbered row by row from the top-left corner, and the
+        result has shape (n, 2, 3). Used by adaptive sampling.
+        """
+        d_pixels = cuda.to_device(np.ascontiguousarray(pixels, dtype=np.int64))
+        d_output = cuda.device_array((pixels.shape[0], 2, 3), dtype=np.float64)
+        grid_size = (
+            pixels.shape[0] + PIXEL_LIST_BLOCK_SIZE - 1
+        ) // PIXEL_LIST_BLOCK_SIZE
+
+        render_pixel_list_cuda[grid_size, PIXEL_LIST_BLOCK_SIZE](
+            d_pixels,
+            image_width,
+            image_height,
+            samples_per_pixel,
+            *self.device_scene,
+            max_depth,
+            roulette_depth,
+            seed,
+            sample_offset,
+            sampler,
+            strata,
+            d_output,
         )
+        cuda.synchronize()
+        return d_output.copy_to_host()
 
+    def prepare(self, world: HittableList, camera: Camera) -> None:
+        """Copy the scene to the GPU and load the kernels, once for any number
+        of ``render_frame`` and ``render_pixel_list`` calls"""
         # Prepare scene data for CUDA
         self._prepare_scene_data(world, camera)
 
         # Explicitly select CUDA device 0 to avoid IndexError
         cuda.select_device(0)
 
+        # Transfer data to GPU
+        self._transfer_scene_data()
+
+        # Compile the kernels, or load them from the on-disk cache
+        print("JIT compiling (cached after the first run)...", file=sys.stderr)
+        compile_kernels()
+
+    def render_frame(
+        self,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        roulette_depth: int,
+        seed: int,
+        sample_offset: int,
+        sampler: int,
+        strata: int,
+    ) -> npt.NDArray[np.float64]:
+        """Sums of samples ``sample_offset`` to ``sample_offset +
+        samples_per_pixel - 1`` of every pixel of the prepared scene, as an
+        (image_height, image_width, 3) array"""
         # Calculate optimal block and grid sizes
         block_size = (16, 16)
         grid_size = (
@@ -64,62 +146,98 @@ class CudaRenderer:
             (image_height + block_size[1] - 1) // block_size[1],
         )
 
-        print(f"CUDA grid size: {grid_size}, block size: {block_size}", file=sys.stderr)
-
-        # Transfer data to GPU
-        d_spheres_data = cuda.to_device(self.spheres_data)
-        d_materials_data = cuda.to_device(self.materials_data)
-        d_camera_data = cuda.to_device(self.camera_data)
-
         # Allocate output array on GPU
         output_shape = (image_height, image_width, 3)
         d_output = cuda.device_array(output_shape, dtype=np.float64)
 
-        # Initialize random number generator states
-        total_threads = image_width * image_height
-        rng_states = create_xoroshiro128p_states(total_threads, seed=42)
-
-        print("Launching CUDA kernel...", file=sys.stderr)
-
         # Launch CUDA kernel
         render_pixels_cuda[grid_size, block_size](
             image_width,
             image_height,
             samples_per_pixel,
-            d_camera_data,
-            d_spheres_data,
-            d_materials_data,
+            *self.device_scene,
             max_depth,
-            rng_states,
+            roulette_depth,
+            seed,
+            sample_offset,
+            sampler,
+            strata,
             d_output,
         )
 
         # Wait for GPU to complete
         cuda.synchronize()
-        print("CUDA kernel completed", file=sys.stderr)
 
         # Transfer result back to host
-        output = d_output.copy_to_host()
-
-        # Output PPM header
-        print("P3")
-        print(f"{image_width} {image_height}")
-        print("255")
-
-        # Output image data
-        for j in range(image_height):
-            print(
-                f"\rConverting scanlines: {j + 1}/{image_height}",
-                end=" ",
-                file=sys.stderr,
-            )
+        return d_output.copy_to_host()
 
-            for i in range(image_width):
-                # Convert back to Color object for output
-                pixel_color = Color(output[j, i, 0], output[j, i, 1], output[j, i, 2])
-                print(get_color(pixel_color, samples_per_pixel))
+    def render(
+        self,
+        world: HittableList,
+        camera: Camera,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        seed: int,
+        adaptive: AdaptiveSampling | None = None,
+        roulette_depth: int | None = None,
+        sampler: str = "random",
+        sample_offset: int = 0,
+        strata: int | None = None,
+    ) -> npt.NDArray[np.float64]:
+        """Render using CUDA acceleration"""
+        print(
+            f"Rendering {image_width}x{image_height} with CUDA GPU acceleration",
+            file=sys.stderr,
+        )
+        print(
+            f"Samples per pixel: {samples_per_pixel}, Max depth: {max_depth}, "
+            f"Seed: {seed}",
+            file=sys.stderr,
+        )
+
+        self.prepare(world, camera)
+        if roulette_depth is None:
+            roulette_depth = max_depth
+        sampler_code, strata = sampler_parameters(sampler, samples_per_pixel, strata)
+
+        if adaptive is not None:
+            output = render_adaptive(
+                lambda pixels, sample_offset, samples: self.render_pixel_list(
+                    pixels,
+                    image_width,
+                    image_height,
+                    samples,
+                    max_depth,
+                    roulette_depth,
+                    seed,
+                    sample_offset,
+                    sampler_code,
+                    strata,
+                ),
+                image_width,
+                image_height,
+                samples_per_pixel,
+                adaptive,
+            )
+        else:
+            print("Launching CUDA kernel...", file=sys.stderr)
+            output = self.render_frame(
+                image_width,
+                image_height,
+                samples_per_pixel,
+                max_depth,
+                roulette_depth,
+                seed,
+                sample_offset,
+                sampler_code,
+                strata,
+            )
+            print("CUDA kernel completed", file=sys.stderr)
 
-        print("\nDone.", file=sys.stderr)
+        print("Done.", file=sys.stderr)
+        return output
 
 
 def render_with_cuda(
@@ -129,9 +247,26 @@ def render_with_cuda(
     image_height: int,
     samples_per_pixel: int,
     max_depth: int,
-) -> None:
+    seed: int,
+    adaptive: AdaptiveSampling | None = None,
+    roulette_depth: int | None = None,
+    sampler: str = "random",
+    sample_offset: int = 0,
+    strata: int | None = None,
+) -> npt.NDArray[np.float64]:
     """Main function for CUDA-accelerated rendering"""
     renderer = CudaRenderer()
-    renderer.render(
-        world, camera, image_width, image_height, samples_per_pixel, max_depth
+    return renderer.render(
+        world,
+        camera,
+        image_width,
+        image_height,
+        samples_per_pixel,
+        max_depth,
+        seed,
+        adaptive,
+        roulette_depth,
+        sampler,
+        sample_offset,
+        strata,
     )
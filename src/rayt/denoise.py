@@ -0,0 +1,141 @@
+"""Edge-aware denoising of rendered framebuffers.
+
+The filter is the edge-avoiding À-trous wavelet transform of Dammertz et
+al. (2010): a 5x5 B3-spline kernel applied ``iterations`` times with its taps
+spread 1, 2, 4, ... pixels apart, which blurs noise over a wide area at the
+cost of a handful of small passes. Every tap is weighted down by its
+difference to the center pixel in color and in the AOV buffers of
+``rayt.aov``, so the blur stops at silhouettes, creases and material
+boundaries.
+
+Color is divided by the first-hit albedo before filtering and multiplied back
+afterwards, so the filter smooths the lighting without smearing the surface
+colors into each other.
+"""
+
+import math
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+from numba import njit, prange
+
+from rayt.aov import AOVBuffers
+
+# Albedo channels below this are not divided out, they would amplify noise
+MIN_ALBEDO = 0.01
+
+# B3-spline kernel weights for tap offsets 0, 1 and 2
+_KERNEL = np.array([3.0 / 8.0, 1.0 / 4.0, 1.0 / 16.0])
+
+
+@dataclass(frozen=True)
+class Denoising:
+    """Settings of the denoising pass.
+
+    Each ``sigma_*`` is the difference between a tap and the center pixel at
+    which the tap's weight drops to 1/e: in albedo-divided color, in albedo,
+    in unit normal, and in depth relative to the depth of the center pixel
+    per pixel of tap spacing. ``sigma_color`` holds for one sample per pixel
+    and shrinks with the noise, as one over the square root of the samples
+    per pixel, and it is halved on every iteration.
+    """
+
+    iterations: int = 3
+    sigma_color: float = 1.2
+    sigma_albedo: float = 0.3
+    sigma_normal: float = 0.3
+    sigma_depth: float = 0.05
+
+
+@njit(parallel=True, cache=True)
+def atrous_pass_numba(
+    source,
+    albedo,
+    normal,
+    depth,
+    step,
+    sigma_color,
+    sigma_albedo,
+    sigma_normal,
+    sigma_depth,
+    kernel,
+    output,
+):
+    """One edge-avoiding À-trous pass with taps ``step`` pixels apart,
+    reading (rows, cols, 3) ``source`` and writing ``output``"""
+    image_height, image_width = source.shape[:2]
+    inv_color = 1.0 / (sigma_color * sigma_color)
+    inv_albedo = 1.0 / (sigma_albedo * sigma_albedo)
+    inv_normal = 1.0 / (sigma_normal * sigma_normal)
+    inv_depth = 1.0 / (sigma_depth * step)
+    for row in prange(image_height):
+        for i in range(image_width):
+            total_r = 0.0
+            total_g = 0.0
+            total_b = 0.0
+            total_weight = 0.0
+            for dy in range(-2, 3):
+                y = row + dy * step
+                if y < 0 or y >= image_height:
+                    continue
+                for dx in range(-2, 3):
+                    x = i + dx * step
+                    if x < 0 or x >= image_width:
+                        continue
+
+                    distance = 0.0
+                    for axis in range(3):
+                        d = source[y, x, axis] - source[row, i, axis]
+                        distance += d * d * inv_color
+                        d = albedo[y, x, axis] - albedo[row, i, axis]
+                        distance += d * d * inv_albedo
+                        d = normal[y, x, axis] - normal[row, i, axis]
+                        distance += d * d * inv_normal
+                    d = depth[y, x] - depth[row, i]
+                    distance += abs(d) * inv_depth / max(depth[row, i], 1e-3)
+
+                    weight = kernel[abs(dy)] * kernel[abs(dx)] * np.exp(-distance)
+                    total_r += weight * source[y, x, 0]
+                    total_g += weight * source[y, x, 1]
+                    total_b += weight * source[y, x, 2]
+                    total_weight += weight
+
+            # The center tap has weight 1 times its kernel weight, never 0
+            output[row, i, 0] = total_r / total_weight
+            output[row, i, 1] = total_g / total_weight
+            output[row, i, 2] = total_b / total_weight
+
+
+def denoise_image(
+    image: npt.NDArray[np.float64],
+    samples_per_pixel: int,
+    aovs: AOVBuffers,
+    settings: Denoising,
+) -> npt.NDArray[np.float64]:
+    """Denoise an (image_height, image_width, 3) framebuffer of sample sums.
+
+    Returns a framebuffer scaled like the input, each pixel holding its
+    filtered mean times ``samples_per_pixel``.
+    """
+    albedo = np.maximum(aovs.albedo, MIN_ALBEDO)
+    source = np.ascontiguousarray(image / samples_per_pixel / albedo)
+    output = np.empty_like(source)
+    sigma_color = settings.sigma_color / math.sqrt(samples_per_pixel)
+    for iteration in range(settings.iterations):
+        atrous_pass_numba(
+            source,
+            aovs.albedo,
+            aovs.normal,
+            aovs.depth,
+            1 << iteration,
+            sigma_color,
+            settings.sigma_albedo,
+            settings.sigma_normal,
+            settings.sigma_depth,
+            _KERNEL,
+            output,
+        )
+        source, output = output, source
+        sigma_color *= 0.5
+    return samples_per_pixel * source * albedo
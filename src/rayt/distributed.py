@@ -0,0 +1,423 @@
+"""Distributed rendering with a coordinator and workers talking over TCP.
+
+The coordinator splits the frame into leases, each a tile and a range of
+sample indices, and hands them to the workers that connect to it. A worker
+receives the scene once, as the arrays of ``rayt.scheduler.scene_arrays``,
+then repeatedly takes a lease, renders it with a ``TileRenderer`` and sends
+back the tile's sample sums, which the coordinator adds into the frame.
+
+Leases are re-issued when their worker disconnects, and when they run past
+the lease timeout another idle worker gets a copy. Only the first result of a
+lease is merged. Each sample draws from its own random stream, so a lease
+returns the same sums whichever worker renders it.
+
+Messages are a 4-byte big-endian length, a JSON header holding the length of
+a binary payload, then the payload. Arrays travel as raw native-endian bytes
+described in the header, never pickled.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from multiprocessing.process import BaseProcess
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from rayt.sampling import sampler_parameters
+from rayt.scheduler import SCHEDULER_ENGINES, TileRenderer, scene_arrays, tiles
+from rayt_rust._core import Camera, HittableList
+
+DEFAULT_PORT = 7878
+
+# Tile size and samples per lease
+LEASE_TILE_SIZE = 64
+LEASE_SAMPLES = 64
+
+# Seconds before a lease that has not come back is also given to another
+# worker
+DEFAULT_LEASE_TIMEOUT = 60.0
+
+# Seconds a worker waits before asking again when every lease is out
+WAIT_INTERVAL = 0.5
+
+# Seconds a worker keeps trying to reach the coordinator
+CONNECT_TIMEOUT = 30.0
+
+
+def send_message(
+    sock: socket.socket, header: dict[str, Any], payload: bytes = b""
+) -> None:
+    """Send a JSON header and a binary payload"""
+    data = json.dumps({**header, "payload": len(payload)}).encode()
+    sock.sendall(struct.pack(">I", len(data)) + data + payload)
+
+
+def _receive_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(min(size - len(data), 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data += chunk
+    return bytes(data)
+
+
+def receive_message(sock: socket.socket) -> tuple[dict[str, Any], bytes]:
+    """Receive a message sent by ``send_message``"""
+    (size,) = struct.unpack(">I", _receive_exactly(sock, 4))
+    header = json.loads(_receive_exactly(sock, size))
+    return header, _receive_exactly(sock, header["payload"])
+
+
+def pack_arrays(
+    arrays: dict[str, npt.NDArray[np.generic]],
+) -> tuple[list[list[Any]], bytes]:
+    """Layout ([name, dtype, shape] per array) and bytes of arrays"""
+    layout = [
+        [key, array.dtype.str, list(array.shape)] for key, array in arrays.items()
+    ]
+    payload = b"".join(
+        np.ascontiguousarray(array).tobytes() for array in arrays.values()
+    )
+    return layout, payload
+
+
+def unpack_arrays(
+    layout: list[list[Any]], payload: bytes
+) -> dict[str, npt.NDArray[np.generic]]:
+    """Arrays packed by ``pack_arrays``"""
+    arrays = {}
+    offset = 0
+    for key, dtype, shape in layout:
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        arrays[key] = np.frombuffer(
+            payload, dtype=dtype, count=count, offset=offset
+        ).reshape(shape)
+        offset += count * dtype.itemsize
+    return arrays
+
+
+@dataclass(frozen=True)
+class Lease:
+    """Samples ``sample_offset`` to ``sample_offset + samples - 1`` of the tile
+    (x0, y0, width, height)"""
+
+    lease_id: int
+    tile: tuple[int, int, int, int]
+    sample_offset: int
+    samples: int
+
+
+@dataclass
+class LeaseTable:
+    """Leases waiting, issued to workers and finished, shared by the
+    connection threads of the coordinator"""
+
+    pending: deque[Lease]
+    timeout: float
+    # Holders of every issued lease, and the time it expires
+    issued: dict[int, tuple[Lease, set[int], float]] = field(default_factory=dict)
+    finished: set[int] = field(default_factory=set)
+    reissued: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    done: threading.Event = field(default_factory=threading.Event)
+
+    def __post_init__(self) -> None:
+        self.total = len(self.pending)
+        if self.total == 0:
+            self.done.set()
+
+    def acquire(self, worker: int) -> Lease | None:
+        """Next lease for ``worker``: a waiting one, else a copy of an expired
+        lease the worker does not hold, else None"""
+        now = time.monotonic()
+        with self.lock:
+            if self.pending:
+                lease = self.pending.popleft()
+                self.issued[lease.lease_id] = (lease, {worker}, now + self.timeout)
+                return lease
+
+            for lease_id, (lease, holders, expires) in self.issued.items():
+                if expires < now and worker not in holders:
+                    holders.add(worker)
+                    self.issued[lease_id] = (lease, holders, now + self.timeout)
+                    self.reissued += 1
+                    return lease
+        return None
+
+    def complete(self, lease_id: int) -> bool:
+        """Mark a lease finished, returns False if it already was"""
+        with self.lock:
+            if lease_id in self.finished or lease_id not in self.issued:
+                return False
+            del self.issued[lease_id]
+            self.finished.add(lease_id)
+            if len(self.finished) == self.total:
+                self.done.set()
+            return True
+
+    def release(self, worker: int) -> None:
+        """Give the leases of a disconnected worker back, unless another
+        worker holds them too"""
+        with self.lock:
+            for lease_id, (lease, holders, _) in list(self.issued.items()):
+                holders.discard(worker)
+                if not holders:
+                    del self.issued[lease_id]
+                    self.pending.appendleft(lease)
+                    self.reissued += 1
+
+
+class Coordinator:
+    """Serves the leases of a frame to workers and merges their results"""
+
+    def __init__(
+        self,
+        world: HittableList,
+        camera: Camera,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        seed: int,
+        roulette_depth: int | None = None,
+        sampler: str = "random",
+        lease_timeout: float = DEFAULT_LEASE_TIMEOUT,
+        tile_size: int = LEASE_TILE_SIZE,
+        lease_samples: int = LEASE_SAMPLES,
+    ) -> None:
+        _, strata = sampler_parameters(sampler, samples_per_pixel)
+        self.job = {
+            "image_width": image_width,
+            "image_height": image_height,
+            "max_depth": max_depth,
+            "roulette_depth": max_depth if roulette_depth is None else roulette_depth,
+            "seed": seed,
+            "sampler": sampler,
+            "strata": strata,
+        }
+        self.layout, self.scene = pack_arrays(scene_arrays(world, camera))
+        self.framebuffer = np.zeros((image_height, image_width, 3), dtype=np.float64)
+        self.merge_lock = threading.Lock()
+
+        self.all_leases = [
+            Lease(
+                lease_id, tile, offset, min(lease_samples, samples_per_pixel - offset)
+            )
+            for lease_id, (offset, tile) in enumerate(
+                (offset, tile)
+                for offset in range(0, samples_per_pixel, lease_samples)
+                for tile in tiles(image_width, image_height, tile_size)
+            )
+        ]
+        self.leases = LeaseTable(deque(self.all_leases), lease_timeout)
+
+    def _assignment(self, worker: int) -> dict[str, Any]:
+        if self.leases.done.is_set():
+            return {"type": "done"}
+        lease = self.leases.acquire(worker)
+        if lease is None:
+            return {"type": "wait", "seconds": WAIT_INTERVAL}
+        return {
+            "type": "lease",
+            "lease_id": lease.lease_id,
+            "tile": lease.tile,
+            "sample_offset": lease.sample_offset,
+            "samples": lease.samples,
+        }
+
+    def _merge(self, worker: int, header: dict[str, Any], payload: bytes) -> None:
+        x0, y0, tile_width, tile_height = self.all_leases[header["lease_id"]].tile
+        sums = np.frombuffer(payload, dtype=np.float64).reshape(
+            tile_height, tile_width, 3
+        )
+        # The table decides which copy of a re-issued lease counts
+        with self.merge_lock:
+            if self.leases.complete(header["lease_id"]):
+                self.framebuffer[y0 : y0 + tile_height, x0 : x0 + tile_width] += sums
+
+    def handle(self, sock: socket.socket, worker: int) -> None:
+        """Serve one worker connection until the frame is done or the worker
+        goes away"""
+        try:
+            header, _ = receive_message(sock)
+            if header.get("type") != "hello":
+                return
+            send_message(
+                sock,
+                {"type": "scene", "job": self.job, "arrays": self.layout},
+                self.scene,
+            )
+            while True:
+                header, payload = receive_message(sock)
+                if header["type"] == "result":
+                    self._merge(worker, header, payload)
+                reply = self._assignment(worker)
+                send_message(sock, reply)
+                if reply["type"] == "done":
+                    return
+        except (OSError, ValueError, KeyError, IndexError):
+            # Whatever it was rendering goes back to the other workers
+            return
+        finally:
+            self.leases.release(worker)
+
+    def serve(
+        self,
+        host: str,
+        port: int = DEFAULT_PORT,
+        local_workers: int = 0,
+        engine: str = "numba",
+    ) -> npt.NDArray[np.float64]:
+        """Serve leases on (host, port) until every lease is merged, and return
+        the (image_height, image_width, 3) framebuffer of sample sums.
+
+        ``local_workers`` worker processes with the ``engine`` engine are
+        started on this machine, sharing its CPUs.
+        """
+        coordinator = self
+        workers = iter(range(1, sys.maxsize))
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self) -> None:
+                worker = next(workers)
+                print(
+                    f"\nWorker {worker} connected from {self.client_address[0]}",
+                    file=sys.stderr,
+                )
+                coordinator.handle(self.request, worker)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        with socketserver.ThreadingTCPServer((host, port), Handler) as server:
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            port = server.server_address[1]
+            print(
+                f"Coordinator listening on {host}:{port}, {self.leases.total} leases",
+                file=sys.stderr,
+            )
+            processes = start_local_workers(local_workers, port, engine)
+            while not self.leases.done.wait(1.0):
+                print(
+                    f"\rLeases done: {len(self.leases.finished)}/{self.leases.total}",
+                    end=" ",
+                    file=sys.stderr,
+                )
+            # Let connected workers ask once more and hear that it is done
+            time.sleep(2 * WAIT_INTERVAL)
+            server.shutdown()
+            for process in processes:
+                process.join()
+
+        print(
+            f"\nLeases done: {self.leases.total}, re-issued: {self.leases.reissued}",
+            file=sys.stderr,
+        )
+        return self.framebuffer
+
+
+def _connect(host: str, port: int) -> socket.socket:
+    """Connect to the coordinator, retrying until CONNECT_TIMEOUT"""
+    deadline = time.monotonic() + CONNECT_TIMEOUT
+    while True:
+        try:
+            return socket.create_connection((host, port))
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(WAIT_INTERVAL)
+
+
+def run_worker(
+    host: str,
+    port: int = DEFAULT_PORT,
+    engine: str = "numba",
+    threads: int | None = None,
+) -> int:
+    """Render leases for the coordinator at (host, port) until the frame is
+    done, returns the number of leases rendered"""
+    if engine not in SCHEDULER_ENGINES:
+        raise ValueError(
+            f"workers run the {' and '.join(SCHEDULER_ENGINES)} engines, got {engine!r}"
+        )
+
+    rendered = 0
+    with _connect(host, port) as sock:
+        # Sending fails like receiving once the coordinator is gone
+        try:
+            send_message(sock, {"type": "hello"})
+            header, payload = receive_message(sock)
+            job = header["job"]
+            renderer = TileRenderer(
+                engine, unpack_arrays(header["arrays"], payload), threads
+            )
+            print(
+                f"Worker connected to {host}:{port}, rendering with {engine}",
+                file=sys.stderr,
+            )
+
+            send_message(sock, {"type": "request"})
+            while True:
+                reply, _ = receive_message(sock)
+                match reply["type"]:
+                    case "done":
+                        break
+                    case "wait":
+                        time.sleep(reply["seconds"])
+                        send_message(sock, {"type": "request"})
+                    case _:
+                        sums = renderer.render(
+                            tuple(reply["tile"]),
+                            job["image_width"],
+                            job["image_height"],
+                            reply["samples"],
+                            job["max_depth"],
+                            job["roulette_depth"],
+                            job["seed"],
+                            reply["sample_offset"],
+                            job["sampler"],
+                            job["strata"],
+                        )
+                        rendered += 1
+                        send_message(
+                            sock,
+                            {
+                                "type": "result",
+                                "lease_id": reply["lease_id"],
+                                "tile": reply["tile"],
+                            },
+                            sums.tobytes(),
+                        )
+        except ConnectionError:
+            print("Coordinator closed the connection", file=sys.stderr)
+
+    print(f"Worker done after {rendered} leases", file=sys.stderr)
+    return rendered
+
+
+def start_local_workers(
+    count: int, port: int, engine: str = "numba"
+) -> list[BaseProcess]:
+    """Start ``count`` worker processes for a coordinator on this machine,
+    splitting the CPUs between them"""
+    threads = max(1, (os.cpu_count() or 1) // max(count, 1))
+    context = get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=("127.0.0.1", port, engine, threads))
+        for _ in range(count)
+    ]
+    for process in processes:
+        process.start()
+    return processes
@@ -1,150 +1,362 @@
 import math
 
 import numpy as np
-from numba import jit
-
-
-@jit(nopython=True)
+from numba import float64, int64, jit, njit, prange, types
+
+from rayt.rng import halton_sample, random_double, seed_rng
+from rayt.sampling import HALTON_BASES, HALTON_SAMPLER, STRATIFIED_SAMPLER
+
+# Depth of the traversal stack used by ``bvh_hit_numba``. The Rust builder
+# bounds the BVH depth so that it never needs more entries than this.
+BVH_STACK_SIZE = 64
+
+# Explicit signature of the render entry point, used to compile it eagerly
+# (see ``compile_kernels``). Arrays are C-contiguous.
+RENDER_IMAGE_SIGNATURE = types.none(
+    int64,  # x0
+    int64,  # y0
+    int64,  # image_width
+    int64,  # image_height
+    int64,  # samples_per_pixel
+    float64[::1],  # camera_data
+    float64[:, ::1],  # spheres_data
+    float64[:, ::1],  # materials_data
+    float64[:, ::1],  # bvh_bounds
+    int64[:, ::1],  # bvh_links
+    int64,  # max_depth
+    int64,  # roulette_depth
+    int64,  # seed
+    int64,  # sample_offset
+    int64,  # sampler
+    int64,  # strata
+    float64[:, :, ::1],  # output
+)
+RENDER_PIXEL_LIST_SIGNATURE = types.none(
+    int64[::1],  # pixels
+    int64,  # image_width
+    int64,  # image_height
+    int64,  # samples_per_pixel
+    float64[::1],  # camera_data
+    float64[:, ::1],  # spheres_data
+    float64[:, ::1],  # materials_data
+    float64[:, ::1],  # bvh_bounds
+    int64[:, ::1],  # bvh_links
+    int64,  # max_depth
+    int64,  # roulette_depth
+    int64,  # seed
+    int64,  # sample_offset
+    int64,  # sampler
+    int64,  # strata
+    float64[:, :, ::1],  # output
+)
+
+# Pixels handed to a thread at a time by ``render_pixel_list_numba``
+PIXEL_LIST_CHUNK = 8
+
+# Vectors are plain (x, y, z) tuples: Numba keeps them in registers, so none of
+# the helpers below allocate on the heap.
+
+
+@jit(nopython=True, cache=True)
+def add_numba(u, v):
+    return (u[0] + v[0], u[1] + v[1], u[2] + v[2])
+
+
+@jit(nopython=True, cache=True)
+def sub_numba(u, v):
+    return (u[0] - v[0], u[1] - v[1], u[2] - v[2])
+
+
+@jit(nopython=True, cache=True)
+def mul_numba(u, v):
+    return (u[0] * v[0], u[1] * v[1], u[2] * v[2])
+
+
+@jit(nopython=True, cache=True)
+def scale_numba(v, s):
+    return (v[0] * s, v[1] * s, v[2] * s)
+
+
+@jit(nopython=True, cache=True)
+def neg_numba(v):
+    return (-v[0], -v[1], -v[2])
+
+
+@jit(nopython=True, cache=True)
 def dot_numba(u, v):
     return u[0] * v[0] + u[1] * v[1] + u[2] * v[2]
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def length_squared_numba(v):
     return v[0] ** 2 + v[1] ** 2 + v[2] ** 2
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def length_numba(v):
     return math.sqrt(length_squared_numba(v))
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def unit_vector_numba(v):
     len_v = length_numba(v)
-    return np.array([v[0] / len_v, v[1] / len_v, v[2] / len_v])
+    return (v[0] / len_v, v[1] / len_v, v[2] / len_v)
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def reflect_numba(v, n):
     dot_vn = dot_numba(v, n)
-    return np.array(
-        [
-            v[0] - 2.0 * dot_vn * n[0],
-            v[1] - 2.0 * dot_vn * n[1],
-            v[2] - 2.0 * dot_vn * n[2],
-        ]
+    return (
+        v[0] - 2.0 * dot_vn * n[0],
+        v[1] - 2.0 * dot_vn * n[1],
+        v[2] - 2.0 * dot_vn * n[2],
     )
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def refract_numba(uv, n, etai_over_etat):
-    cos_theta = dot_numba(-uv, n)
-    r_out_parallel = etai_over_etat * (uv + cos_theta * n)
+    cos_theta = -dot_numba(uv, n)
+    r_out_parallel = scale_numba(
+        add_numba(uv, scale_numba(n, cos_theta)), etai_over_etat
+    )
     r_out_perp_len = -math.sqrt(1.0 - length_squared_numba(r_out_parallel))
-    r_out_perp = r_out_perp_len * n
-    return r_out_parallel + r_out_perp
+    return add_numba(r_out_parallel, scale_numba(n, r_out_perp_len))
 
 
-@jit(nopython=True)
-def random_unit_vector_numba():
-    a = np.random.uniform(0.0, 2.0 * math.pi)
-    z = np.random.uniform(-1.0, 1.0)
+@jit(nopython=True, cache=True)
+def random_unit_vector_numba(rng):
+    a = 2.0 * math.pi * random_double(rng)
+    z = -1.0 + 2.0 * random_double(rng)
     r = math.sqrt(1.0 - z * z)
-    return np.array([r * math.cos(a), r * math.sin(a), z])
+    return (r * math.cos(a), r * math.sin(a), z)
 
 
-@jit(nopython=True)
-def random_in_unit_disk_numba():
+@jit(nopython=True, cache=True)
+def random_in_unit_disk_numba(rng):
     """Generate random point in unit disk for depth of field"""
     while True:
-        p = np.array([np.random.uniform(-1.0, 1.0), np.random.uniform(-1.0, 1.0), 0.0])
+        p = (-1.0 + 2.0 * random_double(rng), -1.0 + 2.0 * random_double(rng), 0.0)
         if length_squared_numba(p) >= 1.0:
             continue
         return p
 
 
-@jit(nopython=True)
-def random_in_unit_sphere_numba():
+@jit(nopython=True, cache=True)
+def concentric_disk_numba(u1, u2):
+    """Map a point of the unit square to the unit disk (Shirley-Chiu concentric
+    mapping), keeping stratified points stratified"""
+    a = 2.0 * u1 - 1.0
+    b = 2.0 * u2 - 1.0
+    if a == 0.0 and b == 0.0:
+        return (0.0, 0.0, 0.0)
+    if abs(a) > abs(b):
+        r = a
+        phi = (math.pi / 4.0) * (b / a)
+    else:
+        r = b
+        phi = math.pi / 2.0 - (math.pi / 4.0) * (a / b)
+    return (r * math.cos(phi), r * math.sin(phi), 0.0)
+
+
+@jit(nopython=True, cache=True)
+def random_in_unit_sphere_numba(rng):
     while True:
-        p = np.array(
-            [
-                np.random.uniform(-1.0, 1.0),
-                np.random.uniform(-1.0, 1.0),
-                np.random.uniform(-1.0, 1.0),
-            ]
+        p = (
+            -1.0 + 2.0 * random_double(rng),
+            -1.0 + 2.0 * random_double(rng),
+            -1.0 + 2.0 * random_double(rng),
         )
         if length_squared_numba(p) >= 1.0:
             continue
         return p
 
 
-@jit(nopython=True)
-def sphere_hit_numba(
-    ray_origin, ray_direction, sphere_center, sphere_radius, t_min, t_max
-):
-    oc = ray_origin - sphere_center
+@jit(nopython=True, cache=True)
+def sphere_hit_numba(ray_origin, ray_direction, spheres_data, sphere_idx, t_min, t_max):
+    """Return the ray parameter of the nearest hit in (t_min, t_max), or -1.0.
+
+    Only the distance is computed here; the hit point and normal are derived
+    once for the closest sphere in ``ray_color_numba``.
+    """
+    oc = (
+        ray_origin[0] - spheres_data[sphere_idx, 0],
+        ray_origin[1] - spheres_data[sphere_idx, 1],
+        ray_origin[2] - spheres_data[sphere_idx, 2],
+    )
+    sphere_radius = spheres_data[sphere_idx, 3]
     a = length_squared_numba(ray_direction)
     half_b = dot_numba(oc, ray_direction)
     c = length_squared_numba(oc) - sphere_radius * sphere_radius
     discriminant = half_b * half_b - a * c
 
     if discriminant <= 0:
-        return False, 0.0, np.zeros(3), np.zeros(3), False
+        return -1.0
 
     root = math.sqrt(discriminant)
     temp = (-half_b - root) / a
+    if t_min < temp < t_max:
+        return temp
 
+    temp = (-half_b + root) / a
     if t_min < temp < t_max:
-        t = temp
-    else:
-        temp = (-half_b + root) / a
-        if t_min < temp < t_max:
-            t = temp
-        else:
-            return False, 0.0, np.zeros(3), np.zeros(3), False
-
-    hit_point = ray_origin + t * ray_direction
-    outward_normal = (hit_point - sphere_center) / sphere_radius
+        return temp
+
+    return -1.0
+
+
+@jit(nopython=True, cache=True)
+def inverse_direction_numba(ray_direction):
+    """Componentwise inverse of a direction, infinite for zero components"""
+    return (
+        1.0 / ray_direction[0] if ray_direction[0] != 0.0 else np.inf,
+        1.0 / ray_direction[1] if ray_direction[1] != 0.0 else np.inf,
+        1.0 / ray_direction[2] if ray_direction[2] != 0.0 else np.inf,
+    )
+
+
+@jit(nopython=True, cache=True)
+def aabb_hit_numba(bvh_bounds, node, ray_origin, inv_direction, t_min, t_max):
+    """Slab test of a ray against the bounds of a BVH node"""
+    for axis in range(3):
+        t0 = (bvh_bounds[node, axis] - ray_origin[axis]) * inv_direction[axis]
+        t1 = (bvh_bounds[node, 3 + axis] - ray_origin[axis]) * inv_direction[axis]
+        if inv_direction[axis] < 0.0:
+            t0, t1 = t1, t0
+        # Written as comparisons so that NaN slabs are ignored
+        if t0 > t_min:  # noqa: PLR1730
+            t_min = t0
+        if t1 < t_max:  # noqa: PLR1730
+            t_max = t1
+        if t_max < t_min:
+            return False
+
+    return True
+
+
+@jit(nopython=True, cache=True)
+def bvh_hit_numba(
+    ray_origin,
+    ray_direction,
+    spheres_data,
+    bvh_bounds,
+    bvh_links,
+    t_min,
+    t_max,
+    stack,
+):
+    """Return (t, sphere_idx) of the closest hit in (t_min, t_max).
+
+    ``sphere_idx`` is -1 when the ray misses every sphere. The BVH comes from
+    ``HittableList.get_bvh_data``: node ``k`` has the bounds ``bvh_bounds[k]``
+    and the links ``bvh_links[k] = (offset, count, axis)``. A leaf (``count >
+    0``) holds spheres ``offset`` to ``offset + count - 1``; an interior node is
+    followed by its first child and ``offset`` is its second child. ``stack``
+    is scratch space of ``BVH_STACK_SIZE`` entries.
+    """
+    closest_t = t_max
+    hit_sphere_idx = -1
+    if bvh_links.shape[0] == 0:
+        return closest_t, hit_sphere_idx
+
+    inv_direction = inverse_direction_numba(ray_direction)
+    stack_size = 0
+    node = 0
+
+    while True:
+        if aabb_hit_numba(
+            bvh_bounds, node, ray_origin, inv_direction, t_min, closest_t
+        ):
+            offset = bvh_links[node, 0]
+            count = bvh_links[node, 1]
+            if count > 0:
+                for i in range(offset, offset + count):
+                    t = sphere_hit_numba(
+                        ray_origin, ray_direction, spheres_data, i, t_min, closest_t
+                    )
+                    if t > 0.0:
+                        closest_t = t
+                        hit_sphere_idx = i
+            elif inv_direction[bvh_links[node, 2]] < 0.0:
+                # Visit the second child first, it is nearer along the axis
+                stack[stack_size] = node + 1
+                stack_size += 1
+                node = offset
+                continue
+            else:
+                stack[stack_size] = offset
+                stack_size += 1
+                node += 1
+                continue
+
+        if stack_size == 0:
+            break
+        stack_size -= 1
+        node = stack[stack_size]
+
+    return closest_t, hit_sphere_idx
+
+
+@jit(nopython=True, cache=True)
+def hit_record_numba(ray_origin, ray_direction, spheres_data, sphere_idx, t):
+    """Return (hit_point, normal, front_face) for a hit found by sphere_hit_numba"""
+    hit_point = add_numba(ray_origin, scale_numba(ray_direction, t))
+    sphere_center = (
+        spheres_data[sphere_idx, 0],
+        spheres_data[sphere_idx, 1],
+        spheres_data[sphere_idx, 2],
+    )
+    outward_normal = scale_numba(
+        sub_numba(hit_point, sphere_center), 1.0 / spheres_data[sphere_idx, 3]
+    )
     front_face = dot_numba(ray_direction, outward_normal) < 0.0
-    normal = outward_normal if front_face else -outward_normal
+    normal = outward_normal if front_face else neg_numba(outward_normal)
+    return hit_point, normal, front_face
 
-    return True, t, hit_point, normal, front_face
+
+@jit(nopython=True, cache=True)
+def sky_color_numba(ray_direction):
+    """Background gradient seen by rays that miss every sphere"""
+    unit_direction = unit_vector_numba(ray_direction)
+    t = 0.5 * (unit_direction[1] + 1.0)
+    return (1.0 - 0.5 * t, 1.0 - 0.3 * t, 1.0)
 
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def schlick_numba(cosine, ref_idx):
     r0 = ((1.0 - ref_idx) / (1.0 + ref_idx)) ** 2
     return r0 + (1.0 - r0) * ((1.0 - cosine) ** 5)
 
 
-@jit(nopython=True)
-def scatter_lambertian_numba(ray_direction, hit_point, normal):
-    scatter_direction = normal + random_unit_vector_numba()
+@jit(nopython=True, cache=True)
+def scatter_lambertian_numba(ray_direction, hit_point, normal, rng):
+    scatter_direction = add_numba(normal, random_unit_vector_numba(rng))
     return True, hit_point, scatter_direction
 
 
-@jit(nopython=True)
-def scatter_metal_numba(ray_direction, hit_point, normal, fuzz):
+@jit(nopython=True, cache=True)
+def scatter_metal_numba(ray_direction, hit_point, normal, fuzz, rng):
     reflected = reflect_numba(unit_vector_numba(ray_direction), normal)
-    scattered_direction = reflected + fuzz * random_in_unit_sphere_numba()
+    scattered_direction = add_numba(
+        reflected, scale_numba(random_in_unit_sphere_numba(rng), fuzz)
+    )
     scattered = dot_numba(scattered_direction, normal) > 0.0
     return scattered, hit_point, scattered_direction
 
 
-@jit(nopython=True)
-def scatter_dielectric_numba(ray_direction, hit_point, normal, front_face, ref_idx):
+@jit(nopython=True, cache=True)
+def scatter_dielectric_numba(
+    ray_direction, hit_point, normal, front_face, ref_idx, rng
+):
     etai_over_etat = (1.0 / ref_idx) if front_face else ref_idx
     unit_direction = unit_vector_numba(ray_direction)
-    cos_theta = min(dot_numba(-unit_direction, normal), 1.0)
+    cos_theta = min(-dot_numba(unit_direction, normal), 1.0)
     sin_theta = math.sqrt(1.0 - cos_theta * cos_theta)
 
-    if etai_over_etat * sin_theta > 1.0 or np.random.random() < schlick_numba(
+    if etai_over_etat * sin_theta > 1.0 or random_double(rng) < schlick_numba(
         cos_theta, etai_over_etat
     ):
         # Reflect
-        reflected = reflect_numba(unit_direction, normal)
-        scattered_direction = reflected
+        scattered_direction = reflect_numba(unit_direction, normal)
     else:
         # Refract
         scattered_direction = refract_numba(unit_direction, normal, etai_over_etat)
@@ -152,133 +364,421 @@ def scatter_dielectric_numba(ray_direction, hit_point, normal, front_face, ref_i
     return True, hit_point, scattered_direction
 
 
-@jit(nopython=True)
-def ray_color_numba(ray_origin, ray_direction, spheres_data, materials_data, depth):
+@jit(nopython=True, cache=True)
+def russian_roulette_numba(color, rng):
+    """Russian roulette on a path throughput.
+
+    The path survives with probability equal to the largest component of its
+    throughput (at most 1), and survivors are divided by that probability so
+    the expected color stays the same. Returns (survived, throughput).
+    """
+    p = min(max(color[0], color[1], color[2]), 1.0)
+    if random_double(rng) >= p:
+        return False, color
+    return True, scale_numba(color, 1.0 / p)
+
+
+@jit(nopython=True, cache=True)
+def ray_color_numba(
+    ray_origin,
+    ray_direction,
+    spheres_data,
+    materials_data,
+    bvh_bounds,
+    bvh_links,
+    depth,
+    roulette_depth,
+    rng,
+    stack,
+):
+    """Color of a path followed for at most ``depth`` bounces.
+
+    Paths that bounced at least ``roulette_depth`` times go through Russian
+    roulette after every further bounce; ``roulette_depth >= depth`` turns it
+    off.
+    """
+    black = (0.0, 0.0, 0.0)
     if depth <= 0:
-        return np.array([0.0, 0.0, 0.0])
+        return black
 
-    current_ray_origin = ray_origin.copy()
-    current_ray_direction = ray_direction.copy()
-    current_color = np.array([1.0, 1.0, 1.0])
+    current_ray_origin = ray_origin
+    current_ray_direction = ray_direction
+    current_color = (1.0, 1.0, 1.0)
 
-    for _ in range(depth):
+    for bounce in range(1, depth + 1):
         # Find closest hit
-        closest_t = np.inf
-        hit_found = False
-        hit_sphere_idx = -1
-        hit_point = np.zeros(3)
-        hit_normal = np.zeros(3)
-        hit_front_face = False
-
-        for i in range(spheres_data.shape[0]):
-            sphere_center = spheres_data[i, :3]
-            sphere_radius = spheres_data[i, 3]
-
-            hit, t, point, normal, front_face = sphere_hit_numba(
-                current_ray_origin,
-                current_ray_direction,
-                sphere_center,
-                sphere_radius,
-                0.001,
-                closest_t,
-            )
+        closest_t, hit_sphere_idx = bvh_hit_numba(
+            current_ray_origin,
+            current_ray_direction,
+            spheres_data,
+            bvh_bounds,
+            bvh_links,
+            0.001,
+            np.inf,
+            stack,
+        )
 
-            if hit and t < closest_t:
-                closest_t = t
-                hit_found = True
-                hit_sphere_idx = i
-                hit_point = point
-                hit_normal = normal
-                hit_front_face = front_face
-
-        if not hit_found:
-            # Sky gradient
-            unit_direction = unit_vector_numba(current_ray_direction)
-            t = 0.5 * (unit_direction[1] + 1.0)
-            sky_color = (1.0 - t) * np.array([1.0, 1.0, 1.0]) + t * np.array(
-                [0.5, 0.7, 1.0]
-            )
-            return current_color * sky_color
+        if hit_sphere_idx < 0:
+            return mul_numba(current_color, sky_color_numba(current_ray_direction))
+
+        # Build the hit record for the closest sphere only
+        hit_point, hit_normal, hit_front_face = hit_record_numba(
+            current_ray_origin,
+            current_ray_direction,
+            spheres_data,
+            hit_sphere_idx,
+            closest_t,
+        )
 
         # Material scattering
-        material = materials_data[hit_sphere_idx]
-        material_type = int(material[0])
+        material_type = int(materials_data[hit_sphere_idx, 0])
 
         if material_type == 0:  # Lambertian
-            albedo = material[1:4]
+            albedo = (
+                materials_data[hit_sphere_idx, 1],
+                materials_data[hit_sphere_idx, 2],
+                materials_data[hit_sphere_idx, 3],
+            )
             scattered, new_origin, new_direction = scatter_lambertian_numba(
-                current_ray_direction, hit_point, hit_normal
+                current_ray_direction, hit_point, hit_normal, rng
             )
             if scattered:
-                current_color *= albedo
+                current_color = mul_numba(current_color, albedo)
                 current_ray_origin = new_origin
                 current_ray_direction = new_direction
             else:
-                return np.array([0.0, 0.0, 0.0])
+                return black
 
         elif material_type == 1:  # Metal
-            albedo = material[1:4]
-            fuzz = material[4]
+            albedo = (
+                materials_data[hit_sphere_idx, 1],
+                materials_data[hit_sphere_idx, 2],
+                materials_data[hit_sphere_idx, 3],
+            )
+            fuzz = materials_data[hit_sphere_idx, 4]
             scattered, new_origin, new_direction = scatter_metal_numba(
-                current_ray_direction, hit_point, hit_normal, fuzz
+                current_ray_direction, hit_point, hit_normal, fuzz, rng
             )
             if scattered:
-                current_color *= albedo
+                current_color = mul_numba(current_color, albedo)
                 current_ray_origin = new_origin
                 current_ray_direction = new_direction
             else:
-                return np.array([0.0, 0.0, 0.0])
+                return black
 
         elif material_type == 2:  # Dielectric
-            ref_idx = material[1]
+            ref_idx = materials_data[hit_sphere_idx, 1]
             scattered, new_origin, new_direction = scatter_dielectric_numba(
-                current_ray_direction, hit_point, hit_normal, hit_front_face, ref_idx
+                current_ray_direction,
+                hit_point,
+                hit_normal,
+                hit_front_face,
+                ref_idx,
+                rng,
             )
             # Dielectric doesn't attenuate color (white)
             current_ray_origin = new_origin
             current_ray_direction = new_direction
 
-    return np.array([0.0, 0.0, 0.0])  # Exceeded max depth
+        if bounce >= roulette_depth and bounce < depth:
+            survived, current_color = russian_roulette_numba(current_color, rng)
+            if not survived:
+                return black
 
+    return black  # Exceeded max depth
 
-@jit(nopython=True)
-def render_pixel_numba(
+
+@jit(nopython=True, cache=True)
+def camera_sample_numba(sampler, strata, seed, pixel_index, sample, rng):
+    """Position of a sample inside its pixel, in [0, 1)^2, and on the unit
+    lens disk, see ``rayt.sampling``"""
+    if sampler == HALTON_SAMPLER:
+        du = halton_sample(HALTON_BASES[0], sample, seed, pixel_index, 0)
+        dv = halton_sample(HALTON_BASES[1], sample, seed, pixel_index, 1)
+        disk = concentric_disk_numba(
+            halton_sample(HALTON_BASES[2], sample, seed, pixel_index, 2),
+            halton_sample(HALTON_BASES[3], sample, seed, pixel_index, 3),
+        )
+        return du, dv, disk
+
+    if sampler == STRATIFIED_SAMPLER:
+        cell = sample % (strata * strata)
+        du = (cell % strata + random_double(rng)) / strata
+        dv = (cell // strata + random_double(rng)) / strata
+    else:
+        du = random_double(rng)
+        dv = random_double(rng)
+    return du, dv, random_in_unit_disk_numba(rng)
+
+
+@jit(nopython=True, cache=True)
+def get_ray_numba(
+    i, j, image_width, image_height, camera_data, seed, sample, sampler, strata, rng
+):
+    """Generate the depth-of-field camera ray of sample ``sample`` of pixel
+    (i, j), j counted from the bottom, placed by the sampler"""
+    origin = (camera_data[0], camera_data[1], camera_data[2])
+    lower_left_corner = (camera_data[3], camera_data[4], camera_data[5])
+    horizontal = (camera_data[6], camera_data[7], camera_data[8])
+    vertical = (camera_data[9], camera_data[10], camera_data[11])
+    lens_radius = camera_data[12]
+    u = (camera_data[13], camera_data[14], camera_data[15])
+    v = (camera_data[16], camera_data[17], camera_data[18])
+
+    pixel_index = (image_height - 1 - j) * image_width + i
+    du, dv, disk = camera_sample_numba(sampler, strata, seed, pixel_index, sample, rng)
+    u_coord = (i + du) / (image_width - 1)
+    v_coord = (j + dv) / (image_height - 1)
+
+    # Depth of field ray generation
+    rd = scale_numba(disk, lens_radius)
+    offset = add_numba(scale_numba(u, rd[0]), scale_numba(v, rd[1]))
+    ray_origin = add_numba(origin, offset)
+    ray_direction = sub_numba(
+        add_numba(
+            lower_left_corner,
+            add_numba(scale_numba(horizontal, u_coord), scale_numba(vertical, v_coord)),
+        ),
+        ray_origin,
+    )
+
+    return ray_origin, ray_direction
+
+
+@jit(nopython=True, cache=True)
+def render_sample_numba(
     i,
     j,
     image_width,
     image_height,
-    samples_per_pixel,
     camera_data,
     spheres_data,
     materials_data,
+    bvh_bounds,
+    bvh_links,
     max_depth,
+    roulette_depth,
+    seed,
+    sample,
+    sampler,
+    strata,
+    rng,
+    stack,
 ):
-    pixel_color = np.array([0.0, 0.0, 0.0])
+    """Trace sample ``sample`` of pixel (i, j), j counted from the bottom.
+
+    The sample draws from the random stream keyed by ``(seed, pixel_index,
+    sample)``, where ``pixel_index`` numbers pixels row by row from the
+    top-left corner. ``rng`` is scratch space for the generator state and
+    ``stack`` for the BVH traversal.
+    """
+    pixel_index = (image_height - 1 - j) * image_width + i
+    seed_rng(rng, seed, pixel_index, sample)
+    ray_origin, ray_direction = get_ray_numba(
+        i, j, image_width, image_height, camera_data, seed, sample, sampler, strata, rng
+    )
+    return ray_color_numba(
+        ray_origin,
+        ray_direction,
+        spheres_data,
+        materials_data,
+        bvh_bounds,
+        bvh_links,
+        max_depth,
+        roulette_depth,
+        rng,
+        stack,
+    )
 
-    origin = camera_data[0:3]
-    lower_left_corner = camera_data[3:6]
-    horizontal = camera_data[6:9]
-    vertical = camera_data[9:12]
-    lens_radius = camera_data[12]
-    u = camera_data[13:16]
-    v = camera_data[16:19]
-
-    for _ in range(samples_per_pixel):
-        # Add random sampling
-        u_coord = (i + np.random.random()) / (image_width - 1)
-        v_coord = (j + np.random.random()) / (image_height - 1)
-
-        # Depth of field ray generation
-        rd = lens_radius * random_in_unit_disk_numba()
-        offset = u * rd[0] + v * rd[1]
-        ray_origin = origin + offset
-        ray_direction = (
-            lower_left_corner + u_coord * horizontal + v_coord * vertical - ray_origin
-        )
 
-        color = ray_color_numba(
-            ray_origin, ray_direction, spheres_data, materials_data, max_depth
+@jit(nopython=True, cache=True)
+def render_pixel_numba(
+    i,
+    j,
+    image_width,
+    image_height,
+    samples_per_pixel,
+    camera_data,
+    spheres_data,
+    materials_data,
+    bvh_bounds,
+    bvh_links,
+    max_depth,
+    roulette_depth,
+    seed,
+    sample_offset,
+    sampler,
+    strata,
+    rng,
+    stack,
+):
+    """Sum samples ``sample_offset`` to ``sample_offset + samples_per_pixel - 1``
+    of pixel (i, j), see ``render_sample_numba``."""
+    pixel_color = (0.0, 0.0, 0.0)
+
+    for s in range(samples_per_pixel):
+        color = render_sample_numba(
+            i,
+            j,
+            image_width,
+            image_height,
+            camera_data,
+            spheres_data,
+            materials_data,
+            bvh_bounds,
+            bvh_links,
+            max_depth,
+            roulette_depth,
+            seed,
+            sample_offset + s,
+            sampler,
+            strata,
+            rng,
+            stack,
         )
-        pixel_color += color
+        pixel_color = add_numba(pixel_color, color)
 
     return pixel_color
+
+
+# Releases the GIL, so other threads (rayt.animation's frame setup and output)
+# run while it traces
+@njit(parallel=True, cache=True, nogil=True)
+def render_image_numba(
+    x0,
+    y0,
+    image_width,
+    image_height,
+    samples_per_pixel,
+    camera_data,
+    spheres_data,
+    materials_data,
+    bvh_bounds,
+    bvh_links,
+    max_depth,
+    roulette_depth,
+    seed,
+    sample_offset,
+    sampler,
+    strata,
+    output,
+):
+    """Render a tile of the frame into a preallocated (rows, cols, 3) buffer.
+
+    The tile starts at pixel column ``x0`` and row ``y0`` (counted from the top
+    of the image) and its size is taken from ``output``. Pass ``x0=y0=0`` and a
+    full-size buffer to render the whole frame. Rows are distributed across
+    threads with ``prange``; the buffer receives unscaled sample sums of
+    samples ``sample_offset`` to ``sample_offset + samples_per_pixel - 1``, so
+    separately rendered sample ranges can simply be added together.
+    """
+    tile_height = output.shape[0]
+    tile_width = output.shape[1]
+
+    for row in prange(tile_height):
+        rng = np.empty(2, dtype=np.uint64)
+        stack = np.empty(BVH_STACK_SIZE, dtype=np.int64)
+        j = image_height - 1 - (y0 + row)
+        for col in range(tile_width):
+            pixel_color = render_pixel_numba(
+                x0 + col,
+                j,
+                image_width,
+                image_height,
+                samples_per_pixel,
+                camera_data,
+                spheres_data,
+                materials_data,
+                bvh_bounds,
+                bvh_links,
+                max_depth,
+                roulette_depth,
+                seed,
+                sample_offset,
+                sampler,
+                strata,
+                rng,
+                stack,
+            )
+            output[row, col, 0] = pixel_color[0]
+            output[row, col, 1] = pixel_color[1]
+            output[row, col, 2] = pixel_color[2]
+
+
+@njit(parallel=True, cache=True, nogil=True)
+def render_pixel_list_numba(
+    pixels,
+    image_width,
+    image_height,
+    samples_per_pixel,
+    camera_data,
+    spheres_data,
+    materials_data,
+    bvh_bounds,
+    bvh_links,
+    max_depth,
+    roulette_depth,
+    seed,
+    sample_offset,
+    sampler,
+    strata,
+    output,
+):
+    """Render the listed pixels into a preallocated (n, 2, 3) buffer.
+
+    Pixels are numbered row by row from the top-left corner. ``output[k]``
+    receives the sum and the sum of squares of samples ``sample_offset`` to
+    ``sample_offset + samples_per_pixel - 1`` of ``pixels[k]``, the same
+    samples that ``render_image_numba`` traces for that pixel. Used by
+    adaptive sampling, which needs the variance of every pixel.
+    """
+    n_pixels = pixels.shape[0]
+    n_chunks = (n_pixels + PIXEL_LIST_CHUNK - 1) // PIXEL_LIST_CHUNK
+
+    for chunk in prange(n_chunks):
+        rng = np.empty(2, dtype=np.uint64)
+        stack = np.empty(BVH_STACK_SIZE, dtype=np.int64)
+        for k in range(
+            chunk * PIXEL_LIST_CHUNK, min((chunk + 1) * PIXEL_LIST_CHUNK, n_pixels)
+        ):
+            i = pixels[k] % image_width
+            j = image_height - 1 - pixels[k] // image_width
+            pixel_sum = (0.0, 0.0, 0.0)
+            pixel_squares = (0.0, 0.0, 0.0)
+            for s in range(samples_per_pixel):
+                color = render_sample_numba(
+                    i,
+                    j,
+                    image_width,
+                    image_height,
+                    camera_data,
+                    spheres_data,
+                    materials_data,
+                    bvh_bounds,
+                    bvh_links,
+                    max_depth,
+                    roulette_depth,
+                    seed,
+                    sample_offset + s,
+                    sampler,
+                    strata,
+                    rng,
+                    stack,
+                )
+                pixel_sum = add_numba(pixel_sum, color)
+                pixel_squares = add_numba(pixel_squares, mul_numba(color, color))
+
+            for axis in range(3):
+                output[k, 0, axis] = pixel_sum[axis]
+                output[k, 1, axis] = pixel_squares[axis]
+
+
+def compile_kernels() -> None:
+    """Compile the render kernels for their explicit signatures.
+
+    Every kernel is declared with ``cache=True``, so this loads the machine code
+    from Numba's on-disk cache when it is present and populates the cache
+    otherwise.
+    """
+    render_image_numba.compile(RENDER_IMAGE_SIGNATURE)
+    render_pixel_list_numba.compile(RENDER_PIXEL_LIST_SIGNATURE)
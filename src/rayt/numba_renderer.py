@@ -2,9 +2,17 @@ import sys
 
 import numpy as np
 import numpy.typing as npt
+from numba import get_num_threads
 
-from rayt_rust._core import Camera, HittableList, get_color, Color
-from rayt.numba_optimized import render_pixel_numba
+from rayt.adaptive import AdaptiveSampling, render_adaptive
+from rayt.numba_optimized import (
+    compile_kernels,
+    render_image_numba,
+    render_pixel_list_numba,
+)
+from rayt.sampling import sampler_parameters
+from rayt.scene_data import bvh_arrays, camera_array, material_array, sphere_array
+from rayt_rust._core import Camera, HittableList
 
 
 class NumbaRenderer:
@@ -14,88 +22,183 @@ class NumbaRenderer:
         self.spheres_data: npt.NDArray[np.float64] | None = None
         self.materials_data: npt.NDArray[np.float64] | None = None
         self.camera_data: npt.NDArray[np.float64] | None = None
+        self.bvh_bounds: npt.NDArray[np.float64] | None = None
+        self.bvh_links: npt.NDArray[np.int64] | None = None
 
     def _prepare_scene_data(self, world: HittableList, camera: Camera) -> None:
         """Convert scene objects to NumPy arrays for Numba"""
         # Sphere data: [center_x, center_y, center_z, radius]
-        self.spheres_data = np.array(world.get_sphere_data(), dtype=np.float64)
+        self.spheres_data = sphere_array(world)
 
         # Material data: [type, param1, param2, param3, param4]
         # Type 0: Lambertian [type, albedo_r, albedo_g, albedo_b, unused]
         # Type 1: Metal [type, albedo_r, albedo_g, albedo_b, fuzz]
         # Type 2: Dielectric [type, ref_idx, unused, unused, unused]
         # Default to Lambertian with white color
-        self.materials_data = np.array(world.get_material_data(), dtype=np.float64)
+        self.materials_data = material_array(world)
 
         # Camera data: [origin, lower_left_corner, horizontal, vertical, lens_radius, u, v]
-        self.camera_data = np.array(camera.get_data(), dtype=np.float64)
+        self.camera_data = camera_array(camera)
 
-    def render(
+        # BVH node bounds: [min_x, min_y, min_z, max_x, max_y, max_z]
+        # BVH node links: [offset, count, axis] (see bvh_hit_numba)
+        # Spheres and materials are reordered so that every leaf covers a
+        # contiguous range of them.
+        self.bvh_bounds, self.bvh_links, order = bvh_arrays(world)
+        self.spheres_data = self.spheres_data[order]
+        self.materials_data = self.materials_data[order]
+
+    def render_pixel_list(
         self,
-        world: HittableList,
-        camera: Camera,
+        pixels: npt.NDArray[np.int64],
         image_width: int,
         image_height: int,
         samples_per_pixel: int,
         max_depth: int,
-    ) -> None:
-        """Render using Numba optimization"""
-        print(
-            f"Rendering {image_width}x{image_height} with Numba JIT optimization",
-            file=sys.stderr,
-        )
-        print(
-            f"Samples per pixel: {samples_per_pixel}, Max depth: {max_depth}",
-            file=sys.stderr,
+        roulette_depth: int,
+        seed: int,
+        sample_offset: int,
+        sampler: int,
+        strata: int,
+    ) -> npt.NDArray[np.float64]:
+        """Sums and sums of squares of the samples of the listed pixels, see
+        ``render_pixel_list_numba``"""
+        output = np.empty((pixels.shape[0], 2, 3), dtype=np.float64)
+        render_pixel_list_numba(
+            pixels,
+            image_width,
+            image_height,
+            samples_per_pixel,
+            self.camera_data,
+            self.spheres_data,
+            self.materials_data,
+            self.bvh_bounds,
+            self.bvh_links,
+            max_depth,
+            roulette_depth,
+            seed,
+            sample_offset,
+            sampler,
+            strata,
+            output,
         )
+        return output
 
+    def prepare(self, world: HittableList, camera: Camera) -> None:
+        """Convert the scene to arrays and load the kernels, once for any
+        number of ``render_frame`` and ``render_pixel_list`` calls"""
         # Prepare scene data for Numba
         self._prepare_scene_data(world, camera)
 
-        # Trigger JIT compilation with a small test
-        print("JIT compiling (first run may be slow)...", file=sys.stderr)
-        render_pixel_numba(
+        # Compile the kernels, or load them from the on-disk cache
+        print("JIT compiling (cached after the first run)...", file=sys.stderr)
+        compile_kernels()
+        print("JIT compilation completed", file=sys.stderr)
+
+    def render_frame(
+        self,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        roulette_depth: int,
+        seed: int,
+        sample_offset: int,
+        sampler: int,
+        strata: int,
+    ) -> npt.NDArray[np.float64]:
+        """Sums of samples ``sample_offset`` to ``sample_offset +
+        samples_per_pixel - 1`` of every pixel of the prepared scene, as an
+        (image_height, image_width, 3) array"""
+        # Render the whole frame in a single parallel call
+        output = np.zeros((image_height, image_width, 3), dtype=np.float64)
+        render_image_numba(
             0,
             0,
             image_width,
             image_height,
-            1,
+            samples_per_pixel,
             self.camera_data,
             self.spheres_data,
             self.materials_data,
+            self.bvh_bounds,
+            self.bvh_links,
             max_depth,
+            roulette_depth,
+            seed,
+            sample_offset,
+            sampler,
+            strata,
+            output,
         )
-        print("JIT compilation completed", file=sys.stderr)
+        return output
 
-        # Output PPM header
-        print("P3")
-        print(f"{image_width} {image_height}")
-        print("255")
+    def render(
+        self,
+        world: HittableList,
+        camera: Camera,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        seed: int,
+        adaptive: AdaptiveSampling | None = None,
+        roulette_depth: int | None = None,
+        sampler: str = "random",
+        sample_offset: int = 0,
+        strata: int | None = None,
+    ) -> npt.NDArray[np.float64]:
+        """Render using Numba optimization"""
+        print(
+            f"Rendering {image_width}x{image_height} with Numba JIT optimization",
+            file=sys.stderr,
+        )
+        print(
+            f"Samples per pixel: {samples_per_pixel}, Max depth: {max_depth}, "
+            f"Seed: {seed}",
+            file=sys.stderr,
+        )
 
-        # Render image
-        for j in range(image_height, 0, -1):
-            print(f"\rScanlines remaining: {j}", end=" ", file=sys.stderr)
+        self.prepare(world, camera)
+        if roulette_depth is None:
+            roulette_depth = max_depth
+        sampler_code, strata = sampler_parameters(sampler, samples_per_pixel, strata)
 
-            for i in range(image_width):
-                pixel_color_array = render_pixel_numba(
-                    i,
-                    j - 1,
+        print(f"Rendering on {get_num_threads()} threads...", file=sys.stderr)
+        if adaptive is not None:
+            output = render_adaptive(
+                lambda pixels, sample_offset, samples: self.render_pixel_list(
+                    pixels,
                     image_width,
                     image_height,
-                    samples_per_pixel,
-                    self.camera_data,
-                    self.spheres_data,
-                    self.materials_data,
+                    samples,
                     max_depth,
-                )
-
-                # Convert back to Color object for output
-                pixel_color = Color(
-                    pixel_color_array[0], pixel_color_array[1], pixel_color_array[2]
-                )
-                print(get_color(pixel_color, samples_per_pixel))
-
-        print("\nDone.", file=sys.stderr)
+                    roulette_depth,
+                    seed,
+                    sample_offset,
+                    sampler_code,
+                    strata,
+                ),
+                image_width,
+                image_height,
+                samples_per_pixel,
+                adaptive,
+            )
+        else:
+            output = self.render_frame(
+                image_width,
+                image_height,
+                samples_per_pixel,
+                max_depth,
+                roulette_depth,
+                seed,
+                sample_offset,
+                sampler_code,
+                strata,
+            )
+
+        print("Done.", file=sys.stderr)
+        return output
 
 
 def render_with_numba(
@@ -105,9 +208,26 @@ def render_with_numba(
     image_height: int,
     samples_per_pixel: int,
     max_depth: int,
-) -> None:
+    seed: int,
+    adaptive: AdaptiveSampling | None = None,
+    roulette_depth: int | None = None,
+    sampler: str = "random",
+    sample_offset: int = 0,
+    strata: int | None = None,
+) -> npt.NDArray[np.float64]:
     """Main function for Numba-accelerated rendering"""
     renderer = NumbaRenderer()
-    renderer.render(
-        world, camera, image_width, image_height, samples_per_pixel, max_depth
+    return renderer.render(
+        world,
+        camera,
+        image_width,
+        image_height,
+        samples_per_pixel,
+        max_depth,
+        seed,
+        adaptive,
+        roulette_depth,
+        sampler,
+        sample_offset,
+        strata,
     )
@@ -0,0 +1,456 @@
+"""Vectorized NumPy path tracing kernels.
+
+These kernels trace a batch of rays at once with array operations and need no
+JIT compiler, so they work where numba and LLVM are not available. Rays are
+stored as (3, n) arrays. Every ray carries its own generator state, using the
+same (seed, pixel_index, sample_index) streams as ``rayt.rng``, so the NumPy
+engine traces the same paths as the numba engines.
+
+Nothing in this module may import numba.
+"""
+
+import numpy as np
+import numpy.typing as npt
+
+from rayt.sampling import HALTON_BASES, HALTON_SAMPLER, STRATIFIED_SAMPLER
+
+FloatArray = npt.NDArray[np.float64]
+IndexArray = npt.NDArray[np.int64]
+
+GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+MIX_MULTIPLIER_1 = np.uint64(0xBF58476D1CE4E5B9)
+MIX_MULTIPLIER_2 = np.uint64(0x94D049BB133111EB)
+
+# Upper bound on the number of (ray, sphere) pairs tested in one array operation.
+MAX_INTERSECTION_BLOCK = 1 << 21
+
+T_MIN = 0.001
+
+
+def _mix64(z: npt.NDArray[np.uint64]) -> npt.NDArray[np.uint64]:
+    """splitmix64 finalizer"""
+    z = (z ^ (z >> np.uint64(30))) * MIX_MULTIPLIER_1
+    z = (z ^ (z >> np.uint64(27))) * MIX_MULTIPLIER_2
+    return z ^ (z >> np.uint64(31))
+
+
+def _rotl(x: npt.NDArray[np.uint64], k: int) -> npt.NDArray[np.uint64]:
+    return (x << np.uint64(k)) | (x >> np.uint64(64 - k))
+
+
+def seed_streams(
+    seed: int, pixel_index: IndexArray, sample_index: IndexArray
+) -> npt.NDArray[np.uint64]:
+    """Return the (2, n) xoroshiro128+ states of n pixel samples"""
+    with np.errstate(over="ignore"):
+        h = _mix64(np.full(pixel_index.shape, seed, dtype=np.uint64) + GOLDEN_GAMMA)
+        h = _mix64(h ^ pixel_index.astype(np.uint64))
+        h = _mix64(h ^ sample_index.astype(np.uint64))
+        return np.stack(
+            [_mix64(h + GOLDEN_GAMMA), _mix64(h + GOLDEN_GAMMA + GOLDEN_GAMMA)]
+        )
+
+
+def random_doubles(rng: npt.NDArray[np.uint64], idx: IndexArray) -> FloatArray:
+    """Draw one uniform [0, 1) double from each of the streams ``idx``"""
+    s0 = rng[0, idx]
+    s1 = rng[1, idx]
+    result = s0 + s1
+
+    s1 ^= s0
+    rng[0, idx] = _rotl(s0, 55) ^ s1 ^ (s1 << np.uint64(14))
+    rng[1, idx] = _rotl(s1, 36)
+
+    return (result >> np.uint64(11)).astype(np.float64) * (1.0 / 9007199254740992.0)
+
+
+def random_in_unit_disk(rng: npt.NDArray[np.uint64], idx: IndexArray) -> FloatArray:
+    """Rejection-sample points in the unit disk, as a (2, n) array"""
+    p = np.empty((2, idx.shape[0]))
+    pending = np.arange(idx.shape[0])
+
+    while pending.shape[0] > 0:
+        x = -1.0 + 2.0 * random_doubles(rng, idx[pending])
+        y = -1.0 + 2.0 * random_doubles(rng, idx[pending])
+        p[0, pending] = x
+        p[1, pending] = y
+        pending = pending[x * x + y * y >= 1.0]
+
+    return p
+
+
+def rotation_offsets(seed: int, pixel_index: IndexArray, dimension: int) -> FloatArray:
+    """Per-pixel offsets of one sample dimension, see ``rayt.rng.rotation_offset``"""
+    with np.errstate(over="ignore"):
+        h = _mix64(np.full(pixel_index.shape, seed, dtype=np.uint64) + GOLDEN_GAMMA)
+        h = _mix64(h ^ pixel_index.astype(np.uint64))
+        h = _mix64(h ^ ~np.uint64(dimension))
+        h = _mix64(h + GOLDEN_GAMMA)
+    return (h >> np.uint64(11)).astype(np.float64) * (1.0 / 9007199254740992.0)
+
+
+def halton_samples(
+    base: int,
+    sample_index: IndexArray,
+    seed: int,
+    pixel_index: IndexArray,
+    dimension: int,
+) -> FloatArray:
+    """Rotated Halton coordinates, see ``rayt.rng.halton_sample``"""
+    inv_base = 1.0 / base
+    factor = inv_base
+    x = np.zeros(sample_index.shape)
+    index = sample_index.copy()
+    while np.any(index > 0):
+        x += (index % base) * factor
+        index //= base
+        factor *= inv_base
+
+    x += rotation_offsets(seed, pixel_index, dimension)
+    x[x >= 1.0] -= 1.0
+    return x
+
+
+def concentric_disk(u1: FloatArray, u2: FloatArray) -> FloatArray:
+    """Map points of the unit square to the unit disk, as a (2, n) array"""
+    a = 2.0 * u1 - 1.0
+    b = 2.0 * u2 - 1.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        wide = np.abs(a) > np.abs(b)
+        r = np.where(wide, a, b)
+        phi = np.where(
+            wide, (np.pi / 4.0) * (b / a), np.pi / 2.0 - (np.pi / 4.0) * (a / b)
+        )
+    p = np.stack([r * np.cos(phi), r * np.sin(phi)])
+    p[:, (a == 0.0) & (b == 0.0)] = 0.0
+    return p
+
+
+def camera_samples(
+    sampler: int,
+    strata: int,
+    seed: int,
+    pixel_index: IndexArray,
+    sample_index: IndexArray,
+    rng: npt.NDArray[np.uint64],
+) -> tuple[FloatArray, FloatArray, FloatArray]:
+    """Positions of samples inside their pixels and on the unit lens disk, see
+    ``rayt.sampling``"""
+    if sampler == HALTON_SAMPLER:
+        du, dv, lens_u, lens_v = (
+            halton_samples(base, sample_index, seed, pixel_index, dimension)
+            for dimension, base in enumerate(HALTON_BASES)
+        )
+        return du, dv, concentric_disk(lens_u, lens_v)
+
+    idx = np.arange(pixel_index.shape[0])
+    du = random_doubles(rng, idx)
+    dv = random_doubles(rng, idx)
+    if sampler == STRATIFIED_SAMPLER:
+        cell = sample_index % (strata * strata)
+        du = (cell % strata + du) / strata
+        dv = (cell // strata + dv) / strata
+    return du, dv, random_in_unit_disk(rng, idx)
+
+
+def random_in_unit_sphere(rng: npt.NDArray[np.uint64], idx: IndexArray) -> FloatArray:
+    """Rejection-sample points in the unit sphere, as a (3, n) array"""
+    p = np.empty((3, idx.shape[0]))
+    pending = np.arange(idx.shape[0])
+
+    while pending.shape[0] > 0:
+        for axis in range(3):
+            p[axis, pending] = -1.0 + 2.0 * random_doubles(rng, idx[pending])
+        pending = pending[(p[:, pending] ** 2).sum(axis=0) >= 1.0]
+
+    return p
+
+
+def random_unit_vector(rng: npt.NDArray[np.uint64], idx: IndexArray) -> FloatArray:
+    a = 2.0 * np.pi * random_doubles(rng, idx)
+    z = -1.0 + 2.0 * random_doubles(rng, idx)
+    r = np.sqrt(1.0 - z * z)
+    return np.stack([r * np.cos(a), r * np.sin(a), z])
+
+
+def dot(u: FloatArray, v: FloatArray) -> FloatArray:
+    return u[0] * v[0] + u[1] * v[1] + u[2] * v[2]
+
+
+def unit_vector(v: FloatArray) -> FloatArray:
+    return v / np.sqrt(dot(v, v))
+
+
+def reflect(v: FloatArray, n: FloatArray) -> FloatArray:
+    return v - 2.0 * dot(v, n) * n
+
+
+def refract(uv: FloatArray, n: FloatArray, etai_over_etat: FloatArray) -> FloatArray:
+    cos_theta = -dot(uv, n)
+    r_out_parallel = (uv + n * cos_theta) * etai_over_etat
+    r_out_perp_len = -np.sqrt(1.0 - dot(r_out_parallel, r_out_parallel))
+    return r_out_parallel + n * r_out_perp_len
+
+
+def schlick(cosine: FloatArray, ref_idx: FloatArray) -> FloatArray:
+    r0 = ((1.0 - ref_idx) / (1.0 + ref_idx)) ** 2
+    return r0 + (1.0 - r0) * (1.0 - cosine) ** 5
+
+
+def camera_rays(
+    i: IndexArray,
+    j: IndexArray,
+    image_width: int,
+    image_height: int,
+    camera_data: FloatArray,
+    seed: int,
+    sample_index: IndexArray,
+    sampler: int,
+    strata: int,
+    rng: npt.NDArray[np.uint64],
+) -> tuple[FloatArray, FloatArray]:
+    """Generate the depth-of-field rays of samples ``sample_index`` of pixels
+    (i, j), placed by the sampler"""
+    origin = camera_data[0:3, None]
+    lower_left_corner = camera_data[3:6, None]
+    horizontal = camera_data[6:9, None]
+    vertical = camera_data[9:12, None]
+    lens_radius = camera_data[12]
+    u = camera_data[13:16, None]
+    v = camera_data[16:19, None]
+
+    pixel_index = (image_height - 1 - j) * image_width + i
+    du, dv, disk = camera_samples(sampler, strata, seed, pixel_index, sample_index, rng)
+    u_coord = (i + du) / (image_width - 1)
+    v_coord = (j + dv) / (image_height - 1)
+
+    rd = disk * lens_radius
+    offset = u * rd[0] + v * rd[1]
+    ray_origin = origin + offset
+    ray_direction = (
+        lower_left_corner + horizontal * u_coord + vertical * v_coord - ray_origin
+    )
+    return ray_origin, ray_direction
+
+
+def intersect(
+    origins: FloatArray, directions: FloatArray, spheres_data: FloatArray
+) -> tuple[FloatArray, IndexArray]:
+    """Return the closest hit distance and sphere index (-1 on a miss) per ray.
+
+    The dot products between rays and sphere centers are expanded into matrix
+    products, and the roots are only computed for the (ray, sphere) pairs with
+    a positive discriminant.
+    """
+    n_rays = origins.shape[1]
+    hit_t = np.full(n_rays, np.inf)
+    hit_sphere = np.full(n_rays, -1, dtype=np.int64)
+
+    a = dot(directions, directions)[:, None]
+    origin_dot_direction = dot(origins, directions)[:, None]
+    origin_length_squared = dot(origins, origins)[:, None]
+    centers = spheres_data[:, :3]
+    center_term = (centers * centers).sum(axis=1) - spheres_data[:, 3] ** 2
+
+    block = max(1, MAX_INTERSECTION_BLOCK // max(1, n_rays))
+    for start in range(0, spheres_data.shape[0], block):
+        stop = start + block
+        block_centers = centers[start:stop].T
+        half_b = origin_dot_direction - directions.T @ block_centers
+        c = (
+            origin_length_squared
+            - 2.0 * (origins.T @ block_centers)
+            + center_term[None, start:stop]
+        )
+        discriminant = half_b * half_b - a * c
+
+        ray_idx, sphere_idx = np.nonzero(discriminant > 0)
+        if ray_idx.shape[0] == 0:
+            continue
+
+        candidate_half_b = half_b[ray_idx, sphere_idx]
+        candidate_a = a[ray_idx, 0]
+        root = np.sqrt(discriminant[ray_idx, sphere_idx])
+        t_max = hit_t[ray_idx]
+        near = (-candidate_half_b - root) / candidate_a
+        far = (-candidate_half_b + root) / candidate_a
+        t_candidate = np.where(
+            (near > T_MIN) & (near < t_max),
+            near,
+            np.where((far > T_MIN) & (far < t_max), far, np.inf),
+        )
+
+        t = np.full(discriminant.shape, np.inf)
+        t[ray_idx, sphere_idx] = t_candidate
+        best = np.argmin(t, axis=1)
+        best_t = t[np.arange(n_rays), best]
+        closer = best_t < hit_t
+        hit_t[closer] = best_t[closer]
+        hit_sphere[closer] = start + best[closer]
+
+    return hit_t, hit_sphere
+
+
+def sky_color(directions: FloatArray) -> FloatArray:
+    t = 0.5 * (unit_vector(directions)[1] + 1.0)
+    return np.stack([1.0 - 0.5 * t, 1.0 - 0.3 * t, np.ones_like(t)])
+
+
+def russian_roulette(
+    throughput: FloatArray, rng: npt.NDArray[np.uint64], active: IndexArray
+) -> IndexArray:
+    """Russian roulette on the ``active`` rays, returning the survivors.
+
+    Every ray survives with probability equal to the largest component of its
+    throughput (at most 1), and the throughput of survivors is divided by that
+    probability so the expected radiance stays the same.
+    """
+    p = np.minimum(throughput[:, active].max(axis=0), 1.0)
+    survived = random_doubles(rng, active) < p
+    active = active[survived]
+    throughput[:, active] *= 1.0 / p[survived]
+    return active
+
+
+def trace_rays(
+    origins: FloatArray,
+    directions: FloatArray,
+    spheres_data: FloatArray,
+    materials_data: FloatArray,
+    max_depth: int,
+    roulette_depth: int,
+    rng: npt.NDArray[np.uint64],
+) -> FloatArray:
+    """Return the radiance carried by each ray, as a (3, n) array.
+
+    Rays that bounced at least ``roulette_depth`` times go through Russian
+    roulette after every further bounce, see ``russian_roulette``.
+    """
+    n_rays = origins.shape[1]
+    radiance = np.zeros((3, n_rays))
+    throughput = np.ones((3, n_rays))
+    origins = origins.copy()
+    directions = directions.copy()
+    active = np.arange(n_rays)
+
+    # Rays still alive after max_depth bounces contribute black
+    for bounce in range(1, max_depth + 1):
+        if active.shape[0] == 0:
+            break
+
+        ray_origin = origins[:, active]
+        ray_direction = directions[:, active]
+        hit_t, hit_sphere = intersect(ray_origin, ray_direction, spheres_data)
+
+        # Misses pick up the sky color and terminate
+        missed = hit_sphere < 0
+        escaped = active[missed]
+        radiance[:, escaped] = throughput[:, escaped] * sky_color(
+            ray_direction[:, missed]
+        )
+
+        hit = ~missed
+        active = active[hit]
+        hit_t = hit_t[hit]
+        hit_sphere = hit_sphere[hit]
+        ray_origin = ray_origin[:, hit]
+        ray_direction = ray_direction[:, hit]
+
+        # Hit records for the closest spheres
+        hit_point = ray_origin + ray_direction * hit_t
+        outward_normal = (hit_point - spheres_data[hit_sphere, :3].T) * (
+            1.0 / spheres_data[hit_sphere, 3]
+        )
+        front_face = dot(ray_direction, outward_normal) < 0.0
+        normal = np.where(front_face, outward_normal, -outward_normal)
+
+        material = materials_data[hit_sphere]
+        material_type = material[:, 0].astype(np.int64)
+        new_direction = np.empty_like(ray_direction)
+        alive = np.ones(active.shape[0], dtype=np.bool_)
+
+        # Lambertian
+        sel = np.flatnonzero(material_type == 0)
+        new_direction[:, sel] = normal[:, sel] + random_unit_vector(rng, active[sel])
+        throughput[:, active[sel]] *= material[sel, 1:4].T
+
+        # Metal
+        sel = np.flatnonzero(material_type == 1)
+        reflected = reflect(unit_vector(ray_direction[:, sel]), normal[:, sel])
+        scattered = (
+            reflected + random_in_unit_sphere(rng, active[sel]) * material[sel, 4]
+        )
+        new_direction[:, sel] = scattered
+        throughput[:, active[sel]] *= material[sel, 1:4].T
+        alive[sel] = dot(scattered, normal[:, sel]) > 0.0
+
+        # Dielectric (doesn't attenuate color)
+        sel = np.flatnonzero(material_type == 2)
+        ref_idx = material[sel, 1]
+        etai_over_etat = np.where(front_face[sel], 1.0 / ref_idx, ref_idx)
+        unit_direction = unit_vector(ray_direction[:, sel])
+        cos_theta = np.minimum(-dot(unit_direction, normal[:, sel]), 1.0)
+        sin_theta = np.sqrt(1.0 - cos_theta * cos_theta)
+        reflects = etai_over_etat * sin_theta > 1.0
+        # The Schlick test only draws a random number when refraction is possible
+        can_refract = np.flatnonzero(~reflects)
+        reflects[can_refract] = random_doubles(rng, active[sel[can_refract]]) < schlick(
+            cos_theta[can_refract], etai_over_etat[can_refract]
+        )
+        with np.errstate(invalid="ignore"):
+            refracted = refract(unit_direction, normal[:, sel], etai_over_etat)
+        new_direction[:, sel] = np.where(
+            reflects, reflect(unit_direction, normal[:, sel]), refracted
+        )
+
+        origins[:, active] = hit_point
+        directions[:, active] = new_direction
+        active = active[alive]
+
+        if roulette_depth <= bounce < max_depth:
+            active = russian_roulette(throughput, rng, active)
+
+    return radiance
+
+
+def render_rays(
+    i: IndexArray,
+    j: IndexArray,
+    sample_index: IndexArray,
+    image_width: int,
+    image_height: int,
+    camera_data: FloatArray,
+    spheres_data: FloatArray,
+    materials_data: FloatArray,
+    max_depth: int,
+    roulette_depth: int,
+    seed: int,
+    sampler: int,
+    strata: int,
+) -> FloatArray:
+    """Trace one sample per entry of pixels (i, j), j counted from the bottom"""
+    pixel_index = (image_height - 1 - j) * image_width + i
+    rng = seed_streams(seed, pixel_index, sample_index)
+
+    with np.errstate(over="ignore"):
+        origins, directions = camera_rays(
+            i,
+            j,
+            image_width,
+            image_height,
+            camera_data,
+            seed,
+            sample_index,
+            sampler,
+            strata,
+            rng,
+        )
+        return trace_rays(
+            origins,
+            directions,
+            spheres_data,
+            materials_data,
+            max_depth,
+            roulette_depth,
+            rng,
+        )
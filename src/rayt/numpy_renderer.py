@@ -0,0 +1,279 @@
+import sys
+
+import numpy as np
+import numpy.typing as npt
+
+from rayt.adaptive import AdaptiveSampling, render_adaptive
+from rayt.numpy_optimized import render_rays
+from rayt.sampling import sampler_parameters
+from rayt.scene_data import camera_array, material_array, sphere_array
+from rayt_rust._core import Camera, HittableList
+
+# Upper bound on the number of rays traced together in one batch.
+MAX_RAYS_PER_BATCH = 1 << 16
+
+
+class NumpyRenderer:
+    """Vectorized NumPy ray tracer renderer (no JIT compilation)"""
+
+    def __init__(self) -> None:
+        self.spheres_data: npt.NDArray[np.float64] | None = None
+        self.materials_data: npt.NDArray[np.float64] | None = None
+        self.camera_data: npt.NDArray[np.float64] | None = None
+
+    def _prepare_scene_data(self, world: HittableList, camera: Camera) -> None:
+        """Convert scene objects to NumPy arrays"""
+        # Sphere data: [center_x, center_y, center_z, radius]
+        self.spheres_data = sphere_array(world)
+
+        # Material data: [type, param1, param2, param3, param4]
+        # Type 0: Lambertian [type, albedo_r, albedo_g, albedo_b, unused]
+        # Type 1: Metal [type, albedo_r, albedo_g, albedo_b, fuzz]
+        # Type 2: Dielectric [type, ref_idx, unused, unused, unused]
+        self.materials_data = material_array(world)
+
+        # Camera data: [origin, lower_left_corner, horizontal, vertical, lens_radius, u, v]
+        self.camera_data = camera_array(camera)
+
+    def render_tile(
+        self,
+        x0: int,
+        y0: int,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        roulette_depth: int,
+        seed: int,
+        sample_offset: int,
+        sampler: int,
+        strata: int,
+        output: npt.NDArray[np.float64],
+    ) -> None:
+        """Add the sample sums of a tile (sized by ``output``) to ``output``.
+
+        The tile starts at column ``x0`` and row ``y0`` counted from the top.
+        Samples are traced in batches of at most ``MAX_RAYS_PER_BATCH`` rays.
+        """
+        tile_height, tile_width = output.shape[:2]
+        rows, cols = np.divmod(np.arange(tile_height * tile_width), tile_width)
+        n_pixels = rows.shape[0]
+        batch = max(1, min(samples_per_pixel, MAX_RAYS_PER_BATCH // n_pixels))
+
+        for start in range(0, samples_per_pixel, batch):
+            samples = min(batch, samples_per_pixel - start)
+            radiance = render_rays(
+                np.repeat(x0 + cols, samples),
+                np.repeat(image_height - 1 - (y0 + rows), samples),
+                np.tile(
+                    np.arange(sample_offset + start, sample_offset + start + samples),
+                    n_pixels,
+                ),
+                image_width,
+                image_height,
+                self.camera_data,
+                self.spheres_data,
+                self.materials_data,
+                max_depth,
+                roulette_depth,
+                seed,
+                sampler,
+                strata,
+            )
+            output += (
+                radiance.reshape(3, tile_height, tile_width, samples)
+                .sum(axis=3)
+                .transpose(1, 2, 0)
+            )
+
+    def render_pixel_list(
+        self,
+        pixels: npt.NDArray[np.int64],
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        roulette_depth: int,
+        seed: int,
+        sample_offset: int,
+        sampler: int,
+        strata: int,
+    ) -> npt.NDArray[np.float64]:
+        """Sums and sums of squares of the samples of the listed pixels.
+
+        Pixels are numbered row by row from the top-left corner, and the
+        result has shape (n, 2, 3). Used by adaptive sampling.
+        """
+        output = np.empty((pixels.shape[0], 2, 3), dtype=np.float64)
+        batch = max(1, MAX_RAYS_PER_BATCH // samples_per_pixel)
+
+        for start in range(0, pixels.shape[0], batch):
+            rows, cols = np.divmod(pixels[start : start + batch], image_width)
+            radiance = render_rays(
+                np.repeat(cols, samples_per_pixel),
+                np.repeat(image_height - 1 - rows, samples_per_pixel),
+                np.tile(
+                    np.arange(sample_offset, sample_offset + samples_per_pixel),
+                    rows.shape[0],
+                ),
+                image_width,
+                image_height,
+                self.camera_data,
+                self.spheres_data,
+                self.materials_data,
+                max_depth,
+                roulette_depth,
+                seed,
+                sampler,
+                strata,
+            ).reshape(3, rows.shape[0], samples_per_pixel)
+            output[start : start + batch, 0] = radiance.sum(axis=2).T
+            output[start : start + batch, 1] = np.square(radiance).sum(axis=2).T
+
+        return output
+
+    def prepare(self, world: HittableList, camera: Camera) -> None:
+        """Convert the scene to arrays, once for any number of
+        ``render_frame`` and ``render_pixel_list`` calls"""
+        # Prepare scene data for NumPy
+        self._prepare_scene_data(world, camera)
+
+    def render_frame(
+        self,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        roulette_depth: int,
+        seed: int,
+        sample_offset: int,
+        sampler: int,
+        strata: int,
+    ) -> npt.NDArray[np.float64]:
+        """Sums of samples ``sample_offset`` to ``sample_offset +
+        samples_per_pixel - 1`` of every pixel of the prepared scene, as an
+        (image_height, image_width, 3) array"""
+        # Render bands of rows, each holding at most one batch of primary rays
+        # when that fits in the ray budget
+        band_height = max(1, MAX_RAYS_PER_BATCH // (image_width * samples_per_pixel))
+        output = np.zeros((image_height, image_width, 3), dtype=np.float64)
+
+        for y0 in range(0, image_height, band_height):
+            y1 = min(y0 + band_height, image_height)
+            print(
+                f"\rScanlines remaining: {image_height - y0}", end=" ", file=sys.stderr
+            )
+            self.render_tile(
+                0,
+                y0,
+                image_width,
+                image_height,
+                samples_per_pixel,
+                max_depth,
+                roulette_depth,
+                seed,
+                sample_offset,
+                sampler,
+                strata,
+                output[y0:y1],
+            )
+        print(file=sys.stderr)
+        return output
+
+    def render(
+        self,
+        world: HittableList,
+        camera: Camera,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        seed: int,
+        adaptive: AdaptiveSampling | None = None,
+        roulette_depth: int | None = None,
+        sampler: str = "random",
+        sample_offset: int = 0,
+        strata: int | None = None,
+    ) -> npt.NDArray[np.float64]:
+        """Render using vectorized NumPy operations"""
+        print(
+            f"Rendering {image_width}x{image_height} with vectorized NumPy",
+            file=sys.stderr,
+        )
+        print(
+            f"Samples per pixel: {samples_per_pixel}, Max depth: {max_depth}, "
+            f"Seed: {seed}",
+            file=sys.stderr,
+        )
+
+        self.prepare(world, camera)
+        if roulette_depth is None:
+            roulette_depth = max_depth
+        sampler_code, strata = sampler_parameters(sampler, samples_per_pixel, strata)
+
+        if adaptive is not None:
+            output = render_adaptive(
+                lambda pixels, sample_offset, samples: self.render_pixel_list(
+                    pixels,
+                    image_width,
+                    image_height,
+                    samples,
+                    max_depth,
+                    roulette_depth,
+                    seed,
+                    sample_offset,
+                    sampler_code,
+                    strata,
+                ),
+                image_width,
+                image_height,
+                samples_per_pixel,
+                adaptive,
+            )
+        else:
+            output = self.render_frame(
+                image_width,
+                image_height,
+                samples_per_pixel,
+                max_depth,
+                roulette_depth,
+                seed,
+                sample_offset,
+                sampler_code,
+                strata,
+            )
+
+        print("Done.", file=sys.stderr)
+        return output
+
+
+def render_with_numpy(
+    world: HittableList,
+    camera: Camera,
+    image_width: int,
+    image_height: int,
+    samples_per_pixel: int,
+    max_depth: int,
+    seed: int,
+    adaptive: AdaptiveSampling | None = None,
+    roulette_depth: int | None = None,
+    sampler: str = "random",
+    sample_offset: int = 0,
+    strata: int | None = None,
+) -> npt.NDArray[np.float64]:
+    """Main function for NumPy rendering"""
+    renderer = NumpyRenderer()
+    return renderer.render(
+        world,
+        camera,
+        image_width,
+        image_height,
+        samples_per_pixel,
+        max_depth,
+        seed,
+        adaptive,
+        roulette_depth,
+        sampler,
+        sample_offset,
+        strata,
+    )
@@ -0,0 +1,206 @@
+"""Image output for rendered framebuffers.
+
+Every engine returns an (image_height, image_width, 3) float64 framebuffer
+holding the sum of the samples of each pixel, with rows ordered from the top
+of the image. This module writes it as 8-bit PPM or PNG, quantized with
+vectorized passes, or as an OpenEXR image of the unclamped average radiance
+for tone mapping after the render.
+"""
+
+import struct
+import sys
+import zlib
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+import numpy.typing as npt
+
+PPM_FORMATS = ("p6", "p3")
+IMAGE_FORMATS = (*PPM_FORMATS, "png", "exr")
+
+# Image format written for each file suffix
+SUFFIX_FORMATS = {".ppm": "p6", ".png": "png", ".exr": "exr"}
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG rows are quantized, filtered and compressed in bands of this many rows,
+# and every band's compressed output is written out right away
+PNG_BAND_ROWS = 64
+
+EXR_MAGIC = 20000630
+# Scanlines per chunk for ZIP_COMPRESSION
+EXR_ZIP_ROWS = 16
+EXR_ZIP_COMPRESSION = 3
+EXR_FLOAT = 2
+
+# Decimal text of every 8-bit value followed by the separator that comes after
+# it in P3 output: a space after red and green, a newline after blue
+_P3_TOKENS = np.array(
+    [[f"{value} " for value in range(256)]] * 2
+    + [[f"{value}\n" for value in range(256)]],
+    dtype=object,
+)
+
+
+def quantize(
+    image: npt.NDArray[np.float64], samples_per_pixel: int
+) -> npt.NDArray[np.uint8]:
+    """Average, gamma-correct (gamma 2) and quantize a framebuffer of sample
+    sums, matching ``get_color``"""
+    scale = 1.0 / samples_per_pixel
+    pixels = 255.999 * np.clip(np.sqrt(np.maximum(scale * image, 0.0)), 0.0, 0.999)
+    return np.nan_to_num(pixels).astype(np.uint8)
+
+
+def write_ppm(
+    pixels: npt.NDArray[np.uint8], stream: BinaryIO, binary: bool = True
+) -> None:
+    """Write 8-bit pixels as binary (P6) or plain text (P3) PPM"""
+    image_height, image_width = pixels.shape[:2]
+    if binary:
+        header = f"P6\n{image_width} {image_height}\n255\n"
+        stream.write(header.encode() + np.ascontiguousarray(pixels).tobytes())
+    else:
+        header = f"P3\n{image_width} {image_height}\n255\n"
+        tokens = _P3_TOKENS[np.arange(3), pixels.reshape(-1, 3)]
+        stream.write((header + "".join(tokens.ravel().tolist())).encode())
+    stream.flush()
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    checksum = zlib.crc32(kind + data)
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", checksum)
+
+
+def write_png(
+    image: npt.NDArray[np.float64], samples_per_pixel: int, stream: BinaryIO
+) -> None:
+    """Write a framebuffer of sample sums as an 8-bit RGB PNG.
+
+    Rows go through the "up" filter and a streaming zlib compressor band by
+    band, so neither the whole quantized image nor the whole compressed
+    stream is ever held in memory.
+    """
+    image_height, image_width = image.shape[:2]
+    header = struct.pack(">IIBBBBB", image_width, image_height, 8, 2, 0, 0, 0)
+    stream.write(PNG_SIGNATURE + _png_chunk(b"IHDR", header))
+
+    compressor = zlib.compressobj(6)
+    previous = np.zeros((1, 3 * image_width), dtype=np.uint8)
+    for y0 in range(0, image_height, PNG_BAND_ROWS):
+        band = image[y0 : y0 + PNG_BAND_ROWS]
+        rows = quantize(band, samples_per_pixel).reshape(band.shape[0], -1)
+
+        # Filter type byte, then the difference to the row above (mod 256)
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 2
+        np.subtract(rows, np.vstack((previous, rows[:-1])), out=filtered[:, 1:])
+        previous = rows[-1:]
+
+        data = compressor.compress(filtered.tobytes())
+        if data:
+            stream.write(_png_chunk(b"IDAT", data))
+
+    stream.write(_png_chunk(b"IDAT", compressor.flush()) + _png_chunk(b"IEND", b""))
+    stream.flush()
+
+
+def _exr_attribute(name: str, kind: str, value: bytes) -> bytes:
+    return f"{name}\0{kind}\0".encode() + struct.pack("<i", len(value)) + value
+
+
+def _exr_zip(data: bytes) -> bytes:
+    """OpenEXR ZIP_COMPRESSION of one chunk: split the bytes into even and odd
+    positions, delta-encode them, then deflate"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    reordered = np.concatenate((raw[0::2], raw[1::2]))
+    predicted = reordered.copy()
+    predicted[1:] = np.diff(reordered) + 128
+    return zlib.compress(predicted.tobytes())
+
+
+def write_exr(
+    image: npt.NDArray[np.float64], samples_per_pixel: int, stream: BinaryIO
+) -> None:
+    """Write the average radiance of a framebuffer of sample sums as a float
+    RGB OpenEXR image, without gamma correction or clamping"""
+    image_height, image_width = image.shape[:2]
+    radiance = (image / samples_per_pixel).astype("<f4")
+
+    # Channels are stored in alphabetical order: B, G, R
+    channels = b"".join(
+        name + b"\0" + struct.pack("<iB3xii", EXR_FLOAT, 0, 1, 1)
+        for name in (b"B", b"G", b"R")
+    )
+    window = struct.pack("<iiii", 0, 0, image_width - 1, image_height - 1)
+    header = b"".join(
+        (
+            struct.pack("<ii", EXR_MAGIC, 2),
+            _exr_attribute("channels", "chlist", channels + b"\0"),
+            _exr_attribute("compression", "compression", bytes([EXR_ZIP_COMPRESSION])),
+            _exr_attribute("dataWindow", "box2i", window),
+            _exr_attribute("displayWindow", "box2i", window),
+            _exr_attribute("lineOrder", "lineOrder", b"\0"),
+            _exr_attribute("pixelAspectRatio", "float", struct.pack("<f", 1.0)),
+            _exr_attribute("screenWindowCenter", "v2f", struct.pack("<ff", 0.0, 0.0)),
+            _exr_attribute("screenWindowWidth", "float", struct.pack("<f", 1.0)),
+            b"\0",
+        )
+    )
+
+    # Each chunk holds EXR_ZIP_ROWS scanlines, each scanline one run of
+    # values per channel. Chunks are kept uncompressed when deflate does not
+    # make them smaller.
+    chunks = []
+    for y0 in range(0, image_height, EXR_ZIP_ROWS):
+        rows = radiance[y0 : y0 + EXR_ZIP_ROWS, :, ::-1].transpose(0, 2, 1)
+        data = np.ascontiguousarray(rows).tobytes()
+        compressed = _exr_zip(data)
+        if len(compressed) < len(data):
+            data = compressed
+        chunks.append(struct.pack("<ii", y0, len(data)) + data)
+
+    offset = len(header) + 8 * len(chunks)
+    offsets = []
+    for chunk in chunks:
+        offsets.append(offset)
+        offset += len(chunk)
+
+    stream.write(header + struct.pack(f"<{len(offsets)}Q", *offsets))
+    for chunk in chunks:
+        stream.write(chunk)
+    stream.flush()
+
+
+def format_from_path(path: str | Path) -> str:
+    """Image format for the suffix of ``path``, see ``SUFFIX_FORMATS``"""
+    suffix = Path(path).suffix.lower()
+    if suffix not in SUFFIX_FORMATS:
+        raise ValueError(
+            f"unknown image suffix {suffix!r}, expected one of "
+            + ", ".join(SUFFIX_FORMATS)
+        )
+    return SUFFIX_FORMATS[suffix]
+
+
+def write_image(
+    image: npt.NDArray[np.float64],
+    samples_per_pixel: int,
+    output_format: str = "p6",
+    stream: BinaryIO | None = None,
+) -> None:
+    """Write a framebuffer of sample sums to ``stream`` (standard output by
+    default) in one of ``IMAGE_FORMATS``"""
+    if output_format not in IMAGE_FORMATS:
+        raise ValueError(f"unknown output format {output_format!r}")
+    if stream is None:
+        stream = sys.stdout.buffer
+
+    match output_format:
+        case "png":
+            write_png(image, samples_per_pixel, stream)
+        case "exr":
+            write_exr(image, samples_per_pixel, stream)
+        case _:
+            write_ppm(quantize(image, samples_per_pixel), stream, output_format == "p6")
@@ -0,0 +1,110 @@
+"""Counter-based random streams shared by the numba and CUDA kernels.
+
+Every (seed, pixel_index, sample_index) triple maps to its own xoroshiro128+
+stream: the key is hashed with splitmix64 into the two state words. A sample
+therefore draws the same numbers no matter which thread, tile, process or
+machine renders it, and parallel workers never share generator state. The
+Rust core implements the same scheme in ``src/rng.rs``.
+
+The module also holds the pieces of the low-discrepancy sampler that both
+kernels share (see ``rayt.sampling``): radical inverses and per-pixel
+rotation offsets, keyed like the streams.
+
+The generator state is a 2-element uint64 array (a ``cuda.local.array`` on the
+GPU). These functions use the CPU ``jit`` decorator, which also makes them
+callable from CUDA kernels.
+"""
+
+from numba import float32, jit, uint64
+
+GOLDEN_GAMMA = uint64(0x9E3779B97F4A7C15)
+MIX_MULTIPLIER_1 = uint64(0xBF58476D1CE4E5B9)
+MIX_MULTIPLIER_2 = uint64(0x94D049BB133111EB)
+
+
+@jit(nopython=True, cache=True)
+def mix64(z):
+    """splitmix64 finalizer."""
+    z = (z ^ (z >> uint64(30))) * MIX_MULTIPLIER_1
+    z = (z ^ (z >> uint64(27))) * MIX_MULTIPLIER_2
+    return z ^ (z >> uint64(31))
+
+
+@jit(nopython=True, cache=True)
+def rotl(x, k):
+    return (x << uint64(k)) | (x >> uint64(64 - k))
+
+
+@jit(nopython=True, cache=True)
+def seed_rng(rng, seed, pixel_index, sample_index):
+    """Reset ``rng`` to the start of the stream for one pixel sample."""
+    h = mix64(uint64(seed) + GOLDEN_GAMMA)
+    h = mix64(h ^ uint64(pixel_index))
+    h = mix64(h ^ uint64(sample_index))
+    rng[0] = mix64(h + GOLDEN_GAMMA)
+    rng[1] = mix64(h + GOLDEN_GAMMA + GOLDEN_GAMMA)
+
+
+@jit(nopython=True, cache=True)
+def next_uint64(rng):
+    """Advance the xoroshiro128+ state and return the next 64-bit output."""
+    s0 = rng[0]
+    s1 = rng[1]
+    result = s0 + s1
+
+    s1 ^= s0
+    rng[0] = rotl(s0, 55) ^ s1 ^ (s1 << uint64(14))
+    rng[1] = rotl(s1, 36)
+
+    return result
+
+
+@jit(nopython=True, cache=True)
+def random_double(rng):
+    """Uniform float64 in [0, 1)."""
+    return float(next_uint64(rng) >> uint64(11)) * (1.0 / 9007199254740992.0)
+
+
+@jit(nopython=True, cache=True)
+def random_float32(rng):
+    """Uniform float32 in [0, 1)."""
+    return float32(float32(next_uint64(rng) >> uint64(40)) * float32(1.0 / 16777216.0))
+
+
+@jit(nopython=True, cache=True)
+def rotation_offset(seed, pixel_index, dimension):
+    """Uniform float64 in [0, 1) fixed for one pixel and sample dimension.
+
+    Keys are hashed like ``seed_rng`` with the complement of the dimension in
+    place of the sample index, so offsets never coincide with a stream.
+    """
+    h = mix64(uint64(seed) + GOLDEN_GAMMA)
+    h = mix64(h ^ uint64(pixel_index))
+    h = mix64(h ^ ~uint64(dimension))
+    return float(mix64(h + GOLDEN_GAMMA) >> uint64(11)) * (1.0 / 9007199254740992.0)
+
+
+@jit(nopython=True, cache=True)
+def radical_inverse(base, index):
+    """The digits of ``index`` in ``base`` mirrored around the radix point,
+    the ``index``-th point of the van der Corput sequence of ``base``"""
+    inv_base = 1.0 / base
+    factor = inv_base
+    result = 0.0
+    while index > 0:
+        result += (index % base) * factor
+        index //= base
+        factor *= inv_base
+    return result
+
+
+@jit(nopython=True, cache=True)
+def halton_sample(base, sample_index, seed, pixel_index, dimension):
+    """Halton coordinate of ``base`` for one sample, rotated by the pixel's
+    offset in ``dimension`` (Cranley-Patterson rotation)"""
+    x = radical_inverse(base, sample_index) + rotation_offset(
+        seed, pixel_index, dimension
+    )
+    if x >= 1.0:
+        x -= 1.0
+    return x
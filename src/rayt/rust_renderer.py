@@ -1,5 +1,64 @@
+import os
 import sys
-from rayt_rust._core import Camera, HittableList, get_color, random_double, ray_color, Color
+
+import numpy as np
+import numpy.typing as npt
+
+from rayt.adaptive import AdaptiveSampling, render_adaptive
+from rayt.sampling import SAMPLERS, sampler_parameters
+from rayt_rust._core import Camera, HittableList, render, render_pixel_list
+
+
+class RustRenderer:
+    """Renders whole frames of one scene with the Rust engine on all CPUs"""
+
+    def __init__(self) -> None:
+        self.threads = os.cpu_count() or 1
+        self.world: HittableList | None = None
+        self.camera: Camera | None = None
+
+    def prepare(self, world: HittableList, camera: Camera) -> None:
+        """Build the scene's bounding volume hierarchy, once for any number of
+        ``render_frame`` calls"""
+        # Ray queries walk a bounding volume hierarchy instead of every sphere
+        if not world.has_bvh:
+            world.build_bvh()
+        self.world = world
+        self.camera = camera
+
+    def render_frame(
+        self,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        roulette_depth: int,
+        seed: int,
+        sample_offset: int,
+        sampler: int,
+        strata: int,
+    ) -> npt.NDArray[np.float64]:
+        """Sums of samples ``sample_offset`` to ``sample_offset +
+        samples_per_pixel - 1`` of every pixel of the prepared scene, as an
+        (image_height, image_width, 3) array"""
+        # The whole frame is traced in Rust with the GIL released
+        return np.frombuffer(
+            render(
+                self.world,
+                self.camera,
+                image_width,
+                image_height,
+                samples_per_pixel,
+                max_depth,
+                seed,
+                sample_offset,
+                threads=self.threads,
+                roulette_depth=roulette_depth,
+                sampler=SAMPLERS[sampler],
+                strata=strata,
+            ),
+            dtype=np.float64,
+        ).reshape(image_height, image_width, 3)
 
 
 def render_with_rust(
@@ -9,23 +68,68 @@ def render_with_rust(
     image_height: int,
     samples_per_pixel: int,
     max_depth: int,
-) -> None:
-    print("P3")
-    print(f"{image_width} {image_height}")
-    print("255")
+    seed: int,
+    adaptive: AdaptiveSampling | None = None,
+    roulette_depth: int | None = None,
+    sampler: str = "random",
+    sample_offset: int = 0,
+    strata: int | None = None,
+) -> npt.NDArray[np.float64]:
+    renderer = RustRenderer()
+    threads = renderer.threads
+    print(
+        f"Rendering {image_width}x{image_height} with Rust on {threads} threads",
+        file=sys.stderr,
+    )
+    print(
+        f"Samples per pixel: {samples_per_pixel}, Max depth: {max_depth}, Seed: {seed}",
+        file=sys.stderr,
+    )
+
+    # Strata are fixed by the whole sample budget, also in adaptive passes
+    _, strata = sampler_parameters(sampler, samples_per_pixel, strata)
+
+    renderer.prepare(world, camera)
 
-    for j in range(image_height, 0, -1):
-        print(f"\rScanlines remaining: {j}", end=" ", file=sys.stderr)
+    if adaptive is not None:
 
-        for i in range(image_width):
-            pixel_color = Color(0.0, 0.0, 0.0)
+        def render_pixels(
+            pixels: npt.NDArray[np.int64], sample_offset: int, samples: int
+        ) -> npt.NDArray[np.float64]:
+            sums = render_pixel_list(
+                world,
+                camera,
+                image_width,
+                image_height,
+                pixels.tobytes(),
+                samples,
+                max_depth,
+                seed,
+                sample_offset,
+                threads=threads,
+                roulette_depth=roulette_depth,
+                sampler=sampler,
+                strata=strata,
+            )
+            return np.frombuffer(sums, dtype=np.float64).reshape(-1, 2, 3)
 
-            for _ in range(1, samples_per_pixel + 1):
-                u = (i + random_double()) / (image_width - 1)
-                v = (j + random_double()) / (image_height - 1)
-                ray = camera.get_ray(u, v)
-                pixel_color += ray_color(ray, world, max_depth)
+        output = render_adaptive(
+            render_pixels, image_width, image_height, samples_per_pixel, adaptive
+        )
+        print("Done.", file=sys.stderr)
+        return output
 
-            print(get_color(pixel_color, samples_per_pixel))
+    output = renderer.render_frame(
+        image_width,
+        image_height,
+        samples_per_pixel,
+        max_depth,
+        max_depth if roulette_depth is None else roulette_depth,
+        seed,
+        sample_offset,
+        SAMPLERS.index(sampler),
+        strata,
+    )
 
-    print("\nDone.", file=sys.stderr)
+    print("Done.", file=sys.stderr)
+    return output
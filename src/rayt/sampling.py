@@ -0,0 +1,52 @@
+"""Camera samplers.
+
+A sampler picks the position of every camera sample inside its pixel and on
+the lens, indexed by pixel and sample number:
+
+- ``random``: independent uniform numbers from the sample's random stream,
+  with lens points drawn by rejection from the unit disk.
+- ``stratified``: the pixel is split into ``strata`` x ``strata`` cells, the
+  largest square grid that the samples per pixel fill, and sample ``s`` is
+  jittered inside cell ``s % strata**2``. Every aligned run of
+  ``strata**2`` samples covers each cell once. The lens is sampled as in
+  ``random``.
+- ``halton``: the pixel position and the lens point are the Halton points
+  of bases 2, 3, 5 and 7 for the sample number, shifted by a per-pixel
+  random offset in each dimension (Cranley-Patterson rotation) so that
+  neighboring pixels do not repeat the same pattern. Lens points map the
+  unit square to the disk with the concentric mapping.
+
+Samplers only place the camera ray; scattering keeps drawing from the
+sample's random stream. The kernels take a sampler as the integer code and
+the strata per side returned by ``sampler_parameters``.
+"""
+
+import math
+
+SAMPLERS = ("random", "stratified", "halton")
+
+# Sampler codes passed to the kernels
+RANDOM_SAMPLER = 0
+STRATIFIED_SAMPLER = 1
+HALTON_SAMPLER = 2
+
+# Halton bases of the pixel (x, y) and lens (x, y) dimensions
+HALTON_BASES = (2, 3, 5, 7)
+
+
+def sampler_parameters(
+    sampler: str, samples_per_pixel: int, strata: int | None = None
+) -> tuple[int, int]:
+    """Kernel code and strata per side of a sampler for a render with
+    ``samples_per_pixel`` samples per pixel.
+
+    ``strata`` overrides the strata of renders that trace a sample range of a
+    larger render, which must keep the strata of the whole render.
+    """
+    if sampler not in SAMPLERS:
+        raise ValueError(
+            f"unknown sampler {sampler!r}, expected one of {', '.join(SAMPLERS)}"
+        )
+    if strata is None:
+        strata = max(1, math.isqrt(samples_per_pixel))
+    return SAMPLERS.index(sampler), strata
@@ -1,59 +1,69 @@
-import itertools
-from rayt_rust._core import Color, HittableList, Point3, random_double
+import math
 
+import numpy as np
 
-def random_scene() -> HittableList:
-    world = HittableList()
-    world.add_lambertian(
-        center=Point3(0.0, -1000.0, 0.0),
-        radius=1000.0,
-        albedo=Color(0.5, 0.5, 0.5),
-    )
+from rayt.scene_data import DIELECTRIC, LAMBERTIAN, METAL
+from rayt_rust._core import HittableList
 
-    for a, b in itertools.product(range(-11, 11), range(-11, 11)):
-        choose_mat = random_double()
-        center = Point3(a + 0.9 * random_double(), 0.2, b + 0.9 * random_double())
-        radius = 0.2
-
-        if (center - Point3(4.0, 0.2, 0.0)).length > 0.9:
-            if choose_mat < 0.8:
-                # diffuse
-                world.add_lambertian(
-                    center=center,
-                    radius=radius,
-                    albedo=Color.random() * Color.random(),
-                )
-            elif choose_mat < 0.95:
-                # metal
-                world.add_metal(
-                    center=center,
-                    radius=radius,
-                    albedo=Color.random(min_max=(0.5, 1.0)),
-                    fuzz=random_double(0.0, 0.5),
-                )
-            else:
-                # glass
-                world.add_dielectric(
-                    center=center,
-                    radius=radius,
-                    ref_idx=1.5,
-                )
-
-    world.add_dielectric(
-        center=Point3(0.0, 1.0, 0.0),
-        radius=1.0,
-        ref_idx=1.5,
-    )
-    world.add_lambertian(
-        center=Point3(-4.0, 1.0, 0.0),
-        radius=1.0,
-        albedo=Color(0.4, 0.2, 0.1),
+# Small spheres of the cover scene of "Ray Tracing in One Weekend"
+COVER_SCENE_SPHERES = 22 * 22
+
+
+def random_scene(n: int = COVER_SCENE_SPHERES, seed: int | None = None) -> HittableList:
+    """A ground sphere, three large spheres and up to ``n`` small spheres.
+
+    The small spheres are jittered over the first ``n`` cells of a square grid
+    centered on the origin, and cells too close to the large metal sphere stay
+    empty. The default reproduces the layout of the book's cover scene. The
+    whole scene is generated with NumPy and added to the world in one call.
+    """
+    rng = np.random.default_rng(seed)
+
+    side = math.isqrt(n - 1) + 1 if n > 0 else 0
+    a, b = np.divmod(np.arange(n), side)
+    choose_mat = rng.random(n)
+    centers = np.column_stack(
+        (
+            a - side // 2 + 0.9 * rng.random(n),
+            np.full(n, 0.2),
+            b - side // 2 + 0.9 * rng.random(n),
+        )
     )
-    world.add_metal(
-        center=Point3(4.0, 1.0, 0.0),
-        radius=1.0,
-        albedo=Color(0.7, 0.6, 0.5),
-        fuzz=0.0,
+    keep = np.hypot(centers[:, 0] - 4.0, centers[:, 2]) > 0.9
+
+    diffuse = choose_mat < 0.8
+    metal = ~diffuse & (choose_mat < 0.95)
+    glass = ~diffuse & ~metal
+    material_types = np.select([diffuse, metal], [LAMBERTIAN, METAL], DIELECTRIC)
+
+    # Columns: albedo_r, albedo_g, albedo_b, fuzz (ref_idx first for glass)
+    material_params = np.zeros((n, 4))
+    material_params[diffuse, :3] = (rng.random((n, 3)) * rng.random((n, 3)))[diffuse]
+    material_params[metal, :3] = rng.uniform(0.5, 1.0, (n, 3))[metal]
+    material_params[metal, 3] = rng.uniform(0.0, 0.5, n)[metal]
+    material_params[glass, 0] = 1.5
+
+    # Ground sphere, small spheres, then the three large spheres
+    world = HittableList()
+    world.add_spheres(
+        np.concatenate(
+            (
+                [[0.0, -1000.0, 0.0]],
+                centers[keep],
+                [[0.0, 1.0, 0.0], [-4.0, 1.0, 0.0], [4.0, 1.0, 0.0]],
+            )
+        ),
+        np.concatenate(([1000.0], np.full(np.count_nonzero(keep), 0.2), [1.0] * 3)),
+        np.concatenate(
+            ([LAMBERTIAN], material_types[keep], [DIELECTRIC, LAMBERTIAN, METAL])
+        ),
+        np.concatenate(
+            (
+                [[0.5, 0.5, 0.5, 0.0]],
+                material_params[keep],
+                [[1.5, 0.0, 0.0, 0.0], [0.4, 0.2, 0.1, 0.0], [0.7, 0.6, 0.5, 0.0]],
+            )
+        ),
     )
 
     return world
@@ -0,0 +1,62 @@
+"""NumPy views of the scene and camera arrays exported by the Rust extension.
+
+The extension returns its arrays as native-endian ``bytearray`` objects, which
+``np.frombuffer`` wraps as writable arrays without copying. Arrays go back
+into Rust through ``HittableList.from_data``, see ``world_from_arrays``.
+"""
+
+import numpy as np
+import numpy.typing as npt
+
+from rayt_rust._core import Camera, HittableList
+
+# Material types, the first column of the material array
+LAMBERTIAN = 0
+METAL = 1
+DIELECTRIC = 2
+
+
+def sphere_array(world: HittableList) -> npt.NDArray[np.float64]:
+    """(n, 4) array of [center_x, center_y, center_z, radius] per sphere"""
+    return np.frombuffer(world.get_sphere_data(), dtype=np.float64).reshape(-1, 4)
+
+
+def material_array(world: HittableList) -> npt.NDArray[np.float64]:
+    """(n, 5) array of [type, param1, param2, param3, param4] per sphere.
+
+    LAMBERTIAN: [type, albedo_r, albedo_g, albedo_b, unused]
+    METAL: [type, albedo_r, albedo_g, albedo_b, fuzz]
+    DIELECTRIC: [type, ref_idx, unused, unused, unused]
+    """
+    return np.frombuffer(world.get_material_data(), dtype=np.float64).reshape(-1, 5)
+
+
+def camera_array(camera: Camera) -> npt.NDArray[np.float64]:
+    """[origin, lower_left_corner, horizontal, vertical, lens_radius, u, v]"""
+    return np.frombuffer(camera.get_data(), dtype=np.float64)
+
+
+def bvh_arrays(
+    world: HittableList,
+) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """BVH node bounds (n, 6), node links (n, 3) and sphere order.
+
+    Bounds are [min_x, min_y, min_z, max_x, max_y, max_z] and links are
+    [offset, count, axis], see ``bvh_hit_numba``. Leaves refer to positions in
+    the sphere order.
+    """
+    bounds, links, order = world.get_bvh_data()
+    return (
+        np.frombuffer(bounds, dtype=np.float64).reshape(-1, 6),
+        np.frombuffer(links, dtype=np.int64).reshape(-1, 3),
+        np.frombuffer(order, dtype=np.int64),
+    )
+
+
+def world_from_arrays(
+    spheres_data: npt.ArrayLike, materials_data: npt.ArrayLike
+) -> HittableList:
+    """Build a HittableList from sphere and material arrays in one call"""
+    spheres_data = np.ascontiguousarray(spheres_data, dtype=np.float64)
+    materials_data = np.ascontiguousarray(materials_data, dtype=np.float64)
+    return HittableList.from_data(spheres_data.tobytes(), materials_data.tobytes())
@@ -0,0 +1,461 @@
+"""Tile scheduler rendering a frame on a pool of worker processes.
+
+The frame is split into square tiles that a pool of processes renders one
+at a time, each worker taking the next tile as soon as it finishes one, so
+slow tiles (glass, many bounces) never hold up an idle worker. The scene
+arrays and the framebuffer live in ``multiprocessing.shared_memory``: they
+are published once, workers map them without copying, and every finished
+tile is written straight into the shared framebuffer.
+
+Workers run single-threaded with the ``numba`` engine (``render_image_numba``
+on the tile) or the ``rust`` engine (``render_pixel_list`` on the tile's
+pixels). The Rust engine builds its own scene from the shared arrays once per
+worker. Each sample draws from its own random stream, so the image does not
+depend on the tiling or the number of workers.
+"""
+
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from rayt.sampling import SAMPLERS, sampler_parameters
+from rayt.scene_data import bvh_arrays, camera_array, material_array, sphere_array
+from rayt_rust._core import Camera, HittableList
+
+SCHEDULER_ENGINES = ("numba", "rust")
+
+# Width and height of a tile in pixels
+TILE_SIZE = 32
+
+# Per-process worker state, set up by _init_worker
+_worker: dict[str, Any] = {}
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    """Name, shape and dtype of an array published in shared memory"""
+
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+    @classmethod
+    def publish(
+        cls, array: npt.NDArray[np.generic]
+    ) -> tuple[SharedMemory, "SharedArray"]:
+        """Copy ``array`` into a new shared memory block, which the caller
+        closes and unlinks"""
+        block = SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared = cls(block.name, array.shape, array.dtype.str)
+        shared.view(block)[...] = array
+        return block, shared
+
+    def view(self, block: SharedMemory) -> npt.NDArray[np.generic]:
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=block.buf)
+
+
+@dataclass(frozen=True)
+class _RenderSettings:
+    image_width: int
+    image_height: int
+    samples_per_pixel: int
+    max_depth: int
+    roulette_depth: int
+    seed: int
+    sample_offset: int
+    sampler: str
+    strata: int
+
+
+@dataclass
+class WorkerLoad:
+    """Tiles, pixels and busy time of one worker process"""
+
+    pid: int
+    tiles: int = 0
+    pixels: int = 0
+    busy: float = 0.0
+
+
+def scene_arrays(
+    world: HittableList, camera: Camera
+) -> dict[str, npt.NDArray[np.generic]]:
+    """Camera, sphere, material and BVH arrays that a ``TileRenderer`` takes,
+    with spheres and materials in BVH order (see ``NumbaRenderer``)"""
+    bvh_bounds, bvh_links, order = bvh_arrays(world)
+    return {
+        "camera": camera_array(camera),
+        "spheres": np.ascontiguousarray(sphere_array(world)[order]),
+        "materials": np.ascontiguousarray(material_array(world)[order]),
+        "bvh_bounds": bvh_bounds,
+        "bvh_links": bvh_links,
+    }
+
+
+class TileRenderer:
+    """Renders sample ranges of tiles with one of ``SCHEDULER_ENGINES``,
+    from the arrays of ``scene_arrays``.
+
+    ``threads`` limits the threads of the engine, all CPUs by default.
+    """
+
+    def __init__(
+        self,
+        engine: str,
+        arrays: dict[str, npt.NDArray[np.generic]],
+        threads: int | None = None,
+    ) -> None:
+        self.engine = engine
+        self.arrays = arrays
+        self.threads = threads
+
+        if engine == "rust":
+            from rayt.scene_data import world_from_arrays
+
+            self.world = world_from_arrays(arrays["spheres"], arrays["materials"])
+            self.world.build_bvh()
+            self.camera = Camera.from_data(arrays["camera"].tobytes())
+        else:
+            from numba import set_num_threads
+
+            from rayt.numba_optimized import compile_kernels
+
+            if threads is not None:
+                set_num_threads(threads)
+            compile_kernels()
+
+    def render(
+        self,
+        tile: tuple[int, int, int, int],
+        image_width: int,
+        image_height: int,
+        samples: int,
+        max_depth: int,
+        roulette_depth: int,
+        seed: int,
+        sample_offset: int,
+        sampler: str,
+        strata: int,
+    ) -> npt.NDArray[np.float64]:
+        """Sums of samples ``sample_offset`` to ``sample_offset + samples - 1``
+        of the tile (x0, y0, width, height), as a (height, width, 3) array"""
+        x0, y0, tile_width, tile_height = tile
+
+        if self.engine == "rust":
+            from rayt_rust._core import render_pixel_list
+
+            rows, cols = np.mgrid[y0 : y0 + tile_height, x0 : x0 + tile_width]
+            pixels = (rows * image_width + cols).astype(np.int64).ravel()
+            sums = render_pixel_list(
+                self.world,
+                self.camera,
+                image_width,
+                image_height,
+                pixels.tobytes(),
+                samples,
+                max_depth,
+                seed,
+                sample_offset,
+                threads=self.threads,
+                roulette_depth=roulette_depth,
+                sampler=sampler,
+                strata=strata,
+            )
+            sums = np.frombuffer(sums, dtype=np.float64).reshape(-1, 2, 3)
+            return sums[:, 0].reshape(tile_height, tile_width, 3)
+
+        from rayt.numba_optimized import render_image_numba
+
+        output = np.zeros((tile_height, tile_width, 3), dtype=np.float64)
+        render_image_numba(
+            x0,
+            y0,
+            image_width,
+            image_height,
+            samples,
+            self.arrays["camera"],
+            self.arrays["spheres"],
+            self.arrays["materials"],
+            self.arrays["bvh_bounds"],
+            self.arrays["bvh_links"],
+            max_depth,
+            roulette_depth,
+            seed,
+            sample_offset,
+            SAMPLERS.index(sampler),
+            strata,
+            output,
+        )
+        return output
+
+
+def _init_worker(engine: str, shared_arrays: dict[str, SharedArray]) -> None:
+    """Map the shared arrays and set up the engine of a worker process"""
+    arrays = {}
+    blocks = []
+    for key, shared in shared_arrays.items():
+        block = SharedMemory(name=shared.name)
+        blocks.append(block)
+        arrays[key] = shared.view(block)
+
+    # Keep the mappings open for the life of the worker
+    _worker["blocks"] = blocks
+    _worker["framebuffer"] = arrays.pop("framebuffer")
+    # Processes share the cores, a tile is rendered on one thread
+    _worker["renderer"] = TileRenderer(engine, arrays, threads=1)
+
+
+def _render_tile(
+    task: tuple[tuple[int, int, int, int], _RenderSettings],
+) -> tuple[int, int, float]:
+    """Render the tile (x0, y0, width, height) of a task into the shared
+    framebuffer, with the task's settings.
+
+    Returns the worker's pid, the tile's pixel count and the render time.
+    """
+    start = time.perf_counter()
+    tile, settings = task
+    x0, y0, tile_width, tile_height = tile
+    renderer: TileRenderer = _worker["renderer"]
+    framebuffer = _worker["framebuffer"]
+
+    framebuffer[y0 : y0 + tile_height, x0 : x0 + tile_width] = renderer.render(
+        tile,
+        settings.image_width,
+        settings.image_height,
+        settings.samples_per_pixel,
+        settings.max_depth,
+        settings.roulette_depth,
+        settings.seed,
+        settings.sample_offset,
+        settings.sampler,
+        settings.strata,
+    )
+    return os.getpid(), tile_width * tile_height, time.perf_counter() - start
+
+
+def tiles(
+    image_width: int, image_height: int, tile_size: int = TILE_SIZE
+) -> list[tuple[int, int, int, int]]:
+    """(x0, y0, width, height) of the tiles covering a frame, row by row from
+    the top-left corner"""
+    return [
+        (x0, y0, min(tile_size, image_width - x0), min(tile_size, image_height - y0))
+        for y0 in range(0, image_height, tile_size)
+        for x0 in range(0, image_width, tile_size)
+    ]
+
+
+@dataclass
+class TileScheduler:
+    """Renders frames tile by tile on ``workers`` processes (default: one per
+    CPU) with one of ``SCHEDULER_ENGINES``.
+
+    ``render`` renders one frame. To render several sample ranges of one
+    scene, ``open`` publishes the scene and starts the pool once, every
+    ``render_pass`` reuses them, and ``close`` shuts them down. ``loads``
+    holds the load of every worker in the last render or pass.
+    """
+
+    engine: str = "numba"
+    workers: int | None = None
+    tile_size: int = TILE_SIZE
+    loads: list[WorkerLoad] = field(default_factory=list)
+    _pool: Any = field(default=None, init=False, repr=False)
+    _blocks: dict[str, SharedMemory] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _framebuffer: npt.NDArray[np.float64] | None = field(
+        default=None, init=False, repr=False
+    )
+    _tiles: list[tuple[int, int, int, int]] = field(
+        default_factory=list, init=False, repr=False
+    )
+
+    def open(
+        self, world: HittableList, camera: Camera, image_width: int, image_height: int
+    ) -> None:
+        """Publish the scene and a framebuffer in shared memory and start the
+        worker processes"""
+        if self.engine not in SCHEDULER_ENGINES:
+            raise ValueError(
+                f"the tile scheduler runs the {' and '.join(SCHEDULER_ENGINES)} "
+                f"engines, got {self.engine!r}"
+            )
+        workers = self.workers or os.cpu_count() or 1
+        self._tiles = tiles(image_width, image_height, self.tile_size)
+        print(
+            f"Rendering {image_width}x{image_height} in {len(self._tiles)} tiles "
+            f"on {workers} {self.engine} worker processes",
+            file=sys.stderr,
+        )
+
+        arrays = scene_arrays(world, camera)
+        arrays["framebuffer"] = np.zeros((image_height, image_width, 3))
+        try:
+            shared = {}
+            for key, array in arrays.items():
+                self._blocks[key], shared[key] = SharedArray.publish(array)
+            self._framebuffer = shared["framebuffer"].view(self._blocks["framebuffer"])
+
+            # Spawned workers start without the parent's Numba threads
+            context = get_context("spawn")
+            self._pool = context.Pool(
+                workers, initializer=_init_worker, initargs=(self.engine, shared)
+            )
+        except BaseException:
+            self.close()
+            raise
+
+    def render_pass(
+        self,
+        samples: int,
+        max_depth: int,
+        seed: int,
+        roulette_depth: int,
+        sampler: str,
+        sample_offset: int,
+        strata: int,
+    ) -> npt.NDArray[np.float64]:
+        """Render samples ``sample_offset`` to ``sample_offset + samples - 1``
+        of the opened scene and return their (image_height, image_width, 3)
+        framebuffer of sums"""
+        if self._pool is None or self._framebuffer is None:
+            raise RuntimeError("the tile scheduler is not open")
+        image_height, image_width, _ = self._framebuffer.shape
+        settings = _RenderSettings(
+            image_width,
+            image_height,
+            samples,
+            max_depth,
+            roulette_depth,
+            seed,
+            sample_offset,
+            sampler,
+            strata,
+        )
+
+        loads: dict[int, WorkerLoad] = {}
+        tasks = [(tile, settings) for tile in self._tiles]
+        for done, (pid, pixels, busy) in enumerate(
+            self._pool.imap_unordered(_render_tile, tasks), start=1
+        ):
+            load = loads.setdefault(pid, WorkerLoad(pid))
+            load.tiles += 1
+            load.pixels += pixels
+            load.busy += busy
+            print(
+                f"\rTiles done: {done}/{len(tasks)}",
+                end=" ",
+                file=sys.stderr,
+            )
+        print(file=sys.stderr)
+
+        self.loads = sorted(loads.values(), key=lambda load: load.pid)
+        return self._framebuffer.copy()
+
+    def close(self) -> None:
+        """Stop the worker processes and free the shared memory"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        self._framebuffer = None
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+        self._blocks = {}
+
+    def render(
+        self,
+        world: HittableList,
+        camera: Camera,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        seed: int,
+        roulette_depth: int | None = None,
+        sampler: str = "random",
+        sample_offset: int = 0,
+        strata: int | None = None,
+    ) -> npt.NDArray[np.float64]:
+        """Render a frame and return its (image_height, image_width, 3)
+        framebuffer of sample sums, from sample ``sample_offset`` on"""
+        # Fail here rather than in every worker
+        _, strata = sampler_parameters(sampler, samples_per_pixel, strata)
+        if roulette_depth is None:
+            roulette_depth = max_depth
+
+        self.open(world, camera, image_width, image_height)
+        try:
+            output = self.render_pass(
+                samples_per_pixel,
+                max_depth,
+                seed,
+                roulette_depth,
+                sampler,
+                sample_offset,
+                strata,
+            )
+        finally:
+            self.close()
+
+        self.report_loads()
+        print("Done.", file=sys.stderr)
+        return output
+
+    def report_loads(self) -> None:
+        """Print the tiles and busy time of every worker in the last render,
+        and the load balance: the mean busy time over the longest one"""
+        for load in self.loads:
+            print(
+                f"Worker {load.pid}: {load.tiles} tiles, {load.pixels} pixels, "
+                f"{load.busy:.2f}s busy",
+                file=sys.stderr,
+            )
+        busy = [load.busy for load in self.loads]
+        if busy and max(busy) > 0.0:
+            print(
+                f"Load balance: {sum(busy) / len(busy) / max(busy):.1%}",
+                file=sys.stderr,
+            )
+
+
+def render_with_scheduler(
+    world: HittableList,
+    camera: Camera,
+    image_width: int,
+    image_height: int,
+    samples_per_pixel: int,
+    max_depth: int,
+    seed: int,
+    roulette_depth: int | None = None,
+    sampler: str = "random",
+    engine: str = "numba",
+    workers: int | None = None,
+    sample_offset: int = 0,
+    strata: int | None = None,
+) -> npt.NDArray[np.float64]:
+    """Render a frame on a pool of worker processes, see ``TileScheduler``"""
+    scheduler = TileScheduler(engine, workers)
+    return scheduler.render(
+        world,
+        camera,
+        image_width,
+        image_height,
+        samples_per_pixel,
+        max_depth,
+        seed,
+        roulette_depth,
+        sampler,
+        sample_offset,
+        strata,
+    )
@@ -0,0 +1,529 @@
+"""Wavefront path tracing kernels.
+
+Instead of following one path through all of its bounces, the wavefront engine
+keeps a whole population of rays in structure-of-arrays buffers and advances
+all of them one bounce at a time:
+
+1. ``generate_rays_wavefront`` writes the primary rays of a tile (or
+   ``generate_pixel_rays_wavefront`` those of a list of pixels).
+2. ``intersect_wavefront`` finds the closest sphere for every active ray by
+   walking the BVH, in chunks of rays that share one traversal stack.
+3. ``sort_by_material_wavefront`` buckets the active rays into one queue per
+   material type plus a queue for misses.
+4. One shading kernel per queue scatters the rays (or terminates them).
+5. Past the roulette depth, ``roulette_wavefront`` ends or reweights every
+   scattered ray (Russian roulette).
+6. ``compact_wavefront`` keeps only the rays that are still alive.
+
+Every ray owns a random stream keyed like the numba engine's samples, so both
+engines trace identical paths.
+"""
+
+import numpy as np
+from numba import boolean, float64, int64, njit, prange, types, uint64
+
+from rayt.numba_optimized import (
+    BVH_STACK_SIZE,
+    bvh_hit_numba,
+    get_ray_numba,
+    hit_record_numba,
+    russian_roulette_numba,
+    scatter_dielectric_numba,
+    scatter_lambertian_numba,
+    scatter_metal_numba,
+    sky_color_numba,
+)
+from rayt.rng import seed_rng
+
+# Number of rays intersected by one thread between scheduling decisions.
+INTERSECT_CHUNK_SIZE = 256
+
+# Queue rows produced by sort_by_material_wavefront.
+LAMBERTIAN_QUEUE = 0
+METAL_QUEUE = 1
+DIELECTRIC_QUEUE = 2
+MISS_QUEUE = 3
+
+# Explicit stage signatures, used to compile them eagerly (see
+# ``compile_kernels``). Ray buffers are (3, n_rays) C-contiguous float64.
+GENERATE_RAYS_SIGNATURE = types.none(
+    int64,  # x0
+    int64,  # y0
+    int64,  # tile_width
+    int64,  # image_width
+    int64,  # image_height
+    int64,  # samples
+    float64[::1],  # camera_data
+    int64,  # seed
+    int64,  # sample_offset
+    int64,  # sampler
+    int64,  # strata
+    float64[:, ::1],  # origins
+    float64[:, ::1],  # directions
+    float64[:, ::1],  # throughput
+    float64[:, ::1],  # radiance
+    uint64[:, ::1],  # rng_states
+    int64[::1],  # active
+    boolean[::1],  # alive
+)
+INTERSECT_SIGNATURE = types.none(
+    int64[::1],  # active
+    int64,  # n_active
+    float64[:, ::1],  # origins
+    float64[:, ::1],  # directions
+    float64[:, ::1],  # spheres_data
+    float64[:, ::1],  # bvh_bounds
+    int64[:, ::1],  # bvh_links
+    float64[::1],  # hit_t
+    int64[::1],  # hit_sphere
+)
+SORT_BY_MATERIAL_SIGNATURE = types.none(
+    int64[::1],  # active
+    int64,  # n_active
+    int64[::1],  # hit_sphere
+    float64[:, ::1],  # materials_data
+    int64[:, ::1],  # queues
+    int64[::1],  # queue_sizes
+)
+SHADE_MISS_SIGNATURE = types.none(
+    int64[::1],  # queue
+    int64,  # queue_size
+    float64[:, ::1],  # directions
+    float64[:, ::1],  # throughput
+    float64[:, ::1],  # radiance
+    boolean[::1],  # alive
+)
+SHADE_SIGNATURE = types.none(
+    int64[::1],  # queue
+    int64,  # queue_size
+    float64[:, ::1],  # origins
+    float64[:, ::1],  # directions
+    float64[:, ::1],  # throughput
+    float64[:, ::1],  # spheres_data
+    float64[:, ::1],  # materials_data
+    float64[::1],  # hit_t
+    int64[::1],  # hit_sphere
+    uint64[:, ::1],  # rng_states
+    boolean[::1],  # alive
+)
+ROULETTE_SIGNATURE = types.none(
+    int64[:, ::1],  # queues
+    int64[::1],  # queue_sizes
+    float64[:, ::1],  # throughput
+    uint64[:, ::1],  # rng_states
+    boolean[::1],  # alive
+)
+COMPACT_SIGNATURE = int64(
+    int64[:, ::1],  # queues
+    int64[::1],  # queue_sizes
+    boolean[::1],  # alive
+    int64[::1],  # active
+)
+ACCUMULATE_SIGNATURE = types.none(
+    int64,  # samples
+    float64[:, ::1],  # radiance
+    float64[:, :, ::1],  # output
+)
+GENERATE_PIXEL_RAYS_SIGNATURE = types.none(
+    int64[::1],  # pixels
+    int64,  # image_width
+    int64,  # image_height
+    int64,  # samples
+    float64[::1],  # camera_data
+    int64,  # seed
+    int64,  # sample_offset
+    int64,  # sampler
+    int64,  # strata
+    float64[:, ::1],  # origins
+    float64[:, ::1],  # directions
+    float64[:, ::1],  # throughput
+    float64[:, ::1],  # radiance
+    uint64[:, ::1],  # rng_states
+    int64[::1],  # active
+    boolean[::1],  # alive
+)
+ACCUMULATE_PIXELS_SIGNATURE = ACCUMULATE_SIGNATURE
+
+
+@njit(parallel=True, cache=True)
+def generate_rays_wavefront(
+    x0,
+    y0,
+    tile_width,
+    image_width,
+    image_height,
+    samples,
+    camera_data,
+    seed,
+    sample_offset,
+    sampler,
+    strata,
+    origins,
+    directions,
+    throughput,
+    radiance,
+    rng_states,
+    active,
+    alive,
+):
+    """Write the primary rays of a tile, ``samples`` consecutive rays per pixel.
+
+    The tile height is implied by the size of the ray buffers. All rays start
+    active with unit throughput and zero radiance.
+    """
+    n_rays = active.shape[0]
+
+    for k in prange(n_rays):
+        pixel = k // samples
+        row = y0 + pixel // tile_width
+        i = x0 + pixel % tile_width
+        j = image_height - 1 - row
+        rng = rng_states[k]
+
+        sample = sample_offset + k % samples
+        seed_rng(rng, seed, row * image_width + i, sample)
+        ray_origin, ray_direction = get_ray_numba(
+            i,
+            j,
+            image_width,
+            image_height,
+            camera_data,
+            seed,
+            sample,
+            sampler,
+            strata,
+            rng,
+        )
+
+        for axis in range(3):
+            origins[axis, k] = ray_origin[axis]
+            directions[axis, k] = ray_direction[axis]
+            throughput[axis, k] = 1.0
+            radiance[axis, k] = 0.0
+        active[k] = k
+        alive[k] = True
+
+
+@njit(parallel=True, cache=True)
+def generate_pixel_rays_wavefront(
+    pixels,
+    image_width,
+    image_height,
+    samples,
+    camera_data,
+    seed,
+    sample_offset,
+    sampler,
+    strata,
+    origins,
+    directions,
+    throughput,
+    radiance,
+    rng_states,
+    active,
+    alive,
+):
+    """Write the primary rays of the listed pixels, ``samples`` consecutive rays
+    per pixel. Pixels are numbered row by row from the top-left corner."""
+    n_rays = active.shape[0]
+
+    for k in prange(n_rays):
+        pixel = pixels[k // samples]
+        row = pixel // image_width
+        i = pixel % image_width
+        j = image_height - 1 - row
+        rng = rng_states[k]
+
+        sample = sample_offset + k % samples
+        seed_rng(rng, seed, pixel, sample)
+        ray_origin, ray_direction = get_ray_numba(
+            i,
+            j,
+            image_width,
+            image_height,
+            camera_data,
+            seed,
+            sample,
+            sampler,
+            strata,
+            rng,
+        )
+
+        for axis in range(3):
+            origins[axis, k] = ray_origin[axis]
+            directions[axis, k] = ray_direction[axis]
+            throughput[axis, k] = 1.0
+            radiance[axis, k] = 0.0
+        active[k] = k
+        alive[k] = True
+
+
+@njit(parallel=True, cache=True)
+def intersect_wavefront(
+    active,
+    n_active,
+    origins,
+    directions,
+    spheres_data,
+    bvh_bounds,
+    bvh_links,
+    hit_t,
+    hit_sphere,
+):
+    """Store the closest hit distance and sphere index of every active ray"""
+    n_chunks = (n_active + INTERSECT_CHUNK_SIZE - 1) // INTERSECT_CHUNK_SIZE
+
+    for chunk in prange(n_chunks):
+        stack = np.empty(BVH_STACK_SIZE, dtype=np.int64)
+        start = chunk * INTERSECT_CHUNK_SIZE
+        stop = min(start + INTERSECT_CHUNK_SIZE, n_active)
+
+        for k in range(start, stop):
+            ray = active[k]
+            t, sphere_idx = bvh_hit_numba(
+                (origins[0, ray], origins[1, ray], origins[2, ray]),
+                (directions[0, ray], directions[1, ray], directions[2, ray]),
+                spheres_data,
+                bvh_bounds,
+                bvh_links,
+                0.001,
+                np.inf,
+                stack,
+            )
+            hit_t[ray] = t
+            hit_sphere[ray] = sphere_idx
+
+
+@njit(cache=True)
+def sort_by_material_wavefront(
+    active, n_active, hit_sphere, materials_data, queues, queue_sizes
+):
+    """Bucket the active rays by the material they hit (or the miss queue)"""
+    queue_sizes[:] = 0
+
+    for k in range(n_active):
+        ray = active[k]
+        sphere_idx = hit_sphere[ray]
+        if sphere_idx < 0:
+            queue = MISS_QUEUE
+        else:
+            queue = int(materials_data[sphere_idx, 0])
+
+        queues[queue, queue_sizes[queue]] = ray
+        queue_sizes[queue] += 1
+
+
+@njit(parallel=True, cache=True)
+def shade_miss_wavefront(queue, queue_size, directions, throughput, radiance, alive):
+    """Terminate rays that escaped the scene with the sky color"""
+    for k in prange(queue_size):
+        ray = queue[k]
+        sky = sky_color_numba(
+            (directions[0, ray], directions[1, ray], directions[2, ray])
+        )
+        for axis in range(3):
+            radiance[axis, ray] = throughput[axis, ray] * sky[axis]
+        alive[ray] = False
+
+
+@njit(cache=True)
+def _load_hit(ray, origins, directions, spheres_data, hit_t, hit_sphere):
+    ray_direction = (directions[0, ray], directions[1, ray], directions[2, ray])
+    hit_point, normal, front_face = hit_record_numba(
+        (origins[0, ray], origins[1, ray], origins[2, ray]),
+        ray_direction,
+        spheres_data,
+        hit_sphere[ray],
+        hit_t[ray],
+    )
+    return ray_direction, hit_point, normal, front_face
+
+
+@njit(cache=True)
+def _store_ray(ray, origins, directions, new_origin, new_direction):
+    for axis in range(3):
+        origins[axis, ray] = new_origin[axis]
+        directions[axis, ray] = new_direction[axis]
+
+
+@njit(parallel=True, cache=True)
+def shade_lambertian_wavefront(
+    queue,
+    queue_size,
+    origins,
+    directions,
+    throughput,
+    spheres_data,
+    materials_data,
+    hit_t,
+    hit_sphere,
+    rng_states,
+    alive,
+):
+    for k in prange(queue_size):
+        ray = queue[k]
+        ray_direction, hit_point, normal, _ = _load_hit(
+            ray, origins, directions, spheres_data, hit_t, hit_sphere
+        )
+        _, new_origin, new_direction = scatter_lambertian_numba(
+            ray_direction, hit_point, normal, rng_states[ray]
+        )
+        _store_ray(ray, origins, directions, new_origin, new_direction)
+
+        material_idx = hit_sphere[ray]
+        for axis in range(3):
+            throughput[axis, ray] *= materials_data[material_idx, 1 + axis]
+
+
+@njit(parallel=True, cache=True)
+def shade_metal_wavefront(
+    queue,
+    queue_size,
+    origins,
+    directions,
+    throughput,
+    spheres_data,
+    materials_data,
+    hit_t,
+    hit_sphere,
+    rng_states,
+    alive,
+):
+    for k in prange(queue_size):
+        ray = queue[k]
+        ray_direction, hit_point, normal, _ = _load_hit(
+            ray, origins, directions, spheres_data, hit_t, hit_sphere
+        )
+        material_idx = hit_sphere[ray]
+        scattered, new_origin, new_direction = scatter_metal_numba(
+            ray_direction,
+            hit_point,
+            normal,
+            materials_data[material_idx, 4],
+            rng_states[ray],
+        )
+        if not scattered:
+            # Absorbed: the radiance of this ray stays black
+            alive[ray] = False
+            continue
+
+        _store_ray(ray, origins, directions, new_origin, new_direction)
+        for axis in range(3):
+            throughput[axis, ray] *= materials_data[material_idx, 1 + axis]
+
+
+@njit(parallel=True, cache=True)
+def shade_dielectric_wavefront(
+    queue,
+    queue_size,
+    origins,
+    directions,
+    throughput,
+    spheres_data,
+    materials_data,
+    hit_t,
+    hit_sphere,
+    rng_states,
+    alive,
+):
+    for k in prange(queue_size):
+        ray = queue[k]
+        ray_direction, hit_point, normal, front_face = _load_hit(
+            ray, origins, directions, spheres_data, hit_t, hit_sphere
+        )
+        _, new_origin, new_direction = scatter_dielectric_numba(
+            ray_direction,
+            hit_point,
+            normal,
+            front_face,
+            materials_data[hit_sphere[ray], 1],
+            rng_states[ray],
+        )
+        # Dielectric doesn't attenuate color (white)
+        _store_ray(ray, origins, directions, new_origin, new_direction)
+
+
+@njit(parallel=True, cache=True)
+def roulette_wavefront(queues, queue_sizes, throughput, rng_states, alive):
+    """Russian roulette on the rays that scattered this bounce, see
+    ``russian_roulette_numba``"""
+    for queue in range(MISS_QUEUE):
+        for k in prange(queue_sizes[queue]):
+            ray = queues[queue, k]
+            if not alive[ray]:
+                continue
+
+            survived, weighted = russian_roulette_numba(
+                (throughput[0, ray], throughput[1, ray], throughput[2, ray]),
+                rng_states[ray],
+            )
+            alive[ray] = survived
+            for axis in range(3):
+                throughput[axis, ray] = weighted[axis]
+
+
+@njit(cache=True)
+def compact_wavefront(queues, queue_sizes, alive, active):
+    """Gather the surviving rays of the material queues into ``active``.
+
+    Returns the new number of active rays. Rays keep their relative order
+    within each material queue.
+    """
+    n_active = 0
+    for queue in range(MISS_QUEUE):
+        for k in range(queue_sizes[queue]):
+            ray = queues[queue, k]
+            if alive[ray]:
+                active[n_active] = ray
+                n_active += 1
+
+    return n_active
+
+
+@njit(parallel=True, cache=True)
+def accumulate_wavefront(samples, radiance, output):
+    """Add the radiance of each pixel's ``samples`` rays to the tile buffer"""
+    tile_width = output.shape[1]
+    n_pixels = output.shape[0] * tile_width
+
+    for pixel in prange(n_pixels):
+        row = pixel // tile_width
+        col = pixel % tile_width
+        for k in range(pixel * samples, (pixel + 1) * samples):
+            for axis in range(3):
+                output[row, col, axis] += radiance[axis, k]
+
+
+@njit(parallel=True, cache=True)
+def accumulate_pixels_wavefront(samples, radiance, output):
+    """Write the sum and the sum of squares of each listed pixel's ``samples``
+    rays to an (n, 2, 3) buffer"""
+    for pixel in prange(output.shape[0]):
+        for axis in range(3):
+            total = 0.0
+            squares = 0.0
+            for k in range(pixel * samples, (pixel + 1) * samples):
+                total += radiance[axis, k]
+                squares += radiance[axis, k] * radiance[axis, k]
+            output[pixel, 0, axis] = total
+            output[pixel, 1, axis] = squares
+
+
+def compile_kernels() -> None:
+    """Compile every stage for its explicit signature.
+
+    The stages are declared with ``cache=True``, so this loads them from the
+    on-disk cache when it is present and populates the cache otherwise.
+    """
+    generate_rays_wavefront.compile(GENERATE_RAYS_SIGNATURE)
+    intersect_wavefront.compile(INTERSECT_SIGNATURE)
+    sort_by_material_wavefront.compile(SORT_BY_MATERIAL_SIGNATURE)
+    shade_miss_wavefront.compile(SHADE_MISS_SIGNATURE)
+    shade_lambertian_wavefront.compile(SHADE_SIGNATURE)
+    shade_metal_wavefront.compile(SHADE_SIGNATURE)
+    shade_dielectric_wavefront.compile(SHADE_SIGNATURE)
+    roulette_wavefront.compile(ROULETTE_SIGNATURE)
+    compact_wavefront.compile(COMPACT_SIGNATURE)
+    accumulate_wavefront.compile(ACCUMULATE_SIGNATURE)
+    generate_pixel_rays_wavefront.compile(GENERATE_PIXEL_RAYS_SIGNATURE)
+    accumulate_pixels_wavefront.compile(ACCUMULATE_PIXELS_SIGNATURE)
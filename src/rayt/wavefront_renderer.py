@@ -0,0 +1,442 @@
+import sys
+
+import numpy as np
+import numpy.typing as npt
+from numba import get_num_threads
+
+from rayt.adaptive import AdaptiveSampling, render_adaptive
+from rayt.sampling import sampler_parameters
+from rayt.scene_data import bvh_arrays, camera_array, material_array, sphere_array
+from rayt.wavefront_optimized import (
+    DIELECTRIC_QUEUE,
+    LAMBERTIAN_QUEUE,
+    METAL_QUEUE,
+    MISS_QUEUE,
+    accumulate_pixels_wavefront,
+    accumulate_wavefront,
+    compact_wavefront,
+    compile_kernels,
+    generate_pixel_rays_wavefront,
+    generate_rays_wavefront,
+    intersect_wavefront,
+    roulette_wavefront,
+    shade_dielectric_wavefront,
+    shade_lambertian_wavefront,
+    shade_metal_wavefront,
+    shade_miss_wavefront,
+    sort_by_material_wavefront,
+)
+from rayt_rust._core import Camera, HittableList
+
+# Upper bound on the number of rays traced together in one wavefront.
+MAX_RAYS_PER_WAVEFRONT = 1 << 20
+
+
+class WavefrontBuffers:
+    """Structure-of-arrays storage for one ray population"""
+
+    def __init__(self, n_rays: int) -> None:
+        self.origins = np.empty((3, n_rays), dtype=np.float64)
+        self.directions = np.empty((3, n_rays), dtype=np.float64)
+        self.throughput = np.empty((3, n_rays), dtype=np.float64)
+        self.radiance = np.empty((3, n_rays), dtype=np.float64)
+        self.rng_states = np.empty((n_rays, 2), dtype=np.uint64)
+        self.hit_t = np.empty(n_rays, dtype=np.float64)
+        self.hit_sphere = np.empty(n_rays, dtype=np.int64)
+        self.alive = np.empty(n_rays, dtype=np.bool_)
+        self.active = np.empty(n_rays, dtype=np.int64)
+        self.queues = np.empty((MISS_QUEUE + 1, n_rays), dtype=np.int64)
+        self.queue_sizes = np.zeros(MISS_QUEUE + 1, dtype=np.int64)
+
+
+class WavefrontRenderer:
+    """Bounce-batched (wavefront) ray tracer renderer"""
+
+    def __init__(self) -> None:
+        self.spheres_data: npt.NDArray[np.float64] | None = None
+        self.materials_data: npt.NDArray[np.float64] | None = None
+        self.camera_data: npt.NDArray[np.float64] | None = None
+        self.bvh_bounds: npt.NDArray[np.float64] | None = None
+        self.bvh_links: npt.NDArray[np.int64] | None = None
+
+    def _prepare_scene_data(self, world: HittableList, camera: Camera) -> None:
+        """Convert scene objects to NumPy arrays for Numba"""
+        # Sphere data: [center_x, center_y, center_z, radius]
+        self.spheres_data = sphere_array(world)
+
+        # Material data: [type, param1, param2, param3, param4]
+        # Type 0: Lambertian [type, albedo_r, albedo_g, albedo_b, unused]
+        # Type 1: Metal [type, albedo_r, albedo_g, albedo_b, fuzz]
+        # Type 2: Dielectric [type, ref_idx, unused, unused, unused]
+        self.materials_data = material_array(world)
+
+        # Camera data: [origin, lower_left_corner, horizontal, vertical, lens_radius, u, v]
+        self.camera_data = camera_array(camera)
+
+        # BVH node bounds: [min_x, min_y, min_z, max_x, max_y, max_z]
+        # BVH node links: [offset, count, axis] (see bvh_hit_numba)
+        # Spheres and materials are reordered so that every leaf covers a
+        # contiguous range of them.
+        self.bvh_bounds, self.bvh_links, order = bvh_arrays(world)
+        self.spheres_data = self.spheres_data[order]
+        self.materials_data = self.materials_data[order]
+
+    def _trace_wavefront(
+        self,
+        x0: int,
+        y0: int,
+        image_width: int,
+        image_height: int,
+        samples: int,
+        max_depth: int,
+        roulette_depth: int,
+        seed: int,
+        sample_offset: int,
+        sampler: int,
+        strata: int,
+        buffers: WavefrontBuffers,
+        output: npt.NDArray[np.float64],
+    ) -> None:
+        """Trace ``samples`` samples of every pixel of a tile, adding to ``output``"""
+        b = buffers
+        generate_rays_wavefront(
+            x0,
+            y0,
+            output.shape[1],
+            image_width,
+            image_height,
+            samples,
+            self.camera_data,
+            seed,
+            sample_offset,
+            sampler,
+            strata,
+            b.origins,
+            b.directions,
+            b.throughput,
+            b.radiance,
+            b.rng_states,
+            b.active,
+            b.alive,
+        )
+        self._bounce_wavefront(max_depth, roulette_depth, b)
+        accumulate_wavefront(samples, b.radiance, output)
+
+    def _bounce_wavefront(
+        self, max_depth: int, roulette_depth: int, buffers: WavefrontBuffers
+    ) -> None:
+        """Advance every generated ray through up to ``max_depth`` bounces,
+        with Russian roulette after ``roulette_depth`` bounces"""
+        b = buffers
+        n_active = b.active.shape[0]
+        shade_args = (
+            b.origins,
+            b.directions,
+            b.throughput,
+            self.spheres_data,
+            self.materials_data,
+            b.hit_t,
+            b.hit_sphere,
+            b.rng_states,
+            b.alive,
+        )
+
+        # Rays still alive after max_depth bounces contribute black
+        for bounce in range(1, max_depth + 1):
+            if n_active == 0:
+                break
+
+            intersect_wavefront(
+                b.active,
+                n_active,
+                b.origins,
+                b.directions,
+                self.spheres_data,
+                self.bvh_bounds,
+                self.bvh_links,
+                b.hit_t,
+                b.hit_sphere,
+            )
+            sort_by_material_wavefront(
+                b.active,
+                n_active,
+                b.hit_sphere,
+                self.materials_data,
+                b.queues,
+                b.queue_sizes,
+            )
+
+            shade_miss_wavefront(
+                b.queues[MISS_QUEUE],
+                b.queue_sizes[MISS_QUEUE],
+                b.directions,
+                b.throughput,
+                b.radiance,
+                b.alive,
+            )
+            shade_lambertian_wavefront(
+                b.queues[LAMBERTIAN_QUEUE],
+                b.queue_sizes[LAMBERTIAN_QUEUE],
+                *shade_args,
+            )
+            shade_metal_wavefront(
+                b.queues[METAL_QUEUE], b.queue_sizes[METAL_QUEUE], *shade_args
+            )
+            shade_dielectric_wavefront(
+                b.queues[DIELECTRIC_QUEUE],
+                b.queue_sizes[DIELECTRIC_QUEUE],
+                *shade_args,
+            )
+            if roulette_depth <= bounce < max_depth:
+                roulette_wavefront(
+                    b.queues, b.queue_sizes, b.throughput, b.rng_states, b.alive
+                )
+
+            n_active = compact_wavefront(b.queues, b.queue_sizes, b.alive, b.active)
+
+    def render_pixel_list(
+        self,
+        pixels: npt.NDArray[np.int64],
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        roulette_depth: int,
+        seed: int,
+        sample_offset: int,
+        sampler: int,
+        strata: int,
+    ) -> npt.NDArray[np.float64]:
+        """Sums and sums of squares of the samples of the listed pixels.
+
+        Pixels are numbered row by row from the top-left corner, and the
+        result has shape (n, 2, 3). Used by adaptive sampling.
+        """
+        output = np.empty((pixels.shape[0], 2, 3), dtype=np.float64)
+        batch = max(1, MAX_RAYS_PER_WAVEFRONT // samples_per_pixel)
+
+        for start in range(0, pixels.shape[0], batch):
+            batch_pixels = pixels[start : start + batch]
+            b = WavefrontBuffers(batch_pixels.shape[0] * samples_per_pixel)
+            generate_pixel_rays_wavefront(
+                batch_pixels,
+                image_width,
+                image_height,
+                samples_per_pixel,
+                self.camera_data,
+                seed,
+                sample_offset,
+                sampler,
+                strata,
+                b.origins,
+                b.directions,
+                b.throughput,
+                b.radiance,
+                b.rng_states,
+                b.active,
+                b.alive,
+            )
+            self._bounce_wavefront(max_depth, roulette_depth, b)
+            accumulate_pixels_wavefront(
+                samples_per_pixel, b.radiance, output[start : start + batch]
+            )
+
+        return output
+
+    def render_tile(
+        self,
+        x0: int,
+        y0: int,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        roulette_depth: int,
+        seed: int,
+        sample_offset: int,
+        sampler: int,
+        strata: int,
+        output: npt.NDArray[np.float64],
+    ) -> None:
+        """Add the sample sums of a tile (sized by ``output``) to ``output``.
+
+        Samples are traced in batches so that no wavefront holds more than
+        ``MAX_RAYS_PER_WAVEFRONT`` rays.
+        """
+        n_pixels = output.shape[0] * output.shape[1]
+        batch = max(1, min(samples_per_pixel, MAX_RAYS_PER_WAVEFRONT // n_pixels))
+        buffers = WavefrontBuffers(n_pixels * batch)
+
+        for start in range(0, samples_per_pixel, batch):
+            samples = min(batch, samples_per_pixel - start)
+            if samples != batch:
+                buffers = WavefrontBuffers(n_pixels * samples)
+
+            self._trace_wavefront(
+                x0,
+                y0,
+                image_width,
+                image_height,
+                samples,
+                max_depth,
+                roulette_depth,
+                seed,
+                sample_offset + start,
+                sampler,
+                strata,
+                buffers,
+                output,
+            )
+
+    def prepare(self, world: HittableList, camera: Camera) -> None:
+        """Convert the scene to arrays and load the kernels, once for any
+        number of ``render_frame`` and ``render_pixel_list`` calls"""
+        # Prepare scene data for Numba
+        self._prepare_scene_data(world, camera)
+
+        # Compile the kernels, or load them from the on-disk cache
+        print("JIT compiling (cached after the first run)...", file=sys.stderr)
+        compile_kernels()
+        print("JIT compilation completed", file=sys.stderr)
+
+    def render_frame(
+        self,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        roulette_depth: int,
+        seed: int,
+        sample_offset: int,
+        sampler: int,
+        strata: int,
+    ) -> npt.NDArray[np.float64]:
+        """Sums of samples ``sample_offset`` to ``sample_offset +
+        samples_per_pixel - 1`` of every pixel of the prepared scene, as an
+        (image_height, image_width, 3) array"""
+        # Render bands of rows, each band holding at most one wavefront of
+        # primary rays when that fits in the ray budget
+        band_height = max(
+            1, MAX_RAYS_PER_WAVEFRONT // (image_width * samples_per_pixel)
+        )
+        output = np.zeros((image_height, image_width, 3), dtype=np.float64)
+
+        for y0 in range(0, image_height, band_height):
+            y1 = min(y0 + band_height, image_height)
+            print(
+                f"\rScanlines remaining: {image_height - y0}", end=" ", file=sys.stderr
+            )
+            self.render_tile(
+                0,
+                y0,
+                image_width,
+                image_height,
+                samples_per_pixel,
+                max_depth,
+                roulette_depth,
+                seed,
+                sample_offset,
+                sampler,
+                strata,
+                output[y0:y1],
+            )
+        print(file=sys.stderr)
+        return output
+
+    def render(
+        self,
+        world: HittableList,
+        camera: Camera,
+        image_width: int,
+        image_height: int,
+        samples_per_pixel: int,
+        max_depth: int,
+        seed: int,
+        adaptive: AdaptiveSampling | None = None,
+        roulette_depth: int | None = None,
+        sampler: str = "random",
+        sample_offset: int = 0,
+        strata: int | None = None,
+    ) -> npt.NDArray[np.float64]:
+        """Render using the wavefront engine"""
+        print(
+            f"Rendering {image_width}x{image_height} with the wavefront engine",
+            file=sys.stderr,
+        )
+        print(
+            f"Samples per pixel: {samples_per_pixel}, Max depth: {max_depth}, "
+            f"Seed: {seed}",
+            file=sys.stderr,
+        )
+
+        self.prepare(world, camera)
+        if roulette_depth is None:
+            roulette_depth = max_depth
+        sampler_code, strata = sampler_parameters(sampler, samples_per_pixel, strata)
+        print(f"Rendering on {get_num_threads()} threads...", file=sys.stderr)
+        if adaptive is not None:
+            output = render_adaptive(
+                lambda pixels, sample_offset, samples: self.render_pixel_list(
+                    pixels,
+                    image_width,
+                    image_height,
+                    samples,
+                    max_depth,
+                    roulette_depth,
+                    seed,
+                    sample_offset,
+                    sampler_code,
+                    strata,
+                ),
+                image_width,
+                image_height,
+                samples_per_pixel,
+                adaptive,
+            )
+        else:
+            output = self.render_frame(
+                image_width,
+                image_height,
+                samples_per_pixel,
+                max_depth,
+                roulette_depth,
+                seed,
+                sample_offset,
+                sampler_code,
+                strata,
+            )
+
+        print("Done.", file=sys.stderr)
+        return output
+
+
+def render_with_wavefront(
+    world: HittableList,
+    camera: Camera,
+    image_width: int,
+    image_height: int,
+    samples_per_pixel: int,
+    max_depth: int,
+    seed: int,
+    adaptive: AdaptiveSampling | None = None,
+    roulette_depth: int | None = None,
+    sampler: str = "random",
+    sample_offset: int = 0,
+    strata: int | None = None,
+) -> npt.NDArray[np.float64]:
+    """Main function for wavefront rendering"""
+    renderer = WavefrontRenderer()
+    return renderer.render(
+        world,
+        camera,
+        image_width,
+        image_height,
+        samples_per_pixel,
+        max_depth,
+        seed,
+        adaptive,
+        roulette_depth,
+        sampler,
+        sample_offset,
+        strata,
+    )
@@ -1,3 +1,5 @@
+import numpy.typing as npt
+
 # vector classes
 class Vec3:
     x: float
@@ -29,7 +31,9 @@ class Camera:
         focus_dist: float,
     ) -> None: ...
     def get_ray(self, s: float, t: float) -> Ray: ...
-    def get_data(self) -> list[float]: ...
+    def get_data(self) -> bytearray: ...
+    @staticmethod
+    def from_data(data: bytes) -> Camera: ...
 
 
 # hittable
@@ -40,8 +44,21 @@ class HittableList:
         self, center: Vec3, radius: float, albedo: Vec3, fuzz: float
     ) -> None: ...
     def add_dielectric(self, center: Vec3, radius: float, ref_idx: float) -> None: ...
-    def get_sphere_data(self) -> list[list[float]]: ...
-    def get_material_data(self) -> list[list[float]]: ...
+    def build_bvh(self) -> None: ...
+    @property
+    def has_bvh(self) -> bool: ...
+    def add_spheres(
+        self,
+        centers: npt.ArrayLike,
+        radii: npt.ArrayLike,
+        material_types: npt.ArrayLike,
+        material_params: npt.ArrayLike,
+    ) -> None: ...
+    @staticmethod
+    def from_data(sphere_data: bytes, material_data: bytes) -> HittableList: ...
+    def get_bvh_data(self) -> tuple[bytearray, bytearray, bytearray]: ...
+    def get_sphere_data(self) -> bytearray: ...
+    def get_material_data(self) -> bytearray: ...
 
 # materials
 class Lambertian:
@@ -62,6 +79,38 @@ class Ray:
 
 # utils, functions
 def random_double(min: float = 0.0, max: float = 1.0) -> float: ...
+def seed_rng(seed: int, pixel_index: int = 0, sample_index: int = 0) -> None: ...
 def unit_vector(v: Vec3) -> Vec3: ...
 def get_color(pixel_color: Vec3, samples_per_pixel: int) -> str: ...
-def ray_color(ray: Ray, world: HittableList, depth: int) -> Vec3: ...
+def ray_color(
+    ray: Ray, world: HittableList, depth: int, roulette_depth: int | None = None
+) -> Vec3: ...
+def render(
+    world: HittableList,
+    camera: Camera,
+    image_width: int,
+    image_height: int,
+    samples_per_pixel: int,
+    max_depth: int,
+    seed: int,
+    sample_offset: int = 0,
+    threads: int | None = None,
+    roulette_depth: int | None = None,
+    sampler: str = "random",
+    strata: int | None = None,
+) -> bytearray: ...
+def render_pixel_list(
+    world: HittableList,
+    camera: Camera,
+    image_width: int,
+    image_height: int,
+    pixels: bytes,
+    samples_per_pixel: int,
+    max_depth: int,
+    seed: int,
+    sample_offset: int = 0,
+    threads: int | None = None,
+    roulette_depth: int | None = None,
+    sampler: str = "random",
+    strata: int | None = None,
+) -> bytearray: ...
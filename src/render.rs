@@ -0,0 +1,338 @@
+use pyo3::exceptions::PyValueError;
+use pyo3::prelude::*;
+use pyo3::types::PyByteArray;
+
+use std::num::NonZeroUsize;
+use std::sync::Mutex;
+use std::thread;
+
+use crate::{
+    camera::Camera, color::ray_color, hittable_list::HittableList, rng::Rng, sampler::Sampler,
+    utils::f64_bytearray, vec3::Color,
+};
+
+// Number of image rows handed to a worker thread at a time.
+const TILE_ROWS: usize = 4;
+
+// Number of listed pixels handed to a worker thread at a time.
+const PIXEL_LIST_CHUNK: usize = 8;
+
+/// Trace sample `sample` of the pixel in column `i` and row `row_index`
+/// (counted from the top).
+///
+/// Every sample draws from its own random stream, keyed by the seed, the
+/// pixel index and the sample index. `sampler` places the sample inside the
+/// pixel and on the lens.
+#[allow(clippy::too_many_arguments)]
+fn render_sample(
+    world: &HittableList,
+    camera: &Camera,
+    i: usize,
+    row_index: usize,
+    image_width: usize,
+    image_height: usize,
+    max_depth: usize,
+    roulette_depth: usize,
+    seed: u64,
+    sample: u64,
+    sampler: Sampler,
+) -> Color {
+    let pixel_index = (row_index * image_width + i) as u64;
+    let j = image_height - 1 - row_index;
+    let mut rng = Rng::new(seed, pixel_index, sample);
+    let (du, dv, disk) = sampler.camera_sample(seed, pixel_index, sample, &mut rng);
+    let u = (i as f64 + du) / (image_width - 1) as f64;
+    let v = (j as f64 + dv) / (image_height - 1) as f64;
+    let r = camera.lens_ray(u, v, disk);
+    ray_color(r, world, max_depth, roulette_depth, &mut rng)
+}
+
+#[allow(clippy::too_many_arguments)]
+fn render_tile(
+    world: &HittableList,
+    camera: &Camera,
+    row0: usize,
+    image_width: usize,
+    image_height: usize,
+    samples_per_pixel: usize,
+    max_depth: usize,
+    roulette_depth: usize,
+    seed: u64,
+    sample_offset: u64,
+    sampler: Sampler,
+    tile: &mut [f64],
+) {
+    for (row_offset, row) in tile.chunks_mut(3 * image_width).enumerate() {
+        let row_index = row0 + row_offset;
+
+        for (i, pixel) in row.chunks_mut(3).enumerate() {
+            let mut pixel_color = Color::default();
+
+            for s in 0..samples_per_pixel as u64 {
+                pixel_color = pixel_color
+                    + render_sample(
+                        world,
+                        camera,
+                        i,
+                        row_index,
+                        image_width,
+                        image_height,
+                        max_depth,
+                        roulette_depth,
+                        seed,
+                        sample_offset + s,
+                        sampler,
+                    );
+            }
+
+            pixel[0] += pixel_color.x;
+            pixel[1] += pixel_color.y;
+            pixel[2] += pixel_color.z;
+        }
+    }
+}
+
+/// Render a full frame on `threads` native threads.
+///
+/// Returns the per-pixel sample sums laid out as (height, width, 3), top row
+/// first. Every sample draws from its own random stream, so the image does
+/// not depend on the number of threads.
+#[allow(clippy::too_many_arguments)]
+pub fn render_frame(
+    world: &HittableList,
+    camera: &Camera,
+    image_width: usize,
+    image_height: usize,
+    samples_per_pixel: usize,
+    max_depth: usize,
+    roulette_depth: usize,
+    seed: u64,
+    sample_offset: u64,
+    sampler: Sampler,
+    threads: usize,
+) -> Vec<f64> {
+    let mut output = vec![0.0; 3 * image_width * image_height];
+
+    // Workers pull the next band of rows from the shared iterator, so a slow
+    // band never holds up the rest of the frame.
+    let tiles = Mutex::new(output.chunks_mut(3 * image_width * TILE_ROWS).enumerate());
+
+    thread::scope(|scope| {
+        for _ in 0..threads.max(1) {
+            scope.spawn(|| loop {
+                let next = tiles.lock().unwrap().next();
+                let Some((tile_index, tile)) = next else {
+                    break;
+                };
+                render_tile(
+                    world,
+                    camera,
+                    tile_index * TILE_ROWS,
+                    image_width,
+                    image_height,
+                    samples_per_pixel,
+                    max_depth,
+                    roulette_depth,
+                    seed,
+                    sample_offset,
+                    sampler,
+                    tile,
+                );
+            });
+        }
+    });
+
+    output
+}
+
+/// Render a full frame without holding the GIL.
+///
+/// Returns the per-pixel sample sums as a native-endian float64 bytearray,
+/// to be read with `np.frombuffer` and reshaped to (height, width, 3).
+/// `threads` defaults to the number of available CPUs. Russian roulette
+/// starts after `roulette_depth` bounces, and is off when it is not given.
+/// `sampler` is one of "random", "stratified" and "halton"; stratified
+/// samples split the pixel into `strata` x `strata` cells, by default the
+/// largest grid that `samples_per_pixel` fills.
+#[pyfunction]
+#[pyo3(signature = (world, camera, image_width, image_height, samples_per_pixel, max_depth, seed, sample_offset=0, threads=None, roulette_depth=None, sampler="random", strata=None))]
+#[allow(clippy::too_many_arguments)]
+pub fn render<'py>(
+    py: Python<'py>,
+    world: &HittableList,
+    camera: &Camera,
+    image_width: usize,
+    image_height: usize,
+    samples_per_pixel: usize,
+    max_depth: usize,
+    seed: u64,
+    sample_offset: u64,
+    threads: Option<usize>,
+    roulette_depth: Option<usize>,
+    sampler: &str,
+    strata: Option<usize>,
+) -> PyResult<Bound<'py, PyByteArray>> {
+    if image_width < 2 || image_height < 2 {
+        return Err(PyValueError::new_err(
+            "image width and height must be at least 2",
+        ));
+    }
+
+    let threads =
+        threads.unwrap_or_else(|| thread::available_parallelism().map_or(1, NonZeroUsize::get));
+    let roulette_depth = roulette_depth.unwrap_or(max_depth);
+    let strata = strata.unwrap_or_else(|| samples_per_pixel.isqrt());
+    let sampler = Sampler::from_name(sampler, strata)?;
+    let output = py.allow_threads(|| {
+        render_frame(
+            world,
+            camera,
+            image_width,
+            image_height,
+            samples_per_pixel,
+            max_depth,
+            roulette_depth,
+            seed,
+            sample_offset,
+            sampler,
+            threads,
+        )
+    });
+
+    f64_bytearray(py, output.len(), output)
+}
+
+/// Render the listed pixels on `threads` native threads.
+///
+/// Pixels are numbered row by row from the top-left corner. Returns the sum
+/// and the sum of squares of samples `sample_offset` to `sample_offset +
+/// samples_per_pixel - 1` of every pixel, laid out as (n, 2, 3). These are
+/// the samples that `render_frame` traces for the same pixels.
+#[allow(clippy::too_many_arguments)]
+pub fn render_pixels(
+    world: &HittableList,
+    camera: &Camera,
+    pixels: &[usize],
+    image_width: usize,
+    image_height: usize,
+    samples_per_pixel: usize,
+    max_depth: usize,
+    roulette_depth: usize,
+    seed: u64,
+    sample_offset: u64,
+    sampler: Sampler,
+    threads: usize,
+) -> Vec<f64> {
+    let mut output = vec![0.0; 6 * pixels.len()];
+    let chunks = Mutex::new(
+        pixels
+            .chunks(PIXEL_LIST_CHUNK)
+            .zip(output.chunks_mut(6 * PIXEL_LIST_CHUNK)),
+    );
+
+    thread::scope(|scope| {
+        for _ in 0..threads.max(1) {
+            scope.spawn(|| loop {
+                let next = chunks.lock().unwrap().next();
+                let Some((chunk, chunk_output)) = next else {
+                    break;
+                };
+                for (&pixel, sums) in chunk.iter().zip(chunk_output.chunks_mut(6)) {
+                    for s in 0..samples_per_pixel as u64 {
+                        let color = render_sample(
+                            world,
+                            camera,
+                            pixel % image_width,
+                            pixel / image_width,
+                            image_width,
+                            image_height,
+                            max_depth,
+                            roulette_depth,
+                            seed,
+                            sample_offset + s,
+                            sampler,
+                        );
+                        sums[0] += color.x;
+                        sums[1] += color.y;
+                        sums[2] += color.z;
+                        sums[3] += color.x * color.x;
+                        sums[4] += color.y * color.y;
+                        sums[5] += color.z * color.z;
+                    }
+                }
+            });
+        }
+    });
+
+    output
+}
+
+/// Render the listed pixels without holding the GIL.
+///
+/// `pixels` holds the bytes of an int64 array of pixel indices, numbered row
+/// by row from the top-left corner. Returns the per-pixel sums and sums of
+/// squares of the samples as a native-endian float64 bytearray, to be read
+/// with `np.frombuffer` and reshaped to (n, 2, 3). Used by adaptive sampling.
+/// `threads`, `roulette_depth`, `sampler` and `strata` work as in `render`.
+#[pyfunction]
+#[pyo3(signature = (world, camera, image_width, image_height, pixels, samples_per_pixel, max_depth, seed, sample_offset=0, threads=None, roulette_depth=None, sampler="random", strata=None))]
+#[allow(clippy::too_many_arguments)]
+pub fn render_pixel_list<'py>(
+    py: Python<'py>,
+    world: &HittableList,
+    camera: &Camera,
+    image_width: usize,
+    image_height: usize,
+    pixels: &[u8],
+    samples_per_pixel: usize,
+    max_depth: usize,
+    seed: u64,
+    sample_offset: u64,
+    threads: Option<usize>,
+    roulette_depth: Option<usize>,
+    sampler: &str,
+    strata: Option<usize>,
+) -> PyResult<Bound<'py, PyByteArray>> {
+    if image_width < 2 || image_height < 2 {
+        return Err(PyValueError::new_err(
+            "image width and height must be at least 2",
+        ));
+    }
+    if pixels.len() % 8 != 0 {
+        return Err(PyValueError::new_err("pixels must hold int64 values"));
+    }
+    let pixels = pixels
+        .chunks_exact(8)
+        .map(|chunk| {
+            let pixel = i64::from_ne_bytes(chunk.try_into().unwrap());
+            usize::try_from(pixel)
+                .ok()
+                .filter(|&pixel| pixel < image_width * image_height)
+                .ok_or_else(|| PyValueError::new_err(format!("pixel {pixel} is out of range")))
+        })
+        .collect::<PyResult<Vec<usize>>>()?;
+
+    let threads =
+        threads.unwrap_or_else(|| thread::available_parallelism().map_or(1, NonZeroUsize::get));
+    let roulette_depth = roulette_depth.unwrap_or(max_depth);
+    let strata = strata.unwrap_or_else(|| samples_per_pixel.isqrt());
+    let sampler = Sampler::from_name(sampler, strata)?;
+    let output = py.allow_threads(|| {
+        render_pixels(
+            world,
+            camera,
+            &pixels,
+            image_width,
+            image_height,
+            samples_per_pixel,
+            max_depth,
+            roulette_depth,
+            seed,
+            sample_offset,
+            sampler,
+            threads,
+        )
+    });
+
+    f64_bytearray(py, output.len(), output)
+}
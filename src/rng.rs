@@ -0,0 +1,136 @@
+use pyo3::prelude::*;
+
+use std::cell::Cell;
+use std::collections::hash_map::RandomState;
+use std::hash::{BuildHasher, Hasher};
+
+// Counter-based random streams, identical to `rayt/rng.py`: every
+// (seed, pixel_index, sample_index) triple is hashed with splitmix64 into the
+// state of its own xoroshiro128+ generator.
+
+const GOLDEN_GAMMA: u64 = 0x9e37_79b9_7f4a_7c15;
+
+/// Small, fast xoroshiro128+ generator carried explicitly through the tracer.
+#[derive(Clone, Copy)]
+pub struct Rng {
+    state: [u64; 2],
+}
+
+impl Rng {
+    /// Generator of the random stream of one pixel sample.
+    pub fn new(seed: u64, pixel_index: u64, sample_index: u64) -> Self {
+        Self {
+            state: stream_state(seed, pixel_index, sample_index),
+        }
+    }
+
+    pub fn next_u64(&mut self) -> u64 {
+        let [s0, mut s1] = self.state;
+        let result = s0.wrapping_add(s1);
+
+        s1 ^= s0;
+        self.state = [s0.rotate_left(55) ^ s1 ^ (s1 << 14), s1.rotate_left(36)];
+
+        result
+    }
+
+    /// Uniform double in [0, 1).
+    pub fn next_f64(&mut self) -> f64 {
+        (self.next_u64() >> 11) as f64 * (1.0 / (1u64 << 53) as f64)
+    }
+
+    /// Uniform double in [min, max).
+    pub fn range(&mut self, min: f64, max: f64) -> f64 {
+        min + (max - min) * self.next_f64()
+    }
+}
+
+// Generator used by the functions called from Python, which have no
+// generator of their own to pass along.
+thread_local! {
+    static THREAD_RNG: Cell<Rng> = Cell::new(unseeded_rng());
+}
+
+fn mix64(mut z: u64) -> u64 {
+    z = (z ^ (z >> 30)).wrapping_mul(0xbf58_476d_1ce4_e5b9);
+    z = (z ^ (z >> 27)).wrapping_mul(0x94d0_49bb_1331_11eb);
+    z ^ (z >> 31)
+}
+
+fn stream_state(seed: u64, pixel_index: u64, sample_index: u64) -> [u64; 2] {
+    let mut h = mix64(seed.wrapping_add(GOLDEN_GAMMA));
+    h = mix64(h ^ pixel_index);
+    h = mix64(h ^ sample_index);
+    [
+        mix64(h.wrapping_add(GOLDEN_GAMMA)),
+        mix64(h.wrapping_add(GOLDEN_GAMMA).wrapping_add(GOLDEN_GAMMA)),
+    ]
+}
+
+fn unseeded_rng() -> Rng {
+    let seed = RandomState::new().build_hasher().finish();
+    Rng::new(seed, 0, 0)
+}
+
+/// Run `f` with the calling thread's generator.
+pub fn with_thread_rng<T>(f: impl FnOnce(&mut Rng) -> T) -> T {
+    THREAD_RNG.with(|cell| {
+        let mut rng = cell.get();
+        let result = f(&mut rng);
+        cell.set(rng);
+        result
+    })
+}
+
+pub fn next_f64() -> f64 {
+    with_thread_rng(Rng::next_f64)
+}
+
+/// Reset the calling thread's generator to the stream of one pixel sample.
+#[pyfunction]
+#[pyo3(signature = (seed, pixel_index=0, sample_index=0))]
+pub fn seed_rng(seed: u64, pixel_index: u64, sample_index: u64) {
+    THREAD_RNG.with(|cell| cell.set(Rng::new(seed, pixel_index, sample_index)));
+}
+
+/// Uniform double in [0, 1) fixed for one pixel and sample dimension.
+///
+/// Keys are hashed like `stream_state` with the complement of the dimension
+/// in place of the sample index, so offsets never coincide with a stream.
+pub fn rotation_offset(seed: u64, pixel_index: u64, dimension: u64) -> f64 {
+    let mut h = mix64(seed.wrapping_add(GOLDEN_GAMMA));
+    h = mix64(h ^ pixel_index);
+    h = mix64(h ^ !dimension);
+    (mix64(h.wrapping_add(GOLDEN_GAMMA)) >> 11) as f64 * (1.0 / (1u64 << 53) as f64)
+}
+
+/// The digits of `index` in `base` mirrored around the radix point, the
+/// `index`-th point of the van der Corput sequence of `base`.
+pub fn radical_inverse(base: u64, mut index: u64) -> f64 {
+    let inv_base = 1.0 / base as f64;
+    let mut factor = inv_base;
+    let mut result = 0.0;
+    while index > 0 {
+        result += (index % base) as f64 * factor;
+        index /= base;
+        factor *= inv_base;
+    }
+    result
+}
+
+/// Halton coordinate of `base` for one sample, rotated by the pixel's offset
+/// in `dimension` (Cranley-Patterson rotation).
+pub fn halton_sample(
+    base: u64,
+    sample_index: u64,
+    seed: u64,
+    pixel_index: u64,
+    dimension: u64,
+) -> f64 {
+    let x = radical_inverse(base, sample_index) + rotation_offset(seed, pixel_index, dimension);
+    if x >= 1.0 {
+        x - 1.0
+    } else {
+        x
+    }
+}
@@ -0,0 +1,74 @@
+use pyo3::exceptions::PyValueError;
+use pyo3::prelude::*;
+
+use crate::{
+    rng::{halton_sample, Rng},
+    vec3::{concentric_disk, random_in_unit_disk, Vec3},
+};
+
+// Camera samplers, identical to `rayt/sampling.py` and the numba kernels.
+
+// Halton bases of the pixel (x, y) and lens (x, y) dimensions.
+const HALTON_BASES: [u64; 4] = [2, 3, 5, 7];
+
+/// Placement of camera samples inside their pixel and on the lens.
+#[derive(Clone, Copy)]
+pub enum Sampler {
+    /// Independent uniform numbers from the sample's random stream.
+    Random,
+    /// Sample `s` jittered inside cell `s % strata²` of a strata x strata grid.
+    Stratified { strata: u64 },
+    /// Halton points of bases 2, 3, 5 and 7, rotated per pixel.
+    Halton,
+}
+
+impl Sampler {
+    pub fn from_name(name: &str, strata: usize) -> PyResult<Self> {
+        match name {
+            "random" => Ok(Sampler::Random),
+            "stratified" => Ok(Sampler::Stratified {
+                strata: strata.max(1) as u64,
+            }),
+            "halton" => Ok(Sampler::Halton),
+            _ => Err(PyValueError::new_err(format!(
+                "unknown sampler '{name}', expected one of random, stratified, halton"
+            ))),
+        }
+    }
+
+    /// Position of sample `sample` of a pixel inside the pixel, in [0, 1)²,
+    /// and on the unit lens disk.
+    pub fn camera_sample(
+        &self,
+        seed: u64,
+        pixel_index: u64,
+        sample: u64,
+        rng: &mut Rng,
+    ) -> (f64, f64, Vec3) {
+        match *self {
+            Sampler::Random => {
+                let du = rng.next_f64();
+                let dv = rng.next_f64();
+                (du, dv, random_in_unit_disk(rng))
+            }
+            Sampler::Stratified { strata } => {
+                let cell = sample % (strata * strata);
+                let du = ((cell % strata) as f64 + rng.next_f64()) / strata as f64;
+                let dv = ((cell / strata) as f64 + rng.next_f64()) / strata as f64;
+                (du, dv, random_in_unit_disk(rng))
+            }
+            Sampler::Halton => {
+                let [du, dv, lens_u, lens_v] = std::array::from_fn(|dimension| {
+                    halton_sample(
+                        HALTON_BASES[dimension],
+                        sample,
+                        seed,
+                        pixel_index,
+                        dimension as u64,
+                    )
+                });
+                (du, dv, concentric_disk(lens_u, lens_v))
+            }
+        }
+    }
+}
@@ -57,3 +57,140 @@ impl Hittable for Sphere {
         None
     }
 }
+
+// Number of spheres tested per iteration of `SphereSoa::hit`.
+const LANES: usize = 4;
+
+/// Spheres stored as structure-of-arrays, for batched intersection tests.
+///
+/// `material[k]` indexes the material list of the owning HittableList.
+#[derive(Clone, Default)]
+pub struct SphereSoa {
+    pub x: Vec<f64>,
+    pub y: Vec<f64>,
+    pub z: Vec<f64>,
+    pub r: Vec<f64>,
+    pub material: Vec<usize>,
+}
+
+impl SphereSoa {
+    pub fn len(&self) -> usize {
+        self.x.len()
+    }
+
+    pub fn push(&mut self, center: Point3, radius: f64, material: usize) {
+        self.x.push(center.x);
+        self.y.push(center.y);
+        self.z.push(center.z);
+        self.r.push(radius);
+        self.material.push(material);
+    }
+
+    pub fn center(&self, k: usize) -> Point3 {
+        Point3::from([self.x[k], self.y[k], self.z[k]])
+    }
+
+    /// Copy of the spheres in the given order.
+    pub fn permuted(&self, order: &[usize]) -> Self {
+        Self {
+            x: order.iter().map(|&k| self.x[k]).collect(),
+            y: order.iter().map(|&k| self.y[k]).collect(),
+            z: order.iter().map(|&k| self.z[k]).collect(),
+            r: order.iter().map(|&k| self.r[k]).collect(),
+            material: order.iter().map(|&k| self.material[k]).collect(),
+        }
+    }
+
+    /// Closest hit in (t_min, t_max) among spheres `start..end`.
+    ///
+    /// Returns the sphere position and the ray parameter. The discriminants
+    /// of `LANES` spheres are computed per iteration by a branch-free loop
+    /// that the compiler turns into SIMD code; roots are only solved for the
+    /// (rare) lanes where the ray meets the sphere, in sphere order, so the
+    /// result is the same as testing the spheres one by one.
+    pub fn hit(
+        &self,
+        r: &Ray,
+        start: usize,
+        end: usize,
+        t_min: f64,
+        t_max: f64,
+    ) -> Option<(usize, f64)> {
+        let (o, d) = (r.origin, r.direction);
+        let a = d.length_squared();
+        let mut closest_so_far = t_max;
+        let mut closest = None;
+
+        let mut k = start;
+        while k + LANES <= end {
+            let x: &[f64; LANES] = self.x[k..k + LANES].try_into().unwrap();
+            let y: &[f64; LANES] = self.y[k..k + LANES].try_into().unwrap();
+            let z: &[f64; LANES] = self.z[k..k + LANES].try_into().unwrap();
+            let radius: &[f64; LANES] = self.r[k..k + LANES].try_into().unwrap();
+
+            let mut half_b = [0.0; LANES];
+            let mut discriminant = [0.0; LANES];
+            for lane in 0..LANES {
+                let (ocx, ocy, ocz) = (o.x - x[lane], o.y - y[lane], o.z - z[lane]);
+                half_b[lane] = ocx * d.x + ocy * d.y + ocz * d.z;
+                let c = ocx * ocx + ocy * ocy + ocz * ocz - radius[lane] * radius[lane];
+                discriminant[lane] = half_b[lane] * half_b[lane] - a * c;
+            }
+
+            if discriminant.iter().any(|&disc| disc > 0.0) {
+                for lane in 0..LANES {
+                    if let Some(t) =
+                        nearest_root(a, half_b[lane], discriminant[lane], t_min, closest_so_far)
+                    {
+                        closest_so_far = t;
+                        closest = Some(k + lane);
+                    }
+                }
+            }
+            k += LANES;
+        }
+
+        for k in k..end {
+            let oc = o - self.center(k);
+            let half_b = dot(&oc, &d);
+            let c = oc.length_squared() - self.r[k].powi(2);
+            let discriminant = half_b.powi(2) - a * c;
+            if let Some(t) = nearest_root(a, half_b, discriminant, t_min, closest_so_far) {
+                closest_so_far = t;
+                closest = Some(k);
+            }
+        }
+
+        closest.map(|k| (k, closest_so_far))
+    }
+
+    /// Hit record of sphere `k` at ray parameter `t`.
+    pub fn hit_record(&self, r: &Ray, k: usize, t: f64, material: Material) -> HitRecord {
+        let p = r.at(t);
+        let outward_normal = (p - self.center(k)) / self.r[k];
+        let mut rec = HitRecord::new(p, outward_normal, t, material);
+        rec.set_face_normal(r, &outward_normal);
+        rec
+    }
+}
+
+/// Nearest root of the ray/sphere quadratic in (t_min, t_max), if any.
+#[inline(always)]
+fn nearest_root(a: f64, half_b: f64, discriminant: f64, t_min: f64, t_max: f64) -> Option<f64> {
+    if discriminant <= 0.0 {
+        return None;
+    }
+
+    let root = f64::sqrt(discriminant);
+    let near = (-half_b - root) / a;
+    if near < t_max && near > t_min {
+        return Some(near);
+    }
+
+    let far = (-half_b + root) / a;
+    if far < t_max && far > t_min {
+        return Some(far);
+    }
+
+    None
+}
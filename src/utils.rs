@@ -1,4 +1,6 @@
+use pyo3::exceptions::PyValueError;
 use pyo3::prelude::*;
+use pyo3::types::{PyByteArray, PyBytes};
 
 // Constants
 pub const INFINITY: f64 = f64::INFINITY;
@@ -8,7 +10,7 @@ pub const PI: f64 = std::f64::consts::PI;
 #[macro_export]
 macro_rules! random_double {
     () => {
-        rand::random::<f64>()
+        $crate::rng::next_f64()
     };
     ($min:expr, $max:expr) => {
         $min + ($max - $min) * random_double!()
@@ -39,3 +41,74 @@ pub fn clamp(x: f64, min: f64, max: f64) -> f64 {
 pub fn random_double(min: f64, max: f64) -> f64 {
     random_double!(min, max)
 }
+
+// Array export and import. Arrays cross the Python boundary as native-endian
+// bytes: `np.frombuffer` wraps an exported bytearray without copying, and
+// `ndarray.tobytes()` produces the input of the bulk import functions.
+
+pub fn f64_bytearray<'py>(
+    py: Python<'py>,
+    len: usize,
+    values: impl IntoIterator<Item = f64>,
+) -> PyResult<Bound<'py, PyByteArray>> {
+    PyByteArray::new_bound_with(py, 8 * len, |bytes| {
+        for (chunk, value) in bytes.chunks_exact_mut(8).zip(values) {
+            chunk.copy_from_slice(&value.to_ne_bytes());
+        }
+        Ok(())
+    })
+}
+
+pub fn i64_bytearray<'py>(
+    py: Python<'py>,
+    len: usize,
+    values: impl IntoIterator<Item = usize>,
+) -> PyResult<Bound<'py, PyByteArray>> {
+    PyByteArray::new_bound_with(py, 8 * len, |bytes| {
+        for (chunk, value) in bytes.chunks_exact_mut(8).zip(values) {
+            chunk.copy_from_slice(&(value as i64).to_ne_bytes());
+        }
+        Ok(())
+    })
+}
+
+/// Decode native-endian float64 bytes into rows of `columns` values.
+pub fn f64_rows(data: &[u8], columns: usize, name: &str) -> PyResult<Vec<f64>> {
+    if data.len() % (8 * columns) != 0 {
+        return Err(PyValueError::new_err(format!(
+            "{name} must hold rows of {columns} float64 values, got {} bytes",
+            data.len()
+        )));
+    }
+
+    Ok(data
+        .chunks_exact(8)
+        .map(|chunk| f64::from_ne_bytes(chunk.try_into().unwrap()))
+        .collect())
+}
+
+/// Convert an array-like of shape (n, columns), or (n,) for a single column,
+/// to float64 values with one `numpy.ascontiguousarray` call.
+pub fn f64_array(obj: &Bound<'_, PyAny>, columns: usize, name: &str) -> PyResult<Vec<f64>> {
+    let numpy = obj.py().import_bound("numpy")?;
+    let array = numpy.call_method1("ascontiguousarray", (obj, numpy.getattr("float64")?))?;
+    let shape: Vec<usize> = array.getattr("shape")?.extract()?;
+    let valid = match shape.as_slice() {
+        [_] => columns == 1,
+        [_, c] => *c == columns,
+        _ => false,
+    };
+    if !valid {
+        let expected = if columns == 1 {
+            "(n,)".to_string()
+        } else {
+            format!("(n, {columns})")
+        };
+        return Err(PyValueError::new_err(format!(
+            "{name} must have shape {expected}, got {shape:?}"
+        )));
+    }
+
+    let bytes = array.call_method0("tobytes")?;
+    f64_rows(bytes.downcast::<PyBytes>()?.as_bytes(), columns, name)
+}
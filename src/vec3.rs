@@ -1,8 +1,8 @@
 use pyo3::prelude::*;
 
-use crate::{random_double, utils::PI};
+use crate::{random_double, rng::Rng, utils::PI};
 use std::fmt;
-use std::ops::{Add, Div, Mul, MulAssign, Neg, Sub};
+use std::ops::{Add, Div, Index, Mul, MulAssign, Neg, Sub};
 
 #[derive(PartialEq, Clone, Copy, Default)]
 #[pyclass]
@@ -80,6 +80,19 @@ impl From<[f64; 3]> for Vec3 {
     }
 }
 
+impl Index<usize> for Vec3 {
+    type Output = f64;
+
+    fn index(&self, axis: usize) -> &Self::Output {
+        match axis {
+            0 => &self.x,
+            1 => &self.y,
+            2 => &self.z,
+            _ => panic!("Vec3 axis out of range: {axis}"),
+        }
+    }
+}
+
 impl Add<Vec3> for Vec3 {
     type Output = Vec3;
 
@@ -200,9 +213,13 @@ pub fn unit_vector(v: Vec3) -> Vec3 {
     v / v.length()
 }
 
-pub fn random_in_unit_sphere() -> Vec3 {
+pub fn random_in_unit_sphere(rng: &mut Rng) -> Vec3 {
     loop {
-        let p = Vec3::random(Some([-1.0, 1.0]));
+        let p = Vec3::from([
+            rng.range(-1.0, 1.0),
+            rng.range(-1.0, 1.0),
+            rng.range(-1.0, 1.0),
+        ]);
         if p.length_squared() >= 1.0 {
             continue;
         }
@@ -210,16 +227,16 @@ pub fn random_in_unit_sphere() -> Vec3 {
     }
 }
 
-pub fn random_unit_vector() -> Vec3 {
-    let a = random_double!(0.0, 2.0 * PI);
-    let z = random_double!(-1.0, 1.0);
+pub fn random_unit_vector(rng: &mut Rng) -> Vec3 {
+    let a = rng.range(0.0, 2.0 * PI);
+    let z = rng.range(-1.0, 1.0);
     let r = f64::sqrt(1.0 - z.powi(2));
     Vec3::from([r * f64::cos(a), r * f64::sin(a), z])
 }
 
-pub fn random_in_unit_disk() -> Vec3 {
+pub fn random_in_unit_disk(rng: &mut Rng) -> Vec3 {
     loop {
-        let p = Vec3::from([random_double!(-1.0, 1.0), random_double!(-1.0, 1.0), 0.0]);
+        let p = Vec3::from([rng.range(-1.0, 1.0), rng.range(-1.0, 1.0), 0.0]);
         if p.length_squared() >= 1.0 {
             continue;
         }
@@ -227,6 +244,22 @@ pub fn random_in_unit_disk() -> Vec3 {
     }
 }
 
+/// Map a point of the unit square to the unit disk (Shirley-Chiu concentric
+/// mapping), keeping stratified points stratified.
+pub fn concentric_disk(u1: f64, u2: f64) -> Vec3 {
+    let a = 2.0 * u1 - 1.0;
+    let b = 2.0 * u2 - 1.0;
+    if a == 0.0 && b == 0.0 {
+        return Vec3::default();
+    }
+    let (r, phi) = if a.abs() > b.abs() {
+        (a, (PI / 4.0) * (b / a))
+    } else {
+        (b, PI / 2.0 - (PI / 4.0) * (a / b))
+    };
+    Vec3::from([r * f64::cos(phi), r * f64::sin(phi), 0.0])
+}
+
 pub fn reflect(v: Vec3, n: Vec3) -> Vec3 {
     v - 2.0 * dot(&v, &n) * n
 }
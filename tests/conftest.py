@@ -0,0 +1,29 @@
+import pytest
+
+from rayt.scene import random_scene
+from rayt_rust._core import Camera, HittableList, Point3, Vec3
+
+# A small frame of the cover scene, quick to render with every engine
+IMAGE_WIDTH = 32
+IMAGE_HEIGHT = 18
+SAMPLES_PER_PIXEL = 4
+MAX_DEPTH = 8
+SEED = 7
+
+
+@pytest.fixture
+def world() -> HittableList:
+    return random_scene(seed=1)
+
+
+@pytest.fixture
+def camera() -> Camera:
+    return Camera(
+        lookfrom=Point3(13, 2, 3),
+        lookat=Point3(0, 0, 0),
+        vup=Vec3(0, 1, 0),
+        vfov=20.0,
+        aspect_ratio=IMAGE_WIDTH / IMAGE_HEIGHT,
+        aperture=0.1,
+        focus_dist=10.0,
+    )
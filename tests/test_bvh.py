@@ -0,0 +1,51 @@
+import numpy as np
+
+from rayt.numba_optimized import BVH_STACK_SIZE, bvh_hit_numba, sphere_hit_numba
+from rayt.numba_renderer import NumbaRenderer
+
+T_MIN = 0.001
+
+
+def brute_force_hit(origin, direction, spheres, t_max):
+    """(t, sphere_idx) of the closest hit, trying every sphere"""
+    closest_t = t_max
+    hit_sphere_idx = -1
+    for i in range(spheres.shape[0]):
+        t = sphere_hit_numba(origin, direction, spheres, i, T_MIN, closest_t)
+        if t > 0.0:
+            closest_t = t
+            hit_sphere_idx = i
+    return closest_t, hit_sphere_idx
+
+
+def test_bvh_matches_brute_force(world, camera):
+    # The renderer holds the flattened BVH and the spheres in its order
+    renderer = NumbaRenderer()
+    renderer._prepare_scene_data(world, camera)
+    spheres = renderer.spheres_data
+    stack = np.empty(BVH_STACK_SIZE, dtype=np.int64)
+
+    rng = np.random.default_rng(3)
+    hits = 0
+    for _ in range(2000):
+        origin = rng.uniform(-12.0, 12.0, 3)
+        origin[1] = rng.uniform(0.1, 4.0)
+        direction = rng.normal(size=3)
+        direction /= np.linalg.norm(direction)
+
+        expected = brute_force_hit(origin, direction, spheres, np.inf)
+        t, sphere_idx = bvh_hit_numba(
+            origin,
+            direction,
+            spheres,
+            renderer.bvh_bounds,
+            renderer.bvh_links,
+            T_MIN,
+            np.inf,
+            stack,
+        )
+        assert sphere_idx == expected[1]
+        assert t == expected[0]
+        hits += sphere_idx >= 0
+    # The ground sphere fills the lower half of every view
+    assert hits > 500
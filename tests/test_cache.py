@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pytest
+from conftest import IMAGE_HEIGHT, IMAGE_WIDTH, MAX_DEPTH, SAMPLES_PER_PIXEL, SEED
+
+from rayt.api import render_samples
+from rayt.cache import RenderCache
+from rayt.scene import random_scene
+
+
+def render(cache, world, camera, samples=SAMPLES_PER_PIXEL, seed=SEED):
+    return cache.render(
+        world, camera, IMAGE_WIDTH, IMAGE_HEIGHT, samples, MAX_DEPTH, seed
+    )
+
+
+def entry_path(cache, world, camera, seed=SEED):
+    return cache.path(world, camera, IMAGE_WIDTH, IMAGE_HEIGHT, MAX_DEPTH, seed)
+
+
+def test_miss_then_hit(world, camera, tmp_path, monkeypatch):
+    cache = RenderCache(tmp_path)
+    image = render(cache, world, camera)
+    assert entry_path(cache, world, camera).exists()
+    reference = render_samples(
+        world, camera, IMAGE_WIDTH, IMAGE_HEIGHT, SAMPLES_PER_PIXEL, MAX_DEPTH, SEED
+    )
+    assert np.allclose(image, reference, rtol=1e-12, atol=1e-12)
+
+    # A hit renders nothing
+    def fail(*args, **kwargs):
+        raise AssertionError("rendered on a cache hit")
+
+    monkeypatch.setattr("rayt.cache.render_with_checkpoints", fail)
+    assert np.array_equal(render(cache, world, camera), image)
+    assert np.allclose(render(cache, world, camera, samples=2), image / 2)
+
+
+def test_more_samples_extend_the_entry(world, camera, tmp_path):
+    cache = RenderCache(tmp_path)
+    render(cache, world, camera)
+    image = render(cache, world, camera, samples=2 * SAMPLES_PER_PIXEL)
+    reference = RenderCache(tmp_path / "fresh").render(
+        world,
+        camera,
+        IMAGE_WIDTH,
+        IMAGE_HEIGHT,
+        2 * SAMPLES_PER_PIXEL,
+        MAX_DEPTH,
+        SEED,
+    )
+    assert np.allclose(image, reference, rtol=1e-12, atol=1e-12)
+
+
+def test_settings_and_scene_change_the_key(world, camera, tmp_path):
+    cache = RenderCache(tmp_path)
+    path = entry_path(cache, world, camera)
+    assert entry_path(cache, world, camera, seed=SEED + 1) != path
+    assert entry_path(cache, random_scene(seed=2), camera) != path
+
+
+@pytest.mark.parametrize("touched", [False, True])
+def test_least_recently_used_entry_is_evicted(world, camera, tmp_path, touched):
+    cache = RenderCache(tmp_path)
+    render(cache, world, camera, seed=1)
+    render(cache, world, camera, seed=2)
+    first = entry_path(cache, world, camera, seed=1)
+    second = entry_path(cache, world, camera, seed=2)
+    os.utime(first, (1.0, 1.0))
+    os.utime(second, (2.0, 2.0))
+    if touched:
+        # A hit makes the first entry the most recently used one
+        render(cache, world, camera, seed=1)
+
+    # Room for two entries, so adding a third evicts one
+    cache.max_bytes = 2 * first.stat().st_size
+    render(cache, world, camera, seed=3)
+    assert entry_path(cache, world, camera, seed=3).exists()
+    assert first.exists() == touched
+    assert second.exists() != touched
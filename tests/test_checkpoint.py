@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from conftest import IMAGE_HEIGHT, IMAGE_WIDTH, MAX_DEPTH, SEED
+
+from rayt.checkpoint import PASS_SAMPLES, Checkpoint, render_with_checkpoints
+from rayt.numba_renderer import NumbaRenderer
+from rayt.scene import random_scene
+
+SAMPLES = 2 * PASS_SAMPLES + 4
+
+
+def render(world, camera, path, samples=SAMPLES, **kwargs):
+    return render_with_checkpoints(
+        world,
+        camera,
+        IMAGE_WIDTH,
+        IMAGE_HEIGHT,
+        samples,
+        MAX_DEPTH,
+        SEED,
+        path,
+        sampler="stratified",
+        **kwargs,
+    )
+
+
+def test_resume_matches_uninterrupted(world, camera, tmp_path, monkeypatch):
+    uninterrupted = render(world, camera, tmp_path / "full.ckpt")
+
+    # Kill the render in its second pass, after the first checkpoint
+    render_frame = NumbaRenderer.render_frame
+    passes = []
+
+    def interrupted_frame(self, *args):
+        passes.append(args)
+        if len(passes) == 2:
+            raise KeyboardInterrupt
+        return render_frame(self, *args)
+
+    path = tmp_path / "resumed.ckpt"
+    monkeypatch.setattr(NumbaRenderer, "render_frame", interrupted_frame)
+    with pytest.raises(KeyboardInterrupt):
+        render(world, camera, path, interval=0.0)
+    monkeypatch.undo()
+
+    checkpoint = Checkpoint.load(path)
+    assert checkpoint.samples == PASS_SAMPLES
+    resumed = render(world, camera, path, checkpoint=checkpoint)
+
+    assert resumed.samples == SAMPLES
+    assert np.array_equal(resumed.framebuffer, uninterrupted.framebuffer)
+    assert np.array_equal(Checkpoint.load(path).framebuffer, resumed.framebuffer)
+
+
+def test_workers_match_single_process(world, camera, tmp_path):
+    single = render(world, camera, tmp_path / "single.ckpt")
+    tiled = render(world, camera, tmp_path / "tiled.ckpt", workers=2)
+    assert np.array_equal(tiled.framebuffer, single.framebuffer)
+
+
+def test_damaged_checkpoint_is_rejected(world, camera, tmp_path):
+    path = tmp_path / "render.ckpt"
+    render(world, camera, path, samples=PASS_SAMPLES)
+    data = bytearray(path.read_bytes())
+    data[len(data) // 2] ^= 1
+    path.write_bytes(data)
+
+    with pytest.raises(ValueError, match="damaged"):
+        Checkpoint.load(path)
+
+
+def test_checkpoint_of_another_render_is_rejected(world, camera, tmp_path):
+    path = tmp_path / "render.ckpt"
+    render(world, camera, path, samples=PASS_SAMPLES)
+    checkpoint = Checkpoint.load(path)
+
+    with pytest.raises(ValueError, match="different scene"):
+        render(random_scene(seed=2), camera, path, checkpoint=checkpoint)
+    with pytest.raises(ValueError, match="seed"):
+        checkpoint.check(world, camera, IMAGE_WIDTH, IMAGE_HEIGHT, MAX_DEPTH, SEED + 1)
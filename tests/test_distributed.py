@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from conftest import IMAGE_HEIGHT, IMAGE_WIDTH, MAX_DEPTH, SEED
+
+from rayt.api import render_samples
+from rayt.distributed import Coordinator
+
+SAMPLES_PER_PIXEL = 12
+
+
+@pytest.fixture
+def reference(world, camera):
+    return render_samples(
+        world,
+        camera,
+        IMAGE_WIDTH,
+        IMAGE_HEIGHT,
+        SAMPLES_PER_PIXEL,
+        MAX_DEPTH,
+        SEED,
+        sampler="stratified",
+    )
+
+
+def test_distributed_matches_single_process(world, camera, reference):
+    coordinator = Coordinator(
+        world,
+        camera,
+        IMAGE_WIDTH,
+        IMAGE_HEIGHT,
+        SAMPLES_PER_PIXEL,
+        MAX_DEPTH,
+        SEED,
+        sampler="stratified",
+        tile_size=8,
+        lease_samples=4,
+    )
+    image = coordinator.serve("127.0.0.1", 0, local_workers=2)
+    assert np.allclose(image, reference, rtol=1e-12, atol=1e-12)
+    assert coordinator.leases.reissued == 0
@@ -0,0 +1,131 @@
+import io
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from rayt.output import (
+    EXR_MAGIC,
+    EXR_ZIP_ROWS,
+    PNG_BAND_ROWS,
+    PNG_SIGNATURE,
+    quantize,
+    write_exr,
+    write_image,
+    write_png,
+)
+
+SAMPLES_PER_PIXEL = 4
+
+
+@pytest.fixture
+def image():
+    """A framebuffer of sample sums taller than a PNG band and an EXR chunk,
+    with radiance above 1 and a smooth part that deflate shrinks"""
+    rng = np.random.default_rng(5)
+    height = PNG_BAND_ROWS + EXR_ZIP_ROWS + 3
+    image = rng.uniform(0.0, 1.5 * SAMPLES_PER_PIXEL, (height, 29, 3))
+    image[:EXR_ZIP_ROWS] = 0.5 * SAMPLES_PER_PIXEL
+    return image
+
+
+def png_chunks(data):
+    assert data.startswith(PNG_SIGNATURE)
+    position = len(PNG_SIGNATURE)
+    while position < len(data):
+        (length,) = struct.unpack_from(">I", data, position)
+        kind = data[position + 4 : position + 8]
+        body = data[position + 8 : position + 8 + length]
+        (crc,) = struct.unpack_from(">I", data, position + 8 + length)
+        assert crc == zlib.crc32(kind + body)
+        yield kind, body
+        position += 12 + length
+
+
+def decode_png(data):
+    chunks = list(png_chunks(data))
+    assert chunks[0][0] == b"IHDR"
+    assert chunks[-1] == (b"IEND", b"")
+    width, height, depth, color, _, _, interlace = struct.unpack(
+        ">IIBBBBB", chunks[0][1]
+    )
+    assert (depth, color, interlace) == (8, 2, 0)
+
+    raw = zlib.decompress(b"".join(body for kind, body in chunks if kind == b"IDAT"))
+    rows = np.frombuffer(raw, dtype=np.uint8).reshape(height, 3 * width + 1)
+    # Every row uses the "up" filter
+    assert (rows[:, 0] == 2).all()
+    pixels = np.cumsum(rows[:, 1:], axis=0, dtype=np.uint64) % 256
+    return pixels.astype(np.uint8).reshape(height, width, 3)
+
+
+def decode_exr(data):
+    magic, version = struct.unpack_from("<ii", data)
+    assert (magic, version) == (EXR_MAGIC, 2)
+
+    attributes = {}
+    position = 8
+    while data[position] != 0:
+        name_end = data.index(b"\0", position)
+        kind_end = data.index(b"\0", name_end + 1)
+        (size,) = struct.unpack_from("<i", data, kind_end + 1)
+        name = data[position:name_end].decode()
+        attributes[name] = data[kind_end + 5 : kind_end + 5 + size]
+        position = kind_end + 5 + size
+    position += 1
+
+    assert attributes["channels"].startswith(b"B\0")
+    _, _, x_max, y_max = struct.unpack("<iiii", attributes["dataWindow"])
+    width, height = x_max + 1, y_max + 1
+    chunk_count = -(-height // EXR_ZIP_ROWS)
+    offsets = struct.unpack_from(f"<{chunk_count}Q", data, position)
+
+    radiance = np.empty((height, width, 3), dtype=np.float32)
+    for offset in offsets:
+        y0, size = struct.unpack_from("<ii", data, offset)
+        chunk = data[offset + 8 : offset + 8 + size]
+        rows = min(EXR_ZIP_ROWS, height - y0)
+        if size < rows * width * 3 * 4:
+            # Undo the delta encoding and the even / odd byte split
+            predicted = np.frombuffer(zlib.decompress(chunk), dtype=np.uint8)
+            reordered = np.cumsum(
+                predicted.astype(np.int64) - np.r_[0, np.full(predicted.size - 1, 128)]
+            ).astype(np.uint8)
+            half = (reordered.size + 1) // 2
+            raw = np.empty_like(reordered)
+            raw[0::2] = reordered[:half]
+            raw[1::2] = reordered[half:]
+            chunk = raw.tobytes()
+        channels = np.frombuffer(chunk, dtype="<f4").reshape(rows, 3, width)
+        radiance[y0 : y0 + rows] = channels.transpose(0, 2, 1)[:, :, ::-1]
+    return radiance
+
+
+def test_png_round_trip(image):
+    stream = io.BytesIO()
+    write_png(image, SAMPLES_PER_PIXEL, stream)
+    pixels = decode_png(stream.getvalue())
+    assert np.array_equal(pixels, quantize(image, SAMPLES_PER_PIXEL))
+
+
+def test_exr_round_trip(image):
+    stream = io.BytesIO()
+    write_exr(image, SAMPLES_PER_PIXEL, stream)
+    radiance = decode_exr(stream.getvalue())
+    # Unclamped, no gamma
+    assert radiance.max() > 1.0
+    assert np.array_equal(radiance, (image / SAMPLES_PER_PIXEL).astype(np.float32))
+
+
+def test_ppm_header_and_pixels(image):
+    stream = io.BytesIO()
+    write_image(image, SAMPLES_PER_PIXEL, "p6", stream)
+    height, width = image.shape[:2]
+    header = f"P6\n{width} {height}\n255\n".encode()
+    data = stream.getvalue()
+    assert data.startswith(header)
+    pixels = np.frombuffer(data[len(header) :], dtype=np.uint8)
+    assert np.array_equal(
+        pixels.reshape(height, width, 3), quantize(image, SAMPLES_PER_PIXEL)
+    )
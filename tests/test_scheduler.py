@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from conftest import IMAGE_HEIGHT, IMAGE_WIDTH, MAX_DEPTH, SEED
+
+from rayt.api import render_samples
+from rayt.sampling import sampler_parameters
+from rayt.scheduler import TileScheduler, tiles
+
+SAMPLES_PER_PIXEL = 12
+
+
+@pytest.fixture
+def reference(world, camera):
+    return render_samples(
+        world,
+        camera,
+        IMAGE_WIDTH,
+        IMAGE_HEIGHT,
+        SAMPLES_PER_PIXEL,
+        MAX_DEPTH,
+        SEED,
+        sampler="stratified",
+    )
+
+
+def test_tiles_cover_the_frame():
+    covered = np.zeros((IMAGE_HEIGHT, IMAGE_WIDTH), dtype=int)
+    for x0, y0, width, height in tiles(IMAGE_WIDTH, IMAGE_HEIGHT, tile_size=7):
+        covered[y0 : y0 + height, x0 : x0 + width] += 1
+    assert (covered == 1).all()
+
+
+def test_scheduler_matches_single_process(world, camera, reference):
+    scheduler = TileScheduler("numba", workers=2, tile_size=8)
+    image = scheduler.render(
+        world,
+        camera,
+        IMAGE_WIDTH,
+        IMAGE_HEIGHT,
+        SAMPLES_PER_PIXEL,
+        MAX_DEPTH,
+        SEED,
+        sampler="stratified",
+    )
+    assert np.array_equal(image, reference)
+    assert sum(load.tiles for load in scheduler.loads) == len(
+        tiles(IMAGE_WIDTH, IMAGE_HEIGHT, 8)
+    )
+
+
+def test_scheduler_passes_add_up(world, camera, reference):
+    scheduler = TileScheduler("numba", workers=2, tile_size=8)
+    scheduler.open(world, camera, IMAGE_WIDTH, IMAGE_HEIGHT)
+    try:
+        _, strata = sampler_parameters("stratified", SAMPLES_PER_PIXEL)
+        image = sum(
+            scheduler.render_pass(
+                4, MAX_DEPTH, SEED, MAX_DEPTH, "stratified", offset, strata
+            )
+            for offset in range(0, SAMPLES_PER_PIXEL, 4)
+        )
+    finally:
+        scheduler.close()
+    assert np.allclose(image, reference, rtol=1e-12, atol=1e-12)